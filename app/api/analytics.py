@@ -1,14 +1,35 @@
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Query, Request
 from fastapi.responses import JSONResponse
-import logging
+from app.services.analytics_sink import ANALYTICS_BATCH_LIMIT, ANALYTICS_WINDOW_MINUTES, BufferFull, analytics_sink
 
 router = APIRouter()
 
 @router.post("/api/analytics")
 async def log_analytics_event(request: Request):
+    """
+    Accept one frontend event or an array of them. Events are buffered and
+    written in batches; 429 means the buffer is full and the batch should be
+    retried.
+    """
     try:
         data = await request.json()
-        logging.info(f"[Analytics] {data}")
-        return JSONResponse(status_code=204, content={})
     except Exception as e:
+        return JSONResponse(status_code=400, content={"error": f"Invalid JSON: {e}"})
+    events = data if isinstance(data, list) else [data]
+    if len(events) > ANALYTICS_BATCH_LIMIT:
+        return JSONResponse(status_code=413, content={"error": f"Too many events (limit: {ANALYTICS_BATCH_LIMIT} per batch)"})
+    try:
+        accepted = analytics_sink.record(events)
+    except ValueError as e:
         return JSONResponse(status_code=400, content={"error": str(e)})
+    except BufferFull as e:
+        return JSONResponse(status_code=429, content={"error": str(e)}, headers={"Retry-After": str(max(1, int(analytics_sink.flush_seconds)))})
+    return JSONResponse(status_code=202, content={"accepted": accepted})
+
+@router.get("/api/analytics/summary")
+async def analytics_summary(
+    window: int = Query(ANALYTICS_WINDOW_MINUTES, ge=1, le=ANALYTICS_WINDOW_MINUTES, description="Rolling window in minutes"),
+    top: int = Query(20, ge=1, le=1000, description="Most frequent types/pages to return")
+):
+    """Event counts per type and per page, without replaying the event log."""
+    return analytics_sink.summary(window, top)
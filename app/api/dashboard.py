@@ -1,11 +1,20 @@
-from fastapi import APIRouter, Query, HTTPException, Body
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, Query, HTTPException, Body, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import List, Dict, Any, Optional
-from datetime import datetime, date, timedelta
+from datetime import datetime, date
 from app.models.forecast_row import ForecastRow
 from app.models.forecast_explaination import ForecastExplanation
 from app.services.forecast_explainer import generate_forecast_explanation
+from app.services.explanation_batch import parse_keys, resolve_explanations, stored_explanation
 from app.services.storycards import generate_narrative_storycards
+from app.services.context_warmer import context_warmer
+from app.services.confidence_history import confidence_history
+from app.services.metrics_engine import compute_kpis, kpi_tiles
+from app.services.backtest_engine import backtest_engine
+from app.services.timeseries_engine import MIN_POINTS, chart_series
+from app.services.drill_engine import MAX_PAGE_SIZE, drill_page
+from app.utils.fast_json import FastJSONResponse
+from app.utils.sse import sse_stream
 
 router = APIRouter(prefix="/api/dashboard", tags=["Dashboard"])
 
@@ -28,16 +37,25 @@ async def get_copilot_response(default: bool = Query(False)):
     return JSONResponse(content={"message": "Chat response logic not implemented"}, status_code=501)
 
 @router.post("/copilot")
-async def copilot_handler(payload: Dict[str, Any] = Body(...)):
+async def copilot_handler(request: Request, payload: Dict[str, Any] = Body(...)):
     """
     Handle natural language queries via Copilot: inject filters and call LLM agent.
+    With "stream": true or Accept: text/event-stream, the answer is sent as SSE
+    "answer" deltas followed by a "final" event with the full response.
     """
     query = payload.get("query")
     filters = payload.get("filters", {})
     if not query:
         raise HTTPException(status_code=400, detail="Missing query")
     # Delegate to copilot agent service
-    from app.services.copilot_agent import run_copilot_query
+    from app.services.copilot_agent import run_copilot_query, stream_copilot_query
+    if payload.get("stream") or "text/event-stream" in request.headers.get("accept", ""):
+        # Sync generator: Starlette iterates it in the threadpool, off the event loop
+        return StreamingResponse(
+            sse_stream(stream_copilot_query(query, filters)),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
     return run_copilot_query(query, filters)
 
 @router.get("/tiles", response_model=List[Dict[str, Any]])
@@ -62,14 +80,28 @@ async def get_chart_data(
     start: Optional[str] = Query(None),
     end: Optional[str] = Query(None),
     store: Optional[str] = Query(None),
-    signals: Optional[List[str]] = Query(None)
+    signals: Optional[List[str]] = Query(None),
+    width: Optional[int] = Query(None, ge=MIN_POINTS, le=10000, description="Chart width in pixels; caps the points returned"),
+    method: str = Query("lttb", description="Downsampling: lttb or minmax")
 ):
-    # ... existing chart logic
-    today = date.today()
-    dates = [(today - timedelta(days=i)).isoformat() for i in range(6, -1, -1)]
-    base = 100 if not sku else 50
-    values = [base + i * 5 for i in range(len(dates))]
-    return {"labels": dates, "values": values}
+    """
+    Daily predicted vs actual demand over the filter, downsampled server-side to
+    the chart width. labels/values keep the original shape for existing clients.
+    `signals` (weather, promotions, socialTrends, anomalies) keep only the
+    forecasts carrying any of them.
+    """
+    context_warmer.record_traffic(sku)
+    try:
+        series = chart_series(start, end, sku, store, width, method, signals)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    points = series["points"]
+    return FastJSONResponse({
+        "labels": [p["date"] for p in points],
+        "values": [p["predicted"] for p in points],
+        "actual": [p["actual"] for p in points],
+        **series,
+    })
 
 @router.get("/metrics", response_model=List[Dict[str, Any]])
 async def get_metrics(
@@ -79,52 +111,52 @@ async def get_metrics(
     store: Optional[str] = Query(None, description="Store filter")
 ):
     """
-    Return KPI metric tiles for the dashboard.
+    Return KPI metric tiles for the dashboard, computed from ingested forecasts
+    and actuals; trends compare with the preceding period of equal length.
     """
-    # Mock data based on filters
-    return [
-        {
-            "key": "accuracy",
-            "title": "Forecast Accuracy",
-            "value": "87.3%",
-            "trend": "+2.1%",
-            "color": "green"
-        },
-        {
-            "key": "confidence",
-            "title": "Avg Confidence",
-            "value": "0.84",
-            "trend": "+0.05",
-            "color": "blue"
-        },
-        {
-            "key": "missed",
-            "title": "Missed Forecasts",
-            "value": "12",
-            "trend": "-3",
-            "color": "red"
-        },
-        {
-            "key": "override",
-            "title": "AI Overrides",
-            "value": "8",
-            "trend": "+1",
-            "color": "orange"
-        }
-    ]
+    context_warmer.record_traffic(sku)
+    try:
+        kpis = compute_kpis(start_date, end_date, sku, store)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return kpi_tiles(kpis)
+
+@router.get("/accuracy", response_model=Dict[str, Any])
+async def get_accuracy(
+    level: str = Query("store", description="Hierarchy level: total, category, store, sku or store_sku"),
+    generated_at: Optional[str] = Query(None, description="Forecast snapshot (YYYY-MM-DD) or 'all'; defaults to the newest with actuals"),
+    limit: Optional[int] = Query(None, ge=1, description="Worst groups to return")
+):
+    """
+    Backtested forecast accuracy (MAPE, WAPE, bias, interval coverage) of a
+    generated_at snapshot against ingested actuals.
+    """
+    try:
+        return FastJSONResponse(backtest_engine.report(generated_at, level, limit))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/drill", response_model=Dict[str, Any])
-async def drill_down(metric: str = Query(..., description="KPI to drill into")):
+async def drill_down(
+    metric: str = Query(..., description="KPI to drill into: missed, accuracy, confidence, override or all"),
+    start_date: Optional[str] = Query(None, description="Start date (YYYY-MM-DD)"),
+    end_date: Optional[str] = Query(None, description="End date (YYYY-MM-DD)"),
+    sku: Optional[str] = Query(None, description="SKU filter"),
+    store: Optional[str] = Query(None, description="Store filter"),
+    sort: Optional[str] = Query(None, description="Numeric column to sort by"),
+    order: Optional[str] = Query(None, description="asc or desc"),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    columns: Optional[List[str]] = Query(None, description="Columns to return")
+):
     """
-    Drill‑through data for a given KPI metric.
+    Drill‑through data for a given KPI metric: one sku×store row per series,
+    keyset-paginated so deep pages cost the same as the first.
     """
-    # Placeholder drill data; replace with real logic
-    columns = ["SKU", "Detail 1", "Detail 2"]
-    rows = [
-        ["SKU123", "Value A1", "Value B1"],
-        ["SKU456", "Value A2", "Value B2"],
-    ]
-    return {"columns": columns, "rows": rows}
+    try:
+        return FastJSONResponse(drill_page(metric, start_date, end_date, sku, store, sort, order, limit, cursor, columns))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/detail", response_model=ForecastExplanation)
 async def get_detail(
@@ -135,6 +167,7 @@ async def get_detail(
     weather_severity: Optional[int] = Query(None, ge=0, le=3),
     promotion_discount: Optional[int] = Query(None, ge=0, le=100)
 ):
+    context_warmer.record_traffic(sku)
     # Parse forecast_date
     try:
         f_date = datetime.strptime(forecast_date, "%Y-%m-%d").date()
@@ -148,6 +181,11 @@ async def get_detail(
             raise HTTPException(status_code=400, detail="Invalid generated_at format; expected YYYY-MM-DD")
     else:
         g_date = date.today()
+    # Overrides ask for a what-if explanation, which is never stored
+    if weather_severity is None and promotion_discount is None:
+        found = stored_explanation(sku, store, f_date)
+        if found is not None:
+            return FastJSONResponse(found)
 
     # Build a minimal ForecastRow; set dummy predicted_demand
     forecast = ForecastRow(
@@ -165,7 +203,7 @@ async def get_detail(
         weather_severity_override=weather_severity,
         promotion_discount_override=promotion_discount
     )
-    return explanation
+    return FastJSONResponse(explanation)
 
 @router.post("/chat", response_model=ForecastExplanation)
 async def chat_explain(query: Dict[str, Any]):
@@ -176,44 +214,40 @@ async def chat_explain(query: Dict[str, Any]):
     # Extract and validate a ForecastRow from query
     base = ForecastRow(**query)
     # You could pass the question through to your LLM prompt logic
-    return generate_forecast_explanation(base, extra_question=query.get("question"))
+    return FastJSONResponse(generate_forecast_explanation(base, extra_question=query.get("question")))
 
 @router.get("/confidence-history", response_model=Dict[str, Any])
 async def get_confidence_history(
-    sku: str = Query(..., description="SKU ID to get confidence history for"),
-    store: str = Query(..., description="Store ID to get confidence history for")
+    sku: Optional[str] = Query(None, description="SKU ID to get confidence history for"),
+    store: Optional[str] = Query(None, description="Store ID to get confidence history for"),
+    pairs: Optional[List[str]] = Query(None, description="Many series at once, each as sku|store")
 ):
     """
-    Returns confidence score history for the last 7 explanations for a given SKU/store combination.
+    Returns the confidence scores of the last explanations for a SKU/store
+    combination (or for every sku|store in `pairs`, for grid views).
     Used for rendering confidence sparkline trends.
     """
-    today = date.today()
-    history = []
-
-    # Simulated confidence values - replace with actual DB fetch
-    # This creates a realistic wavy pattern with some variance
-    base_scores = [0.72, 0.68, 0.75, 0.82, 0.78, 0.85, 0.88]
-    
-    for i in range(7):
-        dt = today - timedelta(days=6 - i)
-        # Add some realistic variance to base scores
-        confidence_score = base_scores[i]
-        
-        # Adjust based on SKU/store for some variety
-        if "premium" in sku.lower():
-            confidence_score = min(confidence_score + 0.05, 1.0)
-        elif "clearance" in sku.lower():
-            confidence_score = max(confidence_score - 0.1, 0.0)
-            
-        history.append({
-            "date": dt.isoformat(),
-            "confidence": round(confidence_score, 3)
-        })
-
+    if pairs:
+        series = []
+        for pair in pairs:
+            sku_id, sep, store_id = pair.partition("|")
+            if not sep or not sku_id or not store_id:
+                raise HTTPException(status_code=400, detail=f"Invalid pair '{pair}'; expected sku|store")
+            series.append((sku_id, store_id))
+        histories = confidence_history.histories(series)
+        return {
+            "series": [
+                {"sku_id": sku_id, "store_id": store_id, "history": history}
+                for (sku_id, store_id), history in zip(series, histories)
+            ]
+        }
+    if not sku or not store:
+        raise HTTPException(status_code=400, detail="Provide sku and store, or pairs")
+    context_warmer.record_traffic(sku)
     return {
         "sku_id": sku,
         "store_id": store,
-        "history": history
+        "history": confidence_history.history(sku, store)
     }
 
 @router.get("/explain")
@@ -224,7 +258,14 @@ async def get_explanation(
 ):
     """
     Standalone explanation endpoint used by frontend modals (fallback).
+    Serves the stored explanation for the key when there is one.
     """
+    try:
+        found = stored_explanation(sku, store, datetime.strptime(date, "%Y-%m-%d").date())
+    except ValueError:
+        found = None
+    if found is not None:
+        return FastJSONResponse(found)
     return {
         "narrative_explanation": f"Sales uplift detected for SKU {sku} at {store} on {date}.",
         "confidence_score": 0.84,
@@ -238,18 +279,18 @@ async def get_explanation(
 @router.post("/explain/single", response_model=ForecastExplanation)
 async def explain_single(payload: Dict[str, Any] = Body(...)):
     """
-    Accepts JSON body with sku_id, store_id, and forecast_date to generate a ForecastExplanation.
+    Accepts JSON body with sku_id, store_id, and forecast_date and returns the
+    ForecastExplanation of that ingested forecast, stored or freshly generated.
     """
-    # Construct ForecastRow; generated_at and other flags defaulted or omitted
-    row = ForecastRow(
-        sku_id=payload.get('sku_id'),
-        store_id=payload.get('store_id'),
-        forecast_date=datetime.strptime(payload.get('forecast_date'), '%Y-%m-%d').date(),
-        generated_at=date.today(),
-        predicted_demand=0
-    )
-    explanation = generate_forecast_explanation(row)
-    return explanation
+    context_warmer.record_traffic(payload.get('sku_id'))
+    try:
+        keys = parse_keys([payload])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    (entry,), _ = await resolve_explanations(keys)
+    if entry["source"] == "not_found":
+        raise HTTPException(status_code=404, detail=f"No forecast ingested for {keys[0][0]} at {keys[0][1]} on {keys[0][2]}")
+    return FastJSONResponse(entry)
  
 @router.get("/storycards", response_model=List[Dict[str, Any]])
 async def get_storycards(
@@ -262,5 +303,6 @@ async def get_storycards(
     """
     Generate narrative storycards for given date range, SKU, store, and signals.
     """
+    context_warmer.record_traffic(sku)
     cards = generate_narrative_storycards(start, end, sku, store, signals)
     return cards
\ No newline at end of file
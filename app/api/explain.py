@@ -1,9 +1,8 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends, Request, Query
 from typing import List, Dict, Any, Optional
 import asyncio
+import time
 from pydantic import BaseModel
-from datetime import time, datetime
 from app.models.forecast_row import ForecastRow
 from app.models.forecast_explaination import ForecastExplanation
 from app.services.forecast_explainer import (
@@ -11,6 +10,19 @@ from app.services.forecast_explainer import (
     generate_batch_explanations,
     validate_explanation,
 )
+from app.utils.circuit_breaker import OPEN, CircuitOpenError, redis_breaker
+from app.utils.redis_pool import get_async_redis
+from app.utils import cache_codec
+from app.utils.fast_json import fast_response
+from app.services.session_store import (
+    META_FIELD,
+    chunk_field,
+    explanation_session_key,
+    forecast_session_key,
+    next_cursor,
+    read_session_page,
+    write_explanation_chunk,
+)
 
 router = APIRouter()
 
@@ -25,12 +37,24 @@ class CacheExplanationResponse(BaseModel):
     explanations: List[ForecastExplanation]
     summary: Dict[str, Any]
     explanation_cache_key: str
+    cursor: int = 0
+    next_cursor: Optional[int] = None
+
+def redis_unavailable(e: CircuitOpenError) -> HTTPException:
+    """Map an open redis circuit to a 503 with a Retry-After hint"""
+    return HTTPException(
+        status_code=503,
+        detail="Redis service unavailable",
+        headers={"Retry-After": str(int(e.retry_after) + 1)}
+    )
 
-# Dependency for Redis connection
-def get_redis_client():
+# Dependency for Redis connection: the shared pooled asyncio client
+async def get_redis_client():
+    # Fail fast while the redis circuit is open instead of waiting on a connect timeout
+    if redis_breaker.state == OPEN:
+        raise redis_unavailable(CircuitOpenError(redis_breaker.name, redis_breaker.retry_after()))
     try:
-        import redis
-        return redis.Redis(host='localhost', port=6379, db=0, decode_responses=True)
+        return get_async_redis()
     except Exception:
         raise HTTPException(status_code=503, detail="Redis service unavailable")
 
@@ -55,7 +79,7 @@ async def explain_single(request: Request):
         "explanation_type": "ai_generated"
     }
 
-@router.post("/api/explain/batch")
+@router.post("/api/explain/batch", response_model=BatchExplanationResponse)
 async def explain_batch(forecasts: List[ForecastRow]):
     """
     Generate batch explanations with improved concurrency and error handling.
@@ -90,9 +114,10 @@ async def explain_batch(forecasts: List[ForecastRow]):
         
         processing_time = time.time() - start_time
         
-        return BatchExplanationResponse(
-            explanations=valid_explanations,
-            summary={
+        # Explanations were validated when built; serialize them directly
+        return fast_response({
+            "explanations": valid_explanations,
+            "summary": {
                 "total_requested": len(forecasts),
                 "successful": len(valid_explanations),
                 "failed": len(failed_explanations),
@@ -100,8 +125,8 @@ async def explain_batch(forecasts: List[ForecastRow]):
                 "failed_details": failed_explanations[:5],  # Show first 5 failures
                 "processing_time_seconds": round(processing_time, 3)
             },
-            processing_time_seconds=round(processing_time, 3)
-        )
+            "processing_time_seconds": round(processing_time, 3)
+        }, array_key="explanations")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Batch explanation error: {str(e)}")
@@ -123,44 +148,53 @@ async def process_batch_async(forecasts: List[ForecastRow], batch_size: int = 10
     
     return results
 
-@router.post("/api/explain/from-cache/{session_id}")
+@router.post("/api/explain/from-cache/{session_id}", response_model=CacheExplanationResponse)
 async def explain_from_cached_data(
     session_id: str,
     background_tasks: BackgroundTasks,
+    cursor: int = Query(0, ge=0, description="Chunk index to explain"),
     redis_client = Depends(get_redis_client)
 ):
     """
-    Generate explanations for cached forecast data with background processing option.
+    Generate explanations for one chunk of a cached forecast session.
+    Follow next_cursor to page through the session; explained chunks are cached.
     """
     try:
-        cache_key = f"forecast_session:{session_id}"
-        cached_data = redis_client.get(cache_key)
+        page = await read_session_page(redis_client, session_id, cursor)
+        meta = page["meta"]
         
-        if not cached_data:
+        if not meta:
             raise HTTPException(status_code=404, detail="Session not found or expired")
+        if page["rows"] is None:
+            raise HTTPException(status_code=404, detail=f"Cursor {cursor} is past the end of the session")
+        
+        explanation_cache_key = explanation_session_key(session_id)
+        page_summary = {
+            "total_forecasts": meta["row_count"],
+            "chunk_count": meta["chunk_count"],
+            "page_size": len(page["rows"]),
+        }
         
-        # Parse cached data
-        import json
-        session_data = json.loads(cached_data)
-        forecast_dicts = session_data.get("data", [])
+        # Check if explanations already exist for this chunk
+        if page["explanations"] is not None:
+            return fast_response({
+                "session_id": session_id,
+                "explanations": page["explanations"],
+                "summary": {**page_summary, "cached": True},
+                "explanation_cache_key": explanation_cache_key,
+                "cursor": cursor,
+                "next_cursor": next_cursor(meta, cursor)
+            }, array_key="explanations")
         
         # Convert dict data back to ForecastRow objects with better error handling
         forecasts = []
         parsing_errors = []
         
-        for i, forecast_dict in enumerate(forecast_dicts):
+        for i, forecast_dict in enumerate(page["rows"]):
             try:
-                # Handle date parsing
-                for date_field in ["forecast_date", "generated_at"]:
-                    if date_field in forecast_dict and isinstance(forecast_dict[date_field], str):
-                        forecast_dict[date_field] = datetime.strptime(
-                            forecast_dict[date_field], "%Y-%m-%d"
-                        ).date()
-                
-                forecast = ForecastRow(**forecast_dict)
-                forecasts.append(forecast)
+                forecasts.append(ForecastRow(**forecast_dict))
             except Exception as e:
-                parsing_errors.append({"index": i, "error": str(e)})
+                parsing_errors.append({"index": cursor * meta["chunk_size"] + i, "error": str(e)})
         
         if not forecasts:
             raise HTTPException(
@@ -168,91 +202,101 @@ async def explain_from_cached_data(
                 detail=f"No valid forecast data found. Parsing errors: {len(parsing_errors)}"
             )
         
-        # Check if explanations already exist
-        explanation_cache_key = f"explanations_session:{session_id}"
-        existing_explanations = redis_client.get(explanation_cache_key)
-        
-        if existing_explanations:
-            return JSONResponse(
-                content={
-                    "session_id": session_id,
-                    "explanations": json.loads(existing_explanations),
-                    "summary": {
-                        "total_forecasts": len(forecasts),
-                        "cached": True,
-                        "parsing_errors": len(parsing_errors)
-                    },
-                    "explanation_cache_key": explanation_cache_key
-                }
-            )
-        
         # Generate new explanations
         start_time = time.time()
         explanations = await process_batch_async(forecasts)
         processing_time = time.time() - start_time
         
-        # Cache the explanations
+        # Cache the explanations for this chunk
         valid_explanations = [exp for exp in explanations if exp]
         background_tasks.add_task(
             cache_explanations,
             redis_client,
-            explanation_cache_key,
+            session_id,
+            cursor,
             valid_explanations
         )
         
-        return CacheExplanationResponse(
-            session_id=session_id,
-            explanations=valid_explanations,
-            summary={
-                "total_forecasts": len(forecasts),
+        return fast_response({
+            "session_id": session_id,
+            "explanations": valid_explanations,
+            "summary": {
+                **page_summary,
                 "explanations_generated": len(valid_explanations),
                 "parsing_errors": len(parsing_errors),
                 "processing_time_seconds": round(processing_time, 3),
                 "cached": False
             },
-            explanation_cache_key=explanation_cache_key
-        )
+            "explanation_cache_key": explanation_cache_key,
+            "cursor": cursor,
+            "next_cursor": next_cursor(meta, cursor)
+        }, array_key="explanations")
 
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise redis_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Cache explanation error: {str(e)}")
 
-def cache_explanations(redis_client, cache_key: str, explanations: List[ForecastExplanation]):
-    """Background task to cache explanations"""
+async def cache_explanations(redis_client, session_id: str, cursor: int, explanations: List[ForecastExplanation]):
+    """Background task to cache one chunk of explanations"""
     try:
-        import json
-        redis_client.setex(
-            cache_key,
-            86400,  # 24 hours
-            json.dumps([exp.model_dump() for exp in explanations])
+        await write_explanation_chunk(
+            redis_client,
+            session_id,
+            cursor,
+            [exp.model_dump(mode="json") for exp in explanations]
         )
     except Exception as e:
         print(f"Failed to cache explanations: {e}")
 
 @router.get("/api/explain/status/{session_id}")
-async def get_explanation_status(session_id: str, redis_client = Depends(get_redis_client)):
-    """Check if explanations exist for a session"""
+async def get_explanation_status(
+    session_id: str,
+    cursor: Optional[int] = Query(None, ge=0, description="Also return cached explanations for this chunk"),
+    redis_client = Depends(get_redis_client)
+):
+    """Check which explanation chunks exist for a session, optionally returning one page"""
     try:
-        forecast_key = f"forecast_session:{session_id}"
-        explanation_key = f"explanations_session:{session_id}"
+        forecast_key = forecast_session_key(session_id)
+        explanation_key = explanation_session_key(session_id)
         
-        forecast_exists = redis_client.exists(forecast_key)
-        explanation_exists = redis_client.exists(explanation_key)
+        # One round trip for every lookup; TTL is -2 for a missing key
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.hget(forecast_key, META_FIELD)
+        pipe.hlen(explanation_key)
+        pipe.ttl(forecast_key)
+        pipe.ttl(explanation_key)
+        if cursor is not None:
+            pipe.hget(explanation_key, chunk_field(cursor))
+        results = await pipe.execute()
+        meta, explained_chunks, forecast_ttl, explanation_ttl = results[:4]
         
-        if not forecast_exists:
+        if not meta:
             raise HTTPException(status_code=404, detail="Session not found")
+        meta = cache_codec.decode(meta)
         
-        return {
+        status = {
             "session_id": session_id,
-            "forecast_data_available": bool(forecast_exists),
-            "explanations_available": bool(explanation_exists),
-            "forecast_ttl": redis_client.ttl(forecast_key),
-            "explanation_ttl": redis_client.ttl(explanation_key) if explanation_exists else None
+            "forecast_data_available": True,
+            "explanations_available": explained_chunks == meta["chunk_count"],
+            "row_count": meta["row_count"],
+            "chunk_count": meta["chunk_count"],
+            "explained_chunks": explained_chunks,
+            "forecast_ttl": forecast_ttl,
+            "explanation_ttl": explanation_ttl if explained_chunks else None
         }
+        if cursor is not None:
+            status["cursor"] = cursor
+            status["explanations"] = cache_codec.decode(results[4])
+            status["next_cursor"] = next_cursor(meta, cursor)
+        return status
     
     except HTTPException:
         raise
+    except CircuitOpenError as e:
+        raise redis_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Status check error: {str(e)}")
 
@@ -260,8 +304,8 @@ async def get_explanation_status(session_id: str, redis_client = Depends(get_red
 async def clear_explanation_cache(session_id: str, redis_client = Depends(get_redis_client)):
     """Clear cached explanations for a session"""
     try:
-        explanation_key = f"explanations_session:{session_id}"
-        deleted = redis_client.delete(explanation_key)
+        explanation_key = explanation_session_key(session_id)
+        deleted = await redis_client.delete(explanation_key)
         
         return {
             "session_id": session_id,
@@ -269,5 +313,7 @@ async def clear_explanation_cache(session_id: str, redis_client = Depends(get_re
             "message": "Explanation cache cleared" if deleted else "No cache found"
         }
     
+    except CircuitOpenError as e:
+        raise redis_unavailable(e)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Cache clear error: {str(e)}")
\ No newline at end of file
@@ -1,10 +1,16 @@
+import asyncio
 from fastapi import APIRouter, File, UploadFile, HTTPException
 from fastapi.responses import JSONResponse
 import tempfile
 import shutil
 from typing import List
-from app.utils.file_loader import ingest_forecast_csv
+import pandas as pd
+from app.utils.file_loader import ingest_actuals_csv, ingest_forecast_csv
+from app.models.actual_row import ActualRow
 from app.models.forecast_row import ForecastRow
+from app.services.context_warmer import context_warmer
+from app.services.session_store import store_forecast_session
+from app.services.forecast_store import forecast_store
 import os
 
 router = APIRouter()
@@ -31,10 +37,17 @@ async def upload_csv(file: UploadFile = File(...)):
 
         # Process the CSV
         valid_rows, invalid_rows = ingest_forecast_csv(tmp_path)
+        context_warmer.record_volume(valid_rows)
+        store_info = await asyncio.to_thread(forecast_store.ingest, valid_rows)
+        # Keep valid rows as a chunked session for /api/explain/from-cache
+        session = await store_forecast_session(valid_rows)
         # Return simplified counts for test compatibility
         return {
             "valid_row_count": len(valid_rows),
-            "invalid_row_count": len(invalid_rows)
+            "invalid_row_count": len(invalid_rows),
+            "session_id": session["session_id"] if session else None,
+            "chunk_count": session["chunk_count"] if session else 0,
+            "data_version": store_info["version"]
         }
 
     except Exception as e:
@@ -44,3 +57,51 @@ async def upload_csv(file: UploadFile = File(...)):
         # Clean up temporary file
         if tmp_path and os.path.exists(tmp_path):
             os.unlink(tmp_path)
+
+
+@router.post("/api/ingest/actuals")
+async def upload_actuals(actuals: List[ActualRow]):
+    """Record realized sales against ingested forecasts for backtesting."""
+    if not actuals:
+        raise HTTPException(status_code=400, detail="Empty actuals list provided")
+    frame = pd.DataFrame([row.model_dump() for row in actuals])
+    frame["forecast_date"] = pd.to_datetime(frame["forecast_date"]).astype("datetime64[ns]")
+    store_info = await asyncio.to_thread(forecast_store.apply_actuals, frame)
+    return {
+        "matched_row_count": store_info["matched"],
+        "unmatched_row_count": store_info["unmatched"],
+        "data_version": store_info["version"]
+    }
+
+
+@router.post("/api/ingest/actuals/csv")
+async def upload_actuals_csv(file: UploadFile = File(...)):
+    MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+    file_content = await file.read()
+    if len(file_content) > MAX_FILE_SIZE:
+        raise HTTPException(status_code=413, detail="File too large")
+    await file.seek(0)
+
+    if not file.filename.endswith(".csv"):
+        raise HTTPException(status_code=400, detail="Only CSV files are supported.")
+
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
+            shutil.copyfileobj(file.file, tmp)
+            tmp_path = tmp.name
+        try:
+            actuals, invalid_rows = ingest_actuals_csv(tmp_path)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        store_info = await asyncio.to_thread(forecast_store.apply_actuals, actuals)
+        return {
+            "valid_row_count": len(actuals),
+            "invalid_row_count": len(invalid_rows),
+            "matched_row_count": store_info["matched"],
+            "unmatched_row_count": store_info["unmatched"],
+            "data_version": store_info["version"]
+        }
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            os.unlink(tmp_path)
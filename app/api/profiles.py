@@ -0,0 +1,36 @@
+import hmac
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse
+from app.utils import profiling
+
+router = APIRouter()
+
+def _require_token(token: Optional[str]) -> None:
+    if not profiling.PROFILE_TOKEN:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (PROFILE_TOKEN is not set)")
+    if token is None or not hmac.compare_digest(token.encode(), profiling.PROFILE_TOKEN.encode()):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Profile-Token")
+
+@router.get("/api/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """Saved request profiles, newest first, with links to their files."""
+    _require_token(x_profile_token)
+    profiles = profiling.list_profiles()
+    for profile in profiles:
+        profile["files"] = {kind: f"/api/profiles/{profile['id']}/{kind}" for kind in profiling.PROFILE_FILES}
+    return {"profiles": profiles, "count": len(profiles)}
+
+@router.get("/api/profiles/{profile_id}/{kind}")
+async def download_profile(profile_id: str, kind: str, x_profile_token: Optional[str] = Header(None)):
+    """
+    Download one profile file: pstats (python -m pstats, snakeviz), folded
+    (flamegraph.pl, speedscope) or memory (tracemalloc diff).
+    """
+    _require_token(x_profile_token)
+    path = profiling.profile_path(profile_id, kind)
+    if path is None:
+        raise HTTPException(status_code=404, detail=f"No {kind} file for profile '{profile_id}'")
+    media_type = "application/octet-stream" if kind == "pstats" else "text/plain"
+    return FileResponse(path, media_type=media_type, filename=profile_id + profiling.PROFILE_FILES[kind])
@@ -1,17 +1,38 @@
 from fastapi import FastAPI, Request, UploadFile, File, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 from app.api import ingest, explain
 from app.utils.file_loader import ingest_forecast_csv
+import asyncio
 import shutil
+from datetime import datetime
 import os
-import redis
+import time
 from dotenv import load_dotenv
 import logging
 from app.api.dashboard import router as dashboard_router
 from app.api.analytics import router as analytics_router
+from app.api.profiles import router as profiles_router
+from app.utils.circuit_breaker import OPEN, breaker_states, redis_breaker
+from app.utils.redis_pool import close_redis, get_async_redis, get_redis, pool_stats
+from app.utils.cache_codec import codec_stats
+from app.services.analytics_sink import analytics_sink
+from app.services.context_warmer import context_warmer
+from app.services.session_store import store_forecast_session
+from app.services.forecast_store import forecast_store
+from app.services.copilot_cache import copilot_cache
+from app.services.confidence_history import confidence_history
+from app.services.explanation_batch import parse_keys, resolve_explanations
+from app.services.explanation_store import explanation_store
+from app.services.query_cache import query_cache
+from app.utils.fast_json import fast_response
+from app.utils.http_cache import DashboardHTTPCache
+from app.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsMiddleware, loop_lag_monitor, render as render_metrics
+from app.utils.profiling import ProfilingMiddleware
+from app.services.metrics_engine import compute_kpis
+from app.services.timeseries_engine import MIN_POINTS, chart_series
 
 
 # Configure logging
@@ -36,6 +57,20 @@ app = FastAPI(
     redoc_url="/redoc"
 )
 
+def dashboard_data_version():
+    """
+    Validator source for dashboard HTTP caching: changes on every ingest or
+    recorded explanation. Explanations contribute a content fingerprint (equal
+    across workers holding the same explanations) and their last change time,
+    so Last-Modified moves with them too.
+    """
+    forecast_store.refresh_if_stale()
+    updated_at = max(filter(None, [forecast_store.updated_at, explanation_store.updated_at]), default=None, key=datetime.fromisoformat)
+    return f"{forecast_store.updated_at}|{forecast_store.version}|{explanation_store.fingerprint}", updated_at
+
+# ETag/304 handling and compression for dashboard GETs (inside CORS, so 304s carry CORS headers)
+app.add_middleware(DashboardHTTPCache, version_source=dashboard_data_version)
+
 # Add CORS middleware for web interface
 app.add_middleware(
     CORSMiddleware,
@@ -45,6 +80,12 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request profiling (PROFILE_TOKEN, optionally PROFILE_SAMPLE_RATE); a pass-through without a token
+app.add_middleware(ProfilingMiddleware)
+
+# Outermost, so request latency includes CORS and HTTP cache handling
+app.add_middleware(MetricsMiddleware)
+
 # Mount static files and templates before routes
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
@@ -54,12 +95,15 @@ app.include_router(ingest.router, tags=["Data Ingestion"])
 app.include_router(explain.router, tags=["Forecast Explanations"])
 app.include_router(dashboard_router)
 app.include_router(analytics_router)
+app.include_router(profiles_router, tags=["Profiling"])
 
 @app.on_event("startup")
 def on_startup():
-    redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
+    # Restore ingested forecasts (and everything derived from them) from the last snapshot
+    forecast_store.load()
+    confidence_history.load()
     try:
-        client = redis.from_url(redis_url, decode_responses=True)
+        client = get_redis()
         client.ping()
         app.state.redis = client
         logging.info("✅ Connected to Redis")
@@ -76,9 +120,7 @@ async def startup_event():
     
     # Test Redis connection (optional)
     try:
-        import redis
-        redis_client = redis.Redis(host='localhost', port=6379, db=0)
-        redis_client.ping()
+        get_redis().ping()
         logger.info("✅ Redis connection successful")
     except Exception as e:
         logger.warning(f"⚠️ Redis connection failed: {e}")
@@ -86,9 +128,31 @@ async def startup_event():
     logger.info("🚀 Walmart Forecasting API started successfully!")
     logger.info("📊 Ready to process demand forecasts and generate explanations")
 
+@app.on_event("startup")
+async def start_context_warmer():
+    """Start the background trends/news cache warmer"""
+    if os.getenv("WARMER_ENABLED", "true").lower() in ("1", "true", "yes"):
+        context_warmer.start()
+
+@app.on_event("startup")
+async def start_analytics_sink():
+    """Start the periodic analytics event flush"""
+    analytics_sink.start()
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    """Sample event-loop lag for /metrics"""
+    loop_lag_monitor.start()
+
 @app.on_event("shutdown")
 async def shutdown_event():
     """Cleanup on shutdown"""
+    await context_warmer.stop()
+    await loop_lag_monitor.stop()
+    # Flushes whatever analytics events are still buffered
+    await analytics_sink.stop()
+    confidence_history.save()
+    await close_redis()
     logger.info("👋 Walmart Forecasting API shutting down...")
 @app.get("/api/explain")
 def explain(sku: str = Query(...), store: str = Query(...), date: str = Query(...)):
@@ -111,6 +175,8 @@ async def root():
         "web_ui": "/ui",
         "endpoints": {
             "upload_csv": "/api/ingest/csv",
+            "upload_actuals": "/api/ingest/actuals",
+            "forecast_accuracy": "/api/dashboard/accuracy",
             "explain_single": "/api/explain/single",
             "explain_batch": "/api/explain/batch",
             "explain_from_cache": "/api/explain/from-cache/{session_id}",
@@ -118,6 +184,11 @@ async def root():
         }
     }
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus scrape endpoint"""
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -130,14 +201,27 @@ async def health_check():
     # Check environment variables
     health_status["gemini_api_configured"] = bool(os.getenv("GEMINI_API_KEY"))
     
-    # Check Redis availability
-    try:
-        import redis
-        redis_client = redis.Redis(host='localhost', port=6379, db=0)
-        redis_client.ping()
-        health_status["redis_available"] = True
-    except Exception:
+    # Check Redis availability (skipped while the redis circuit is open)
+    if redis_breaker.state == OPEN:
         health_status["redis_available"] = False
+    else:
+        try:
+            await get_async_redis().ping()
+            health_status["redis_available"] = True
+        except Exception:
+            health_status["redis_available"] = False
+    health_status["redis_pool"] = pool_stats()
+    health_status["cache_codec"] = codec_stats()
+    
+    # Circuit breaker state for each external dependency
+    circuits = breaker_states()
+    health_status["circuit_breakers"] = circuits
+    if any(c["state"] != "closed" for c in circuits.values()):
+        health_status["status"] = "degraded"
+    health_status["context_warmer"] = context_warmer.stats()
+    health_status["copilot_cache"] = copilot_cache.stats()
+    health_status["query_cache"] = query_cache.stats()
+    health_status["analytics_sink"] = analytics_sink.stats()
     
     return health_status
 
@@ -207,6 +291,9 @@ async def upload_csv_web(request: Request, file: UploadFile = File(...)):
         
         # Ingest logic
         valid_rows, invalid_rows = ingest_forecast_csv(file_path)
+        context_warmer.record_volume(valid_rows)
+        await asyncio.to_thread(forecast_store.ingest, valid_rows)
+        session = await store_forecast_session(valid_rows)
         
         # Calculate success rate
         total_rows = len(valid_rows) + len(invalid_rows)
@@ -219,6 +306,7 @@ async def upload_csv_web(request: Request, file: UploadFile = File(...)):
             "invalid_count": len(invalid_rows),
             "success_rate": round(success_rate, 2),
             "invalid_rows": invalid_rows[:10],  # Show only first 10 errors
+            "session_id": session["session_id"] if session else None,
             "processing_success": True
         }
         
@@ -262,18 +350,15 @@ async def get_dashboard_metrics(
     sku: Optional[str] = Query(None),
     store: Optional[str] = Query(None)
 ):
-    # TODO: Replace with real computation from your data source
+    try:
+        kpis = compute_kpis(start_date, end_date, sku, store)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {
-        "forecast_accuracy": 0.92,
-        "confidence_score": 0.84,
-        "missed_skus": 12,
-        "ai_override_pct": 0.18,
-        "top_influencer_breakdown": {
-            "Weather": 0.4,
-            "Promo": 0.3,
-            "Social": 0.2,
-            "Other": 0.1
-        }
+        **kpis["current"],
+        "previous_period": kpis["previous"],
+        "top_influencer_breakdown": kpis["top_influencer_breakdown"],
+        "data_version": kpis["data_version"],
     }
 
 # 2. Time-Series Data Endpoint
@@ -282,41 +367,45 @@ async def get_timeseries(
     start_date: str = Query(...),
     end_date: str = Query(...),
     sku: Optional[str] = Query(None),
-    store: Optional[str] = Query(None)
+    store: Optional[str] = Query(None),
+    width: Optional[int] = Query(None, ge=MIN_POINTS, le=10000),
+    method: str = Query("lttb")
 ):
-    # TODO: Replace with real data
-    return [
-        {
-            "date": "2025-07-01",
-            "actual": 120,
-            "predicted": 130,
-            "overlays": ["holiday", "rain"]
-        },
-        {
-            "date": "2025-07-02",
-            "actual": 110,
-            "predicted": 125,
-            "overlays": ["event"]
-        },
-    ]
+    try:
+        series = chart_series(start_date, end_date, sku, store, width, method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return fast_response([
+        {"date": p["date"], "actual": p["actual"], "predicted": p["predicted"], "overlays": p["overlays"]}
+        for p in series["points"]
+    ])
 
 # 3. Explanations Endpoint (Batch)
 from fastapi import Body
 @app.post("/api/dashboard/explanations")
 async def get_explanations(batch: List[dict] = Body(...)):
-    # TODO: Replace with real LLM logic
-    return [
-        {
-            "sku": row.get("sku", "SKU-231"),
-            "store": row.get("store", "Bangalore"),
-            "date": row.get("date", "2025-07-10"),
-            "narrative_explanation": "Demand is low due to heavy rainfall and negative social sentiment.",
-            "confidence_score": 0.84,
-            "top_influencer": "Social Trends",
-            "structured_explanation": {"reason": "Promo uplift", "impact": "+8%"}
-        }
-        for row in batch
-    ]
+    """
+    Explanations for many {sku_id, store_id, forecast_date} keys in one call.
+    Stored explanations are returned as-is; only missing ones are generated,
+    and keys with no ingested forecast come back with source "not_found".
+    """
+    start_time = time.time()
+    try:
+        keys = parse_keys(batch)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    explanations, counts = await resolve_explanations(keys)
+    return fast_response({
+        "explanations": explanations,
+        "summary": {
+            "requested": len(keys),
+            "unique": sum(counts.values()),
+            "from_store": counts["store"],
+            "generated": counts["generated"],
+            "not_found": counts["not_found"],
+            "processing_time_seconds": round(time.time() - start_time, 2),
+        },
+    }, array_key="explanations")
 
 # 4. Storycards Endpoint
 @app.get("/api/dashboard/storycards")
@@ -351,13 +440,13 @@ async def copilot_qa(query: str = Body(...)):
 @app.exception_handler(404)
 async def not_found_handler(request: Request, exc):
     """Custom 404 handler"""
-    return templates.TemplateResponse("404.html", {"request": request}, status_code=404)
+    return templates.TemplateResponse(request, "404.html", status_code=404)
 
 @app.exception_handler(500)
 async def internal_error_handler(request: Request, exc):
     """Custom 500 handler"""
     logger.error(f"Internal server error: {exc}")
-    return templates.TemplateResponse("500.html", {"request": request}, status_code=500)
+    return templates.TemplateResponse(request, "500.html", status_code=500)
 
 # Development info
 if __name__ == "__main__":
@@ -0,0 +1,10 @@
+from pydantic import BaseModel, Field
+from datetime import date
+
+class ActualRow(BaseModel):
+    # Identifies the forecast row the realized sales belong to
+    sku_id: str
+    store_id: str
+    forecast_date: date
+
+    actual_demand: int = Field(..., ge=0, description="Realized sales for forecast_date")
@@ -6,6 +6,7 @@ class ForecastRow(BaseModel):
     # Core identifiers
     sku_id: str
     store_id: str
+    product_category: Optional[str] = None
     forecast_date: date
     generated_at: date
     
@@ -13,8 +14,11 @@ class ForecastRow(BaseModel):
     predicted_demand: int = Field(..., ge=0, description="Predicted demand units")
     hist_sales_1w: Optional[int] = Field(None, ge=0, description="Sales from last week")
     hist_sales_4w_avg: Optional[int] = Field(None, ge=0, description="4-week average sales")
+    hist_sales_stddev: Optional[float] = Field(None, ge=0, description="Std deviation of historical weekly sales")
     conf_interval_lower: Optional[int] = Field(None, ge=0, description="Lower confidence bound")
     conf_interval_upper: Optional[int] = Field(None, ge=0, description="Upper confidence bound")
+    actual_demand: Optional[int] = Field(None, ge=0, description="Realized sales for forecast_date, once known")
+    override_demand: Optional[int] = Field(None, ge=0, description="Planner-adjusted demand replacing the model forecast")
     
     # External factors
     weather_type: Optional[Literal["rain", "sunny", "cloudy", "snow", "none"]] = None
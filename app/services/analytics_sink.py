@@ -0,0 +1,242 @@
+import asyncio
+import gzip
+import logging
+import os
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.utils.fast_json import dumps
+from app.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Events held in memory between flushes; a batch that does not fit is refused
+ANALYTICS_BUFFER_SIZE = int(os.getenv("ANALYTICS_BUFFER_SIZE", 10000))
+ANALYTICS_BATCH_LIMIT = int(os.getenv("ANALYTICS_BATCH_LIMIT", 500))
+ANALYTICS_FLUSH_SECONDS = float(os.getenv("ANALYTICS_FLUSH_SECONDS", 5))
+# "file" appends gzip members to a daily JSONL file; "redis" adds to a stream
+ANALYTICS_SINK = os.getenv("ANALYTICS_SINK", "file")
+ANALYTICS_DIR = os.getenv("ANALYTICS_DIR", "data/analytics")
+ANALYTICS_STREAM = os.getenv("ANALYTICS_STREAM", "analytics:events")
+ANALYTICS_STREAM_MAXLEN = int(os.getenv("ANALYTICS_STREAM_MAXLEN", 1_000_000))
+# Minute buckets kept for the rolling aggregates
+ANALYTICS_WINDOW_MINUTES = int(os.getenv("ANALYTICS_WINDOW_MINUTES", 60))
+
+MAX_FIELD_LENGTH = 200
+# Serialized size limit per event, props included
+ANALYTICS_MAX_EVENT_BYTES = int(os.getenv("ANALYTICS_MAX_EVENT_BYTES", 4096))
+# Distinct types/pages counted by name; later ones are folded into OTHER_LABEL
+ANALYTICS_MAX_LABELS = int(os.getenv("ANALYTICS_MAX_LABELS", 500))
+OTHER_LABEL = "other"
+
+
+def normalize_event(event: Any, received_at: float) -> Dict[str, Any]:
+    """Common shape for frontend events: type, page, ts, and everything else under props."""
+    if not isinstance(event, dict):
+        raise ValueError("Each analytics event must be a JSON object")
+    event = dict(event)
+    kind = event.pop("type", None) or event.pop("event", None) or "unknown"
+    page = event.pop("page", None) or event.pop("path", None) or "unknown"
+    normalized = {
+        "type": str(kind)[:MAX_FIELD_LENGTH],
+        "page": str(page)[:MAX_FIELD_LENGTH],
+        "ts": event.pop("ts", None) or event.pop("timestamp", None) or received_at,
+        "received_at": received_at,
+        "props": event,
+    }
+    size = len(dumps(normalized))
+    if size > ANALYTICS_MAX_EVENT_BYTES:
+        raise ValueError(f"Analytics event is {size} bytes (limit: {ANALYTICS_MAX_EVENT_BYTES})")
+    return normalized
+
+
+class BufferFull(Exception):
+    """The ring has no room for the batch; the client should retry later."""
+
+
+class AnalyticsSink:
+    """
+    Batched sink for frontend analytics events.
+
+    Requests append whole batches to a bounded in-memory ring and return at
+    once. When the ring is full the batch is refused (backpressure) rather than
+    dropping older events. A background task drains the ring every
+    ANALYTICS_FLUSH_SECONDS to an append-only gzip file or a Redis stream.
+    Counts per event type and per page are kept as totals and in per-minute
+    buckets, so summaries never replay the log. Type and page names are
+    client-supplied, so only the first ANALYTICS_MAX_LABELS of each are counted
+    by name and the rest under "other".
+    """
+
+    def __init__(
+        self,
+        capacity: int = ANALYTICS_BUFFER_SIZE,
+        sink: str = ANALYTICS_SINK,
+        directory: str = ANALYTICS_DIR,
+        redis_client: Any = None,
+        flush_seconds: float = ANALYTICS_FLUSH_SECONDS,
+    ):
+        if sink not in ("file", "redis"):
+            raise ValueError(f"Unknown analytics sink '{sink}'; expected file or redis")
+        self.capacity = capacity
+        self.sink = sink
+        self.directory = directory
+        self._redis = redis_client
+        self.flush_seconds = flush_seconds
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._ring: Deque[Dict[str, Any]] = deque()
+        self._by_type: Counter = Counter()
+        self._by_page: Counter = Counter()
+        # (epoch minute, events per type, events per page), oldest first
+        self._minutes: Deque[Tuple[int, Counter, Counter]] = deque()
+        self._task: Optional[asyncio.Task] = None
+        self._stats = {"accepted": 0, "refused": 0, "flushed": 0, "flush_errors": 0, "last_flush_at": None}
+
+    @property
+    def redis(self):
+        return self._redis if self._redis is not None else get_redis()
+
+    # --- intake -------------------------------------------------------------------
+
+    def record(self, events: List[Any]) -> int:
+        """Buffer a batch and count it; raises BufferFull when it does not fit."""
+        now = time.time()
+        batch = [normalize_event(event, now) for event in events]
+        minute = int(now // 60)
+        with self._lock:
+            if len(self._ring) + len(batch) > self.capacity:
+                self._stats["refused"] += len(batch)
+                raise BufferFull(f"Analytics buffer full ({len(self._ring)}/{self.capacity} events)")
+            self._ring.extend(batch)
+            types, pages = Counter(), Counter()
+            for event in batch:
+                # One at a time, so a batch of new names cannot overshoot the label cap
+                kind, page = self._label(self._by_type, event["type"]), self._label(self._by_page, event["page"])
+                self._by_type[kind] += 1
+                self._by_page[page] += 1
+                types[kind] += 1
+                pages[page] += 1
+            if not self._minutes or self._minutes[-1][0] != minute:
+                self._minutes.append((minute, Counter(), Counter()))
+                while self._minutes and self._minutes[0][0] <= minute - ANALYTICS_WINDOW_MINUTES:
+                    self._minutes.popleft()
+            self._minutes[-1][1].update(types)
+            self._minutes[-1][2].update(pages)
+            self._stats["accepted"] += len(batch)
+        return len(batch)
+
+    @staticmethod
+    def _label(counts: Counter, name: str) -> str:
+        # Caller holds the lock
+        if name in counts or len(counts) < ANALYTICS_MAX_LABELS:
+            return name
+        return OTHER_LABEL
+
+    def __len__(self) -> int:
+        return len(self._ring)
+
+    # --- flushing -----------------------------------------------------------------
+
+    def flush(self) -> int:
+        """Write everything buffered so far; on failure the events go back in the ring."""
+        with self._flush_lock:
+            with self._lock:
+                batch, self._ring = list(self._ring), deque()
+            if not batch:
+                return 0
+            try:
+                if self.sink == "redis":
+                    self._write_stream(batch)
+                else:
+                    self._write_file(batch)
+            except Exception as e:
+                with self._lock:
+                    # Keep what fits, oldest first, ahead of anything that arrived meanwhile
+                    room = max(0, self.capacity - len(self._ring))
+                    self._ring.extendleft(reversed(batch[:room]))
+                    self._stats["flush_errors"] += 1
+                    self._stats["refused"] += len(batch) - min(room, len(batch))
+                logger.warning(f"⚠️ Analytics flush failed, {len(batch)} events kept for retry: {e}")
+                return 0
+            with self._lock:
+                self._stats["flushed"] += len(batch)
+                self._stats["last_flush_at"] = datetime.now(timezone.utc).isoformat()
+            return len(batch)
+
+    def _path(self) -> str:
+        return os.path.join(self.directory, f"events-{datetime.now(timezone.utc):%Y%m%d}.jsonl.gz")
+
+    def _write_file(self, batch: List[Dict[str, Any]]) -> None:
+        # Each flush appends one gzip member; gzip readers treat the file as one stream
+        os.makedirs(self.directory, exist_ok=True)
+        payload = b"".join(dumps(event) + b"\n" for event in batch)
+        with open(self._path(), "ab") as f:
+            f.write(gzip.compress(payload, compresslevel=6))
+
+    def _write_stream(self, batch: List[Dict[str, Any]]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for event in batch:
+            pipe.xadd(ANALYTICS_STREAM, {"type": event["type"], "page": event["page"], "event": dumps(event)},
+                      maxlen=ANALYTICS_STREAM_MAXLEN, approximate=True)
+        pipe.execute()
+
+    async def _loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                await asyncio.to_thread(self.flush)
+            except Exception as e:
+                logger.warning(f"Analytics flush loop error: {e}")
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+            logger.info(f"📈 Analytics sink started ({self.sink}, flush every {self.flush_seconds:.0f}s)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await asyncio.to_thread(self.flush)
+
+    # --- aggregates ---------------------------------------------------------------
+
+    def summary(self, window_minutes: Optional[int] = None, top: int = 20) -> Dict[str, Any]:
+        """Event counts per type and page, since start and over the last `window_minutes`."""
+        window = min(window_minutes or ANALYTICS_WINDOW_MINUTES, ANALYTICS_WINDOW_MINUTES)
+        since = int(time.time() // 60) - window
+        recent_types, recent_pages = Counter(), Counter()
+        with self._lock:
+            for minute, types, pages in self._minutes:
+                if minute > since:
+                    recent_types.update(types)
+                    recent_pages.update(pages)
+            totals = {
+                "events": sum(self._by_type.values()),
+                "by_type": dict(self._by_type.most_common(top)),
+                "by_page": dict(self._by_page.most_common(top)),
+            }
+        return {
+            "totals": totals,
+            "window": {
+                "minutes": window,
+                "events": sum(recent_types.values()),
+                "by_type": dict(recent_types.most_common(top)),
+                "by_page": dict(recent_pages.most_common(top)),
+            },
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"sink": self.sink, "buffered": len(self._ring), "capacity": self.capacity, **self._stats}
+
+
+analytics_sink = AnalyticsSink()
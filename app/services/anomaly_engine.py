@@ -0,0 +1,143 @@
+import math
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.forecast_store import to_timestamp
+from app.services.rollups import rollups
+
+# |z| against the 4-week average, in historical standard deviations, that counts as anomalous
+ANOMALY_Z_THRESHOLD = float(os.getenv("ANOMALY_Z_THRESHOLD", 3.0))
+ANOMALY_CARD_LIMIT = int(os.getenv("ANOMALY_CARD_LIMIT", 3))
+# Confidence floor for days the upstream model flagged, or whose actuals left the interval
+FLAG_CONFIDENCE = 0.9
+BREACH_CONFIDENCE = 0.8
+
+
+def score_rows(start: Any = None, end: Any = None, sku: Optional[str] = None, store: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """
+    Score every sku×store×day in the window in one pass over the daily cube.
+
+    The observed value is the actual when known, else the forecast. Its z-score
+    is taken against the rolling 4-week average in units of hist_sales_stddev;
+    days without a stddev only qualify through a CI breach or anomaly_flag.
+    Impact is the absolute deviation in units from the 4-week average (or from
+    the forecast when there is no history).
+    """
+    daily = rollups.sorted_view("daily")
+    lo, hi = daily.bounds(to_timestamp(start), to_timestamp(end))
+    rows = np.arange(lo, hi)
+    mask = daily.mask(lo, hi, sku, store)
+    if mask is not None:
+        rows = rows[mask]
+
+    def col(name: str) -> np.ndarray:
+        return daily.values[rows, daily.columns[name]]
+
+    has_actual = col("actual_rows") > 0
+    observed = np.where(has_actual, col("actual_sum"), col("predicted_sum"))
+    baseline, std = col("hist_4w_sum"), np.sqrt(col("hist_var_sum"))
+    has_history = std > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.where(has_history, (observed - baseline) / std, np.nan)
+    deviation = np.where(has_history, observed - baseline, np.where(has_actual, observed - col("predicted_sum"), 0.0))
+    breach = col("miss_count") > 0
+    flagged = col("anomaly_count") > 0
+    anomalous = (np.abs(np.nan_to_num(z)) >= ANOMALY_Z_THRESHOLD) | breach | flagged
+    return {
+        "rows": rows,
+        "observed": observed,
+        "expected": np.where(has_history, baseline, col("predicted_sum")),
+        "has_actual": has_actual,
+        "z": z,
+        "deviation": deviation,
+        "impact": np.abs(deviation),
+        "breach": breach,
+        "flagged": flagged,
+        "anomalous": anomalous,
+    }
+
+
+def top_anomalies(scores: Dict[str, np.ndarray], limit: int = ANOMALY_CARD_LIMIT) -> np.ndarray:
+    """
+    Indices into `scores` of the highest-impact anomalous day of each of the
+    `limit` highest-impact series; per-series maxima via ufunc.at, then argpartition.
+    """
+    daily = rollups.sorted_view("daily")
+    candidates = np.flatnonzero(scores["anomalous"])
+    if not len(candidates) or limit < 1:
+        return candidates[:0]
+    rows, impact = scores["rows"][candidates], scores["impact"][candidates]
+    pair = daily.sku_codes[rows].astype(np.int64) * len(daily.codes["store_id"][1]) + daily.codes["store_id"][0][rows]
+    _, series = np.unique(pair, return_inverse=True)
+    best = np.full(series.max() + 1, -1.0)
+    np.maximum.at(best, series, impact)
+    top = np.arange(len(best))
+    if limit < len(best):
+        top = np.argpartition(-best, limit - 1)[:limit]
+    top = top[np.argsort(-best[top], kind="stable")]
+    # First candidate day reaching its series' maximum
+    peak = np.flatnonzero(impact == best[series])
+    peak_series, first = np.unique(series[peak], return_index=True)
+    day_of = np.empty(len(best), dtype=np.int64)
+    day_of[peak_series] = peak[first]
+    return candidates[day_of[top]]
+
+
+def _confidence(z: float, breach: bool, flagged: bool) -> float:
+    confidence = 0.0 if np.isnan(z) else math.erf(abs(z) / math.sqrt(2))
+    if flagged:
+        confidence = max(confidence, FLAG_CONFIDENCE)
+    if breach:
+        confidence = max(confidence, BREACH_CONFIDENCE)
+    return round(min(confidence, 0.99), 2)
+
+
+def anomaly_cards(
+    start: Any = None,
+    end: Any = None,
+    sku: Optional[str] = None,
+    store: Optional[str] = None,
+    limit: int = ANOMALY_CARD_LIMIT,
+) -> List[Dict[str, Any]]:
+    """Storycards for the highest-impact anomalous series in the window, one card per series."""
+    scores = score_rows(start, end, sku, store)
+    daily = rollups.sorted_view("daily")
+    cards = []
+    for i in top_anomalies(scores, limit):
+        row = scores["rows"][i]
+        sku_id = daily.skus[daily.sku_codes[row]]
+        store_id = daily.codes["store_id"][1][daily.codes["store_id"][0][row]]
+        day = pd.Timestamp(daily.dates[row]).date().isoformat()
+        z, deviation = float(scores["z"][i]), float(scores["deviation"][i])
+        reasons = []
+        if not np.isnan(z):
+            reasons.append(f"{z:+.1f}σ vs the 4-week average")
+        if scores["breach"][i]:
+            reasons.append("missed the forecast")
+        if scores["flagged"][i]:
+            reasons.append("flagged by the forecast model")
+        label = "Actual" if scores["has_actual"][i] else "Forecast"
+        cards.append({
+            "type": "anomaly",
+            "title": f"Demand {'spike' if deviation >= 0 else 'drop'}: {sku_id}",
+            "subtitle": f"{store_id} {day}",
+            "body": (
+                f"{label} {scores['observed'][i]:.0f} units vs {scores['expected'][i]:.0f} expected "
+                f"({'; '.join(reasons)})."
+            ),
+            "confidence": _confidence(z, bool(scores["breach"][i]), bool(scores["flagged"][i])),
+            "primary_driver": "anomaly",
+            "impact": round(deviation, 2),
+            "action": {
+                "label": "Explain",
+                "params": {
+                    "sku_id": sku_id,
+                    "store_id": store_id,
+                    "forecast_date": day
+                }
+            }
+        })
+    return cards
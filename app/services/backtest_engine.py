@@ -0,0 +1,169 @@
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.forecast_store import ForecastStore, forecast_store, to_timestamp
+
+# hierarchy level -> group keys
+LEVELS = {
+    "total": [],
+    "category": ["product_category"],
+    "store": ["store_id"],
+    "sku": ["sku_id"],
+    "store_sku": ["store_id", "sku_id"],
+}
+ERROR_SUMS = ["rows", "actual_sum", "abs_error_sum", "error_sum", "ape_sum", "ape_rows", "covered", "interval_rows"]
+
+# Cache key for the backtest over every snapshot together
+ALL_SNAPSHOTS = "all"
+
+
+def _error_terms(frame: pd.DataFrame) -> pd.DataFrame:
+    """Per-row error terms for rows that have both a forecast and an actual."""
+    predicted = frame["predicted_demand"].to_numpy(dtype=float)
+    actual = frame["actual_demand"].to_numpy(dtype=float)
+    keep = ~np.isnan(predicted) & ~np.isnan(actual)
+    predicted, actual = predicted[keep], actual[keep]
+    lower = frame["conf_interval_lower"].to_numpy(dtype=float)[keep]
+    upper = frame["conf_interval_upper"].to_numpy(dtype=float)[keep]
+    error = predicted - actual
+    # Percentage error is undefined on zero-sales days; WAPE still counts them
+    has_ape = actual > 0
+    has_interval = ~np.isnan(lower) & ~np.isnan(upper)
+    return pd.DataFrame({
+        "sku_id": frame["sku_id"].to_numpy()[keep],
+        "store_id": frame["store_id"].to_numpy()[keep],
+        "product_category": frame["product_category"].fillna("Uncategorized").to_numpy()[keep],
+        "rows": 1,
+        "actual_sum": actual,
+        "abs_error_sum": np.abs(error),
+        "error_sum": error,
+        "ape_sum": np.divide(np.abs(error), actual, out=np.zeros_like(actual), where=has_ape),
+        "ape_rows": has_ape.astype(np.int64),
+        "covered": (has_interval & (actual >= lower) & (actual <= upper)).astype(np.int64),
+        "interval_rows": has_interval.astype(np.int64),
+    })
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray) -> np.ndarray:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(denominator > 0, numerator / np.where(denominator > 0, denominator, 1), np.nan)
+
+
+def _metrics(sums: pd.DataFrame) -> pd.DataFrame:
+    return pd.DataFrame({
+        "forecasts": sums["rows"].astype(np.int64),
+        "mape": _ratio(sums["ape_sum"], sums["ape_rows"]),
+        "wape": _ratio(sums["abs_error_sum"], sums["actual_sum"]),
+        # Positive bias means over-forecasting
+        "bias": _ratio(sums["error_sum"], sums["actual_sum"]),
+        "interval_coverage": _ratio(sums["covered"], sums["interval_rows"]),
+        "actual_demand": sums["actual_sum"],
+    }, index=sums.index)
+
+
+def _records(metrics: pd.DataFrame) -> List[Dict[str, Any]]:
+    return metrics.round(4).astype(object).where(metrics.notna(), None).to_dict("records")
+
+
+def backtest(frame: pd.DataFrame, level: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Overall accuracy and per-group accuracy at `level` for the given forecast
+    rows, groups ordered worst WAPE first. Rows without actuals are ignored.
+    """
+    terms = _error_terms(frame)
+    overall = _records(_metrics(terms[ERROR_SUMS].sum().to_frame().T))[0]
+    keys = LEVELS[level]
+    if not keys:
+        return overall, []
+    sums = terms.groupby(keys, sort=False)[ERROR_SUMS].sum()
+    metrics = _metrics(sums).sort_values(["wape", "actual_demand"], ascending=False, na_position="last", kind="stable")
+    groups = _records(metrics.reset_index())
+    return overall, groups
+
+
+class BacktestEngine:
+    """
+    Forecast accuracy per generated_at snapshot, computed once per snapshot and
+    level. An ingest (forecasts or actuals) drops only the snapshots its rows
+    belong to or replace; a full reload drops everything.
+    """
+
+    def __init__(self, store: ForecastStore):
+        self._store = store
+        self._lock = threading.Lock()
+        self._results: Dict[Tuple[Any, str], Tuple[Dict[str, Any], List[Dict[str, Any]]]] = {}
+        self._snapshots: Optional[List[Dict[str, Any]]] = None
+        store.subscribe(self.on_store_change)
+
+    def on_store_change(self, store: ForecastStore, delta: Optional[pd.DataFrame]) -> None:
+        with self._lock:
+            self._snapshots = None
+            if delta is None:
+                self._results.clear()
+                return
+            # A newer snapshot replacing rows also changes the snapshots it replaced
+            touched = set(delta["generated_at"].dropna()) | set(delta.attrs.get("replaced_generated_at", ())) | {ALL_SNAPSHOTS}
+            self._results = {key: value for key, value in self._results.items() if key[0] not in touched}
+
+    def snapshots(self) -> List[Dict[str, Any]]:
+        """generated_at snapshots, newest first, with how many of their forecasts have actuals."""
+        self._store.refresh_if_stale()
+        with self._lock:
+            if self._snapshots is not None:
+                return self._snapshots
+        frame = self._store.frame
+        counts = (
+            pd.DataFrame({"generated_at": frame["generated_at"], "forecasts": 1, "with_actuals": frame["actual_demand"].notna()})
+            .groupby("generated_at")[["forecasts", "with_actuals"]].sum()
+            .sort_index(ascending=False)
+        )
+        snapshots = [
+            {"generated_at": day.date().isoformat(), "forecasts": int(n), "with_actuals": int(k)}
+            for day, n, k in zip(counts.index, counts["forecasts"], counts["with_actuals"])
+        ]
+        with self._lock:
+            self._snapshots = snapshots
+        return snapshots
+
+    def report(self, generated_at: Optional[str] = None, level: str = "store", limit: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Backtest of one snapshot (default: the newest with actuals, or "all")
+        at a hierarchy level.
+        """
+        if level not in LEVELS:
+            raise ValueError(f"Unknown level '{level}'; expected one of {', '.join(LEVELS)}")
+        snapshots = self.snapshots()
+        if generated_at == ALL_SNAPSHOTS:
+            snapshot: Any = ALL_SNAPSHOTS
+        elif generated_at:
+            snapshot = to_timestamp(generated_at)
+        else:
+            latest = next((s["generated_at"] for s in snapshots if s["with_actuals"]), None)
+            snapshot = to_timestamp(latest)
+        key = (snapshot, level)
+        with self._lock:
+            result = self._results.get(key)
+        if result is None and snapshot is not None:
+            version, frame = self._store.version, self._store.frame
+            if snapshot != ALL_SNAPSHOTS:
+                frame = frame[(frame["generated_at"] == snapshot).to_numpy()]
+            result = backtest(frame, level)
+            with self._lock:
+                # An ingest that raced the computation may have dropped this snapshot
+                if self._store.version == version:
+                    self._results[key] = result
+        overall, groups = result if result is not None else (None, [])
+        return {
+            "generated_at": snapshot if snapshot in (None, ALL_SNAPSHOTS) else snapshot.date().isoformat(),
+            "level": level,
+            "overall": overall,
+            "groups": groups[:limit] if limit else groups,
+            "group_count": len(groups),
+            "snapshots": snapshots,
+        }
+
+
+backtest_engine = BacktestEngine(forecast_store)
@@ -0,0 +1,179 @@
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.forecast_store import FLAG_COLUMNS, ForecastStore, forecast_store, to_timestamp
+
+# Low-cardinality columns with one bitmap per distinct value. top_influencer
+# backs the socialTrends signal, which has no flag column of its own.
+VALUE_COLUMNS = ["weather_type", "store_id", "product_category", "top_influencer"]
+# dashboard signal -> (column, value) pairs whose bitmaps are OR-ed
+SIGNALS: Dict[str, List[Tuple[str, Any]]] = {
+    "weather": [("weather_type", "rain"), ("weather_type", "snow")],
+    "promotions": [("promotion_flag", True)],
+    "socialTrends": [("top_influencer", "social_trend")],
+    "anomalies": [("anomaly_flag", True)],
+    "holidays": [("holiday_flag", True)],
+    "supply": [("supply_constraint_flag", True)],
+}
+
+# Rows match when every clause has at least one (column, value) pair that holds
+Clause = Sequence[Tuple[str, Any]]
+
+
+def _container(rows: np.ndarray, size: int) -> np.ndarray:
+    """
+    Roaring-style container for the sorted row numbers holding a value: int32
+    row numbers while that is smaller than a packed bitmap, packed bits (uint8)
+    once the value is dense.
+    """
+    if len(rows) * 32 < size:
+        return rows.astype(np.int32)
+    bits = np.zeros(size, dtype=bool)
+    bits[rows] = True
+    return np.packbits(bits)
+
+
+def _packed(container: np.ndarray, size: int) -> np.ndarray:
+    if container.dtype == np.uint8:
+        return container
+    bits = np.zeros(size, dtype=bool)
+    bits[container] = True
+    return np.packbits(bits)
+
+
+class Partition:
+    """
+    One forecast_date's rows, sorted by sku_id so a SKU is a contiguous range,
+    with a container per flag and per value of the VALUE_COLUMNS: packed bits
+    (np.packbits, one bit per row) or, for rare values, their row numbers.
+    """
+
+    def __init__(self, rows: pd.DataFrame):
+        # Sorting integer codes is far cheaper than sorting the SKU strings
+        codes, self.skus = pd.factorize(rows["sku_id"], sort=True)
+        order = np.argsort(codes, kind="stable")
+        self.rows = rows.iloc[order].reset_index(drop=True)
+        self.sku_codes = codes[order]
+        self.size = len(self.rows)
+        self.bitmaps: Dict[Tuple[str, Any], np.ndarray] = {}
+        for column in FLAG_COLUMNS:
+            rows = np.flatnonzero(self.rows[column].to_numpy(dtype=bool))
+            if len(rows):
+                self.bitmaps[(column, True)] = _container(rows, self.size)
+        for column in VALUE_COLUMNS:
+            codes, uniques = pd.factorize(self.rows[column])
+            # One pass: row numbers grouped by value code
+            order = np.argsort(codes, kind="stable")
+            edges = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+            for code, value in enumerate(uniques):
+                self.bitmaps[(column, value)] = _container(np.sort(order[edges[code]:edges[code + 1]]), self.size)
+
+    def _clause(self, clause: Clause) -> Optional[np.ndarray]:
+        """OR of the clause's bitmaps; None when no row can match."""
+        parts = [_packed(self.bitmaps[term], self.size) for term in clause if term in self.bitmaps]
+        if not parts:
+            return None
+        return np.bitwise_or.reduce(parts) if len(parts) > 1 else parts[0]
+
+    def select(self, clauses: List[Clause], sku: Optional[str] = None) -> np.ndarray:
+        """Row numbers matching every clause (and the SKU), from bitmaps alone."""
+        lo, hi = 0, self.size
+        if sku:
+            code = self.skus.get_indexer([sku])[0]
+            if code < 0:
+                return np.empty(0, dtype=np.int64)
+            lo, hi = np.searchsorted(self.sku_codes, code, side="left"), np.searchsorted(self.sku_codes, code, side="right")
+        if not clauses:
+            return np.arange(lo, hi)
+        combined = None
+        for clause in clauses:
+            bits = self._clause(clause)
+            if bits is None:
+                return np.empty(0, dtype=np.int64)
+            combined = bits if combined is None else combined & bits
+        matched = np.unpackbits(combined, count=self.size)[lo:hi]
+        return lo + np.flatnonzero(matched)
+
+
+def signal_clause(signals: Sequence[str]) -> Clause:
+    unknown = [name for name in signals if name not in SIGNALS]
+    if unknown:
+        raise ValueError(f"Unknown signal(s) {', '.join(unknown)}; expected any of {', '.join(SIGNALS)}")
+    return [term for name in signals for term in SIGNALS[name]]
+
+
+class BitmapIndex:
+    """
+    Bitmap indexes over the forecast store, partitioned by forecast_date like
+    the rollups. An ingest rebuilds only the partitions whose days it touches.
+    Queries AND/OR the bitmaps of each partition in the date range and read
+    column data only for the rows that match.
+    """
+
+    def __init__(self, store: ForecastStore):
+        self._store = store
+        self._lock = threading.Lock()
+        self._parts: Dict[pd.Timestamp, Partition] = {}
+        self._days = np.empty(0, dtype="datetime64[ns]")
+        self._rebuild(store.frame)
+        store.subscribe(self.on_store_change)
+
+    def _rebuild(self, frame: pd.DataFrame) -> None:
+        parts = {day: Partition(rows) for day, rows in frame.groupby("forecast_date", sort=False)}
+        with self._lock:
+            self._parts = parts
+            self._days = np.array(sorted(parts), dtype="datetime64[ns]")
+
+    def on_store_change(self, store: ForecastStore, delta: Optional[pd.DataFrame]) -> None:
+        if delta is None:
+            self._rebuild(store.frame)
+            return
+        frame = store.frame
+        touched = frame[frame["forecast_date"].isin(delta["forecast_date"].unique()).to_numpy()]
+        parts = {day: Partition(rows) for day, rows in touched.groupby("forecast_date", sort=False)}
+        with self._lock:
+            self._parts = {**self._parts, **parts}
+            self._days = np.array(sorted(self._parts), dtype="datetime64[ns]")
+
+    def query(
+        self,
+        start: Any = None,
+        end: Any = None,
+        sku: Optional[str] = None,
+        store: Optional[str] = None,
+        category: Optional[str] = None,
+        signals: Optional[Sequence[str]] = None,
+        columns: Optional[List[str]] = None,
+    ) -> pd.DataFrame:
+        """
+        Forecast rows in [start, end] for the filters, date-ordered. `signals`
+        are OR-ed with each other and AND-ed with the store/category filters.
+        """
+        clauses: List[Clause] = []
+        if store:
+            clauses.append([("store_id", store)])
+        if category:
+            clauses.append([("product_category", category)])
+        if signals:
+            clauses.append(signal_clause(signals))
+        self._store.refresh_if_stale()
+        start, end = to_timestamp(start), to_timestamp(end)
+        with self._lock:
+            lo = 0 if start is None else int(np.searchsorted(self._days, start.to_datetime64(), side="left"))
+            hi = len(self._days) if end is None else int(np.searchsorted(self._days, end.to_datetime64(), side="right"))
+            parts = [self._parts[pd.Timestamp(day)] for day in self._days[lo:hi]]
+        pieces = []
+        for part in parts:
+            rows = part.select(clauses, sku)
+            if len(rows):
+                data = part.rows if columns is None else part.rows[columns]
+                pieces.append(data.iloc[rows])
+        if not pieces:
+            return self._store.frame.iloc[:0] if columns is None else self._store.frame[columns].iloc[:0]
+        return pd.concat(pieces, ignore_index=True)
+
+
+bitmap_index = BitmapIndex(forecast_store)
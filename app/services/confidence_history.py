@@ -0,0 +1,199 @@
+import logging
+import os
+import threading
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.models.forecast_explaination import ForecastExplanation
+from app.services.explanation_store import ExplanationStore, explanation_store
+# Snapshots live next to the forecast store's
+from app.services.forecast_store import _store_dir
+
+logger = logging.getLogger(__name__)
+
+# Scores kept per sku×store, i.e. sparkline length
+CONFIDENCE_HISTORY_LENGTH = int(os.getenv("CONFIDENCE_HISTORY_LENGTH", 7))
+CONFIDENCE_HISTORY_SLOTS = int(os.getenv("CONFIDENCE_HISTORY_SLOTS", 1024))
+# Minimum seconds between snapshots written from the explanation path
+CONFIDENCE_SNAPSHOT_INTERVAL = float(os.getenv("CONFIDENCE_SNAPSHOT_INTERVAL", 30))
+
+Series = Tuple[str, str]
+
+
+class ConfidenceHistory:
+    """
+    Confidence scores for the latest CONFIDENCE_HISTORY_LENGTH forecast dates
+    per sku×store (one per date, date-ordered) as fixed-size ring buffers, one
+    row per series in a single preallocated float32 array (doubled when full)
+    with a dict mapping series to rows. Forecast dates are kept alongside as
+    int32 day ordinals.
+
+    Fed by every explanation recorded in the explanation store; snapshotted to
+    disk at most every CONFIDENCE_SNAPSHOT_INTERVAL seconds and on shutdown.
+    """
+
+    def __init__(self, explanations: ExplanationStore, length: int = CONFIDENCE_HISTORY_LENGTH, slots: int = CONFIDENCE_HISTORY_SLOTS):
+        self.length = length
+        self._lock = threading.Lock()
+        self._allocate(slots)
+        self._last_save = time.monotonic()
+        self._dirty = False
+        explanations.subscribe(self.on_explanations)
+
+    def _allocate(self, slots: int) -> None:
+        self._index: Dict[Series, int] = {}
+        self._scores = np.full((slots, self.length), np.nan, dtype=np.float32)
+        self._days = np.zeros((slots, self.length), dtype=np.int32)
+        # Next write position and number of filled entries per row
+        self._heads = np.zeros(slots, dtype=np.int32)
+        self._counts = np.zeros(slots, dtype=np.int32)
+
+    def _slot(self, series: Series) -> int:
+        # Caller holds the lock
+        slot = self._index.get(series)
+        if slot is None:
+            slot = len(self._index)
+            if slot == len(self._scores):
+                grow = len(self._scores)
+                self._scores = np.concatenate([self._scores, np.full((grow, self.length), np.nan, dtype=np.float32)])
+                self._days = np.concatenate([self._days, np.zeros((grow, self.length), dtype=np.int32)])
+                self._heads = np.concatenate([self._heads, np.zeros(grow, dtype=np.int32)])
+                self._counts = np.concatenate([self._counts, np.zeros(grow, dtype=np.int32)])
+            self._index[series] = slot
+        return slot
+
+    def push(self, sku_id: str, store_id: str, forecast_date: date, confidence: float) -> None:
+        with self._lock:
+            self._push(sku_id, store_id, forecast_date, confidence)
+
+    def _push(self, sku_id: str, store_id: str, forecast_date: date, confidence: float) -> None:
+        # Entries live at (head - count) .. (head - 1) mod length, in date order
+        slot = self._slot((sku_id, store_id))
+        day = forecast_date.toordinal()
+        head, count = int(self._heads[slot]), int(self._counts[slot])
+        last = (head - 1) % self.length
+        if not count or day > self._days[slot, last]:
+            # The common case: a newer date is appended, overwriting the oldest when full
+            self._scores[slot, head], self._days[slot, head] = confidence, day
+            self._heads[slot] = (head + 1) % self.length
+            self._counts[slot] = min(count + 1, self.length)
+            self._dirty = True
+            return
+        positions = (head - count + np.arange(count)) % self.length
+        days = self._days[slot, positions]
+        match = np.flatnonzero(days == day)
+        if len(match):
+            # A re-explanation of a date already in the ring replaces its score
+            self._scores[slot, positions[match[0]]] = confidence
+            self._dirty = True
+            return
+        if count == self.length and day < days[0]:
+            # Older than everything kept; the ring only holds the latest dates
+            return
+        at = int(np.searchsorted(days, day))
+        days = np.insert(days, at, day)[-self.length:]
+        scores = np.insert(self._scores[slot, positions], at, confidence)[-self.length:]
+        count = len(days)
+        self._days[slot, :count], self._scores[slot, :count] = days, scores
+        self._scores[slot, count:] = np.nan
+        self._heads[slot] = count % self.length
+        self._counts[slot] = count
+        self._dirty = True
+
+    def on_explanations(self, store: ExplanationStore, batch: Optional[List[ForecastExplanation]]) -> None:
+        if batch is None:
+            self.clear()
+            return
+        with self._lock:
+            for exp in batch:
+                if exp.confidence_score is not None:
+                    self._push(exp.sku_id, exp.store_id, exp.forecast_date, exp.confidence_score)
+        if time.monotonic() - self._last_save >= CONFIDENCE_SNAPSHOT_INTERVAL:
+            self.save()
+
+    def history(self, sku_id: str, store_id: str) -> List[Dict[str, Any]]:
+        """Oldest-first {date, confidence} points for one series."""
+        return self.histories([(sku_id, store_id)])[0]
+
+    def histories(self, pairs: List[Series]) -> List[List[Dict[str, Any]]]:
+        """Histories for many series with one gather over the ring buffers."""
+        with self._lock:
+            slots = np.array([self._index.get(pair, -1) for pair in pairs], dtype=np.int64)
+            known = slots >= 0
+            rows = slots[known]
+            # Rotate each ring so the oldest entry comes first
+            order = (self._heads[rows, None] + np.arange(self.length)) % self.length
+            scores = np.take_along_axis(self._scores[rows], order, axis=1)
+            days = np.take_along_axis(self._days[rows], order, axis=1)
+            counts = self._counts[rows]
+        result: List[List[Dict[str, Any]]] = [[] for _ in pairs]
+        for out, score_row, day_row, count in zip(np.flatnonzero(known), scores, days, counts):
+            result[out] = [
+                {"date": date.fromordinal(int(day)).isoformat(), "confidence": round(float(score), 3)}
+                for score, day in zip(score_row[self.length - count:], day_row[self.length - count:])
+            ]
+        return result
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._allocate(CONFIDENCE_HISTORY_SLOTS)
+            self._dirty = True
+
+    # --- persistence --------------------------------------------------------------
+
+    def _path(self) -> str:
+        return os.path.join(_store_dir(), "confidence_history.npz")
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            n = len(self._index)
+            series = list(self._index)
+            arrays = {
+                "skus": np.array([s[0] for s in series], dtype=str),
+                "stores": np.array([s[1] for s in series], dtype=str),
+                "scores": self._scores[:n].copy(),
+                "days": self._days[:n].copy(),
+                "heads": self._heads[:n].copy(),
+                "counts": self._counts[:n].copy(),
+            }
+            self._dirty = False
+            self._last_save = time.monotonic()
+        try:
+            os.makedirs(_store_dir(), exist_ok=True)
+            tmp_path = self._path() + ".tmp.npz"
+            np.savez(tmp_path, **arrays)
+            os.replace(tmp_path, self._path())
+        except Exception as e:
+            logger.warning(f"⚠️ Could not snapshot confidence history: {e}")
+
+    def load(self) -> bool:
+        try:
+            with np.load(self._path()) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError) as e:
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"⚠️ Could not load confidence history: {e}")
+            return False
+        if arrays["scores"].shape[1:] != (self.length,):
+            logger.warning("⚠️ Confidence history snapshot has a different length; ignoring it")
+            return False
+        n = len(arrays["skus"])
+        with self._lock:
+            self._allocate(max(CONFIDENCE_HISTORY_SLOTS, 1 << max(n - 1, 0).bit_length()))
+            self._index = {(sku, store): i for i, (sku, store) in enumerate(zip(arrays["skus"].tolist(), arrays["stores"].tolist()))}
+            self._scores[:n], self._days[:n] = arrays["scores"], arrays["days"]
+            self._heads[:n], self._counts[:n] = arrays["heads"], arrays["counts"]
+            self._dirty = False
+        logger.info(f"📦 Loaded confidence history for {n} series")
+        return True
+
+
+confidence_history = ConfidenceHistory(explanation_store)
@@ -1,42 +1,62 @@
 # app/services/context_fetcher.py
 
 from pytrends.request import TrendReq
-import redis
 import os
-import json
 import requests
+from app.utils.circuit_breaker import CircuitOpenError, newsapi_breaker, trends_breaker
+from app.utils.redis_pool import get_redis
+from app.utils import cache_codec
+from app.utils.metrics import record_cache
 NEWSAPI_KEY=os.getenv("NEWSAPI_KEY")
 # Initialize pytrends
 env_tz = int(os.getenv("TZ_OFFSET", 330))  # default IST
 tz = env_tz if env_tz is not None else 0
-pytrends = TrendReq(hl='en-US', tz=330)
-
-# Redis client (reuse your existing config)
-redis_client = redis.Redis(
-    host=os.getenv("REDIS_HOST", "localhost"),
-    port=int(os.getenv("REDIS_PORT", 6379)),
-    db=0,
-    decode_responses=True
-)
+# TrendReq() performs a network round trip on construction, so it is built lazily
+# (through the trends breaker) instead of at import time.
+pytrends = None
+
+# Shared pooled Redis client; every call goes through the redis breaker
+redis_client = get_redis()
+
+# Cache lifetimes, shared with the background context warmer
+NEWS_CACHE_TTL = 1800
+TRENDS_CACHE_TTL = 3600
+
+def news_cache_key(query: str, country: str = "us") -> str:
+    return f"news:{query}:{country}"
+
+def trends_cache_key(keyword: str, timeframe: str = 'now 7-d') -> str:
+    return f"trends:{keyword}:{timeframe}"
+
+def _get_pytrends() -> TrendReq:
+    global pytrends
+    if pytrends is None:
+        pytrends = TrendReq(hl='en-US', tz=330)
+    return pytrends
+
 def fetch_news_headlines(
     query: str,
     country: str = "us",
-    page_size: int = 5
+    page_size: int = 5,
+    force_refresh: bool = False
 ) -> list[str]:
     """
     Fetch top news headlines for a given query.
-    Caches results in Redis for 30 minutes.
+    Caches results in Redis for 30 minutes; force_refresh skips the cache read
+    (used by the context warmer to renew entries before they expire).
     """
     if not NEWSAPI_KEY:
         return []
 
-    cache_key = f"news:{query}:{country}"
-    try:
-        cached = redis_client.get(cache_key)
-        if cached:
-            return json.loads(cached)
-    except Exception:
-        pass
+    cache_key = news_cache_key(query, country)
+    if not force_refresh:
+        try:
+            cached = redis_client.get(cache_key)
+            record_cache("news", bool(cached))
+            if cached:
+                return cache_codec.decode(cached)
+        except Exception:
+            pass
 
     url = "https://newsapi.org/v2/top-headlines"
     params = {
@@ -45,49 +65,66 @@ def fetch_news_headlines(
         "pageSize": page_size,
         "apiKey": NEWSAPI_KEY
     }
-    try:
+    def _request_headlines():
         resp = requests.get(url, params=params, timeout=5)
+        # Only server-side errors count against the breaker; 4xx is our own fault
+        if resp.status_code >= 500:
+            resp.raise_for_status()
+        return resp
+
+    try:
+        resp = newsapi_breaker.call(_request_headlines)
         resp.raise_for_status()
         articles = resp.json().get("articles", [])
         headlines = [a["title"] for a in articles if "title" in a]
+    except CircuitOpenError:
+        # NewsAPI is known to be down; skip the request and don't cache the miss
+        return []
     except Exception:
         headlines = []
 
     # Cache for 30 minutes
     try:
-        redis_client.setex(cache_key, 1800, json.dumps(headlines))
+        redis_client.setex(cache_key, NEWS_CACHE_TTL, cache_codec.encode(headlines))
     except Exception:
         pass
 
     return headlines
 
-def fetch_google_trends(keyword: str, timeframe: str = 'now 7-d') -> list[float]:
+def fetch_google_trends(keyword: str, timeframe: str = 'now 7-d', force_refresh: bool = False) -> list[float]:
     """
     Fetch Google Trends interest values for a keyword over the given timeframe.
     Caches results in Redis for 1 hour to reduce API calls.
 
     :param keyword: search term to fetch trends for
     :param timeframe: timeframe string like 'now 7-d'
+    :param force_refresh: skip the cache read and overwrite the cached entry
     :return: list of float interest values or empty list if unavailable
     """
-    cache_key = f"trends:{keyword}:{timeframe}"
-    try:
-        cached = redis_client.get(cache_key)
-        if cached:
-            return json.loads(cached)
-    except Exception:
-        # Redis unavailable, proceed without cache
-        pass
+    cache_key = trends_cache_key(keyword, timeframe)
+    if not force_refresh:
+        try:
+            cached = redis_client.get(cache_key)
+            record_cache("trends", bool(cached))
+            if cached:
+                return cache_codec.decode(cached)
+        except Exception:
+            # Redis unavailable, proceed without cache
+            pass
+
+    def _query_trends():
+        client = _get_pytrends()
+        client.build_payload([keyword], timeframe=timeframe)
+        return client.interest_over_time()
 
     try:
-        pytrends.build_payload([keyword], timeframe=timeframe)
-        df = pytrends.interest_over_time()
+        df = trends_breaker.call(_query_trends)
         if df.empty or keyword not in df:
             return []
         values = df[keyword].tolist()
         # Cache for 1 hour
         try:
-            redis_client.setex(cache_key, 3600, json.dumps(values))
+            redis_client.setex(cache_key, TRENDS_CACHE_TTL, cache_codec.encode(values))
         except Exception:
             pass
         return values
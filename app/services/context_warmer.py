@@ -0,0 +1,223 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+import app.services.context_fetcher as context_fetcher
+from app.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+TRAFFIC_KEY_PREFIX = "warm:traffic:"
+VOLUME_KEY = "warm:volume"
+CYCLE_LOCK_KEY = "warm:cycle"
+KEY_LOCK_PREFIX = "warm:lock:"
+
+
+def _member(value: Any) -> str:
+    # The shared pool returns raw bytes
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class ContextWarmer:
+    """
+    Keeps the trends:/news: caches warm for the hottest SKUs.
+
+    Every worker buffers SKU traffic and forecast volume locally and flushes it into
+    hourly Redis sorted sets on each tick. One worker per interval wins the cycle
+    lock, ranks SKUs by recent traffic (topped up by forecast volume) and re-fetches
+    the context entries that are missing or close to expiry, within a request budget.
+    A per-key lock guarantees each cache key is refreshed only once across workers.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        interval_seconds: float = float(os.getenv("WARMER_INTERVAL_SECONDS", 60)),
+        top_n: int = int(os.getenv("WARMER_TOP_N", 20)),
+        request_budget: int = int(os.getenv("WARMER_REQUEST_BUDGET", 30)),
+        refresh_ahead_fraction: float = float(os.getenv("WARMER_REFRESH_AHEAD", 0.25)),
+        traffic_window_hours: int = int(os.getenv("WARMER_TRAFFIC_WINDOW_HOURS", 24)),
+    ):
+        self._redis = redis_client
+        self.interval_seconds = interval_seconds
+        self.top_n = top_n
+        self.request_budget = request_budget
+        self.refresh_ahead_fraction = refresh_ahead_fraction
+        self.traffic_window_hours = traffic_window_hours
+        self._traffic: Counter = Counter()
+        self._volume: Counter = Counter()
+        self._counts_lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stats: Dict[str, Any] = {
+            "cycles": 0,
+            "cycles_led": 0,
+            "refreshed_keys": 0,
+            "skipped_locked": 0,
+            "last_cycle_at": None,
+            "last_cycle_seconds": None,
+            "last_hot_skus": [],
+        }
+
+    @property
+    def redis(self):
+        return self._redis if self._redis is not None else get_redis()
+
+    # --- traffic / volume signals -------------------------------------------------
+
+    def record_traffic(self, sku: Optional[str], hits: int = 1) -> None:
+        """Count a dashboard request for a SKU; cheap, in-process only."""
+        if not sku:
+            return
+        with self._counts_lock:
+            self._traffic[sku] += hits
+
+    def record_volume(self, rows: Iterable[Any]) -> None:
+        """Accumulate predicted demand per SKU from freshly ingested forecast rows."""
+        volume: Counter = Counter()
+        for row in rows:
+            volume[row.sku_id] += row.predicted_demand or 0
+        with self._counts_lock:
+            self._volume.update(volume)
+
+    def _traffic_key(self, at: datetime) -> str:
+        return f"{TRAFFIC_KEY_PREFIX}{at.strftime('%Y%m%d%H')}"
+
+    def _flush_counts(self) -> None:
+        with self._counts_lock:
+            traffic, self._traffic = self._traffic, Counter()
+            volume, self._volume = self._volume, Counter()
+        if not traffic and not volume:
+            return
+        try:
+            bucket = self._traffic_key(datetime.now(timezone.utc))
+            pipe = self.redis.pipeline(transaction=False)
+            for sku, hits in traffic.items():
+                pipe.zincrby(bucket, hits, sku)
+            if traffic:
+                pipe.expire(bucket, self.traffic_window_hours * 3600 + 3600)
+            for sku, units in volume.items():
+                pipe.zincrby(VOLUME_KEY, units, sku)
+            pipe.execute()
+        except Exception as e:
+            # Put the counts back so they are not lost while Redis is down
+            with self._counts_lock:
+                self._traffic.update(traffic)
+                self._volume.update(volume)
+            logger.debug(f"Context warmer could not flush counts: {e}")
+
+    def hot_skus(self) -> List[str]:
+        """Top-N SKUs by recent traffic, topped up by forecast volume."""
+        now = datetime.now(timezone.utc)
+        buckets = [self._traffic_key(now - timedelta(hours=h)) for h in range(self.traffic_window_hours)]
+        ranked = self.redis.zunion(buckets, withscores=True)
+        ranked.sort(key=lambda item: item[1], reverse=True)
+        skus = [_member(sku) for sku, _ in ranked[:self.top_n]]
+        if len(skus) < self.top_n:
+            for sku in map(_member, self.redis.zrevrange(VOLUME_KEY, 0, self.top_n - 1)):
+                if sku not in skus:
+                    skus.append(sku)
+                if len(skus) >= self.top_n:
+                    break
+        return skus
+
+    # --- refresh cycle ------------------------------------------------------------
+
+    def _candidates(self, skus: List[str]) -> List[Dict[str, Any]]:
+        candidates = []
+        for sku in skus:
+            candidates.append({
+                "key": context_fetcher.trends_cache_key(sku),
+                "ttl": context_fetcher.TRENDS_CACHE_TTL,
+                "refresh": lambda sku=sku: context_fetcher.fetch_google_trends(sku, force_refresh=True),
+            })
+            if context_fetcher.NEWSAPI_KEY:
+                candidates.append({
+                    "key": context_fetcher.news_cache_key(sku),
+                    "ttl": context_fetcher.NEWS_CACHE_TTL,
+                    "refresh": lambda sku=sku: context_fetcher.fetch_news_headlines(sku, force_refresh=True),
+                })
+        return candidates
+
+    def run_cycle(self) -> Dict[str, Any]:
+        """Flush local counts and, if this worker leads the cycle, refresh stale keys."""
+        started = time.monotonic()
+        self._stats["cycles"] += 1
+        self._flush_counts()
+        result = {"led": False, "refreshed": [], "skipped_locked": 0}
+        try:
+            lock_ttl = max(1, int(self.interval_seconds))
+            if not self.redis.set(CYCLE_LOCK_KEY, os.getpid(), nx=True, ex=lock_ttl):
+                return result
+            result["led"] = True
+            self._stats["cycles_led"] += 1
+
+            skus = self.hot_skus()
+            candidates = self._candidates(skus)
+            pipe = self.redis.pipeline(transaction=False)
+            for candidate in candidates:
+                pipe.ttl(candidate["key"])
+            ttls = pipe.execute()
+
+            budget = self.request_budget
+            # Refresh the closest-to-expiry keys first (missing keys report -2)
+            for ttl, candidate in sorted(zip(ttls, candidates), key=lambda pair: pair[0]):
+                if budget <= 0:
+                    break
+                if ttl >= 0 and ttl > candidate["ttl"] * self.refresh_ahead_fraction:
+                    continue
+                lock_key = f"{KEY_LOCK_PREFIX}{candidate['key']}"
+                if not self.redis.set(lock_key, os.getpid(), nx=True, ex=lock_ttl * 2):
+                    result["skipped_locked"] += 1
+                    continue
+                candidate["refresh"]()
+                budget -= 1
+                result["refreshed"].append(candidate["key"])
+
+            self._stats["last_hot_skus"] = skus
+            self._stats["refreshed_keys"] += len(result["refreshed"])
+            self._stats["skipped_locked"] += result["skipped_locked"]
+        except Exception as e:
+            logger.debug(f"Context warmer cycle skipped: {e}")
+        finally:
+            self._stats["last_cycle_at"] = datetime.now(timezone.utc).isoformat()
+            self._stats["last_cycle_seconds"] = round(time.monotonic() - started, 3)
+        return result
+
+    async def _loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.run_cycle)
+            except Exception as e:
+                logger.warning(f"Context warmer cycle failed: {e}")
+            await asyncio.sleep(self.interval_seconds)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+            logger.info(f"🔥 Context warmer started (top {self.top_n} SKUs every {self.interval_seconds:.0f}s)")
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval_seconds,
+            "top_n": self.top_n,
+            "request_budget": self.request_budget,
+            **self._stats,
+        }
+
+
+context_warmer = ContextWarmer()
@@ -1,15 +1,26 @@
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, Optional, Tuple
 import json
 import os
+import re
+import time
 import google.generativeai as genai
 from datetime import datetime
+from app.utils.circuit_breaker import CircuitOpenError, gemini_breaker
+from app.utils.metrics import GEMINI_LATENCY, record_gemini_usage, timed_gemini_call
+from app.services.copilot_facts import build_copilot_facts, render_copilot_facts
+from app.services.copilot_router import answer_from_aggregates, classify_query
+from app.services.copilot_cache import copilot_cache
 
 
-def run_copilot_query(query: str, filters: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Handle copilot queries by integrating with LLM (e.g., Gemini) and returning structured JSON.
-    Injects filter context and asks Gemini to return actionable insights.
-    """
+def _fast_path(query: str, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    route = classify_query(query)
+    if route.fast_path:
+        return answer_from_aggregates(route, query, filters)
+    return None
+
+
+def _build_prompt(query: str, filters: Dict[str, Any]) -> str:
+    """Inject the filter context and aggregate facts into the Gemini prompt."""
     
     # Extract context from filters
     sku = filters.get("sku", "All SKUs")
@@ -24,8 +35,11 @@ def run_copilot_query(query: str, filters: Dict[str, Any]) -> Dict[str, Any]:
     if filters.get("socialTrends"): active_signals.append("Social Trends")
     if filters.get("anomalies"): active_signals.append("Anomalies")
     
+    # Facts over the ingested forecasts for this filter context, from precomputed rollups
+    facts = build_copilot_facts(query, filters)
+    
     # Build context prompt
-    context_prompt = f"""
+    return f"""
 You are a retail demand assistant specialized in forecast analysis.
 
 User Question: "{query}"
@@ -36,14 +50,13 @@ Current Context:
 - Date Range: {start_date} to {end_date}
 - Active Signals: {', '.join(active_signals) if active_signals else 'None'}
 
-Sample forecast data suggests:
-- Recent demand patterns show typical seasonal variations
-- Weather impact varies by product category
-- Promotional activities show 8-15% uplift typically
-- Social trends can drive 20%+ spikes for trending items
+Forecast data for this context (computed from ingested forecasts):
+{render_copilot_facts(facts)}
+
+Base your answer only on the data above; if it does not cover the question, say so.
 
 Return a structured JSON response with:
-1. "answer": A clear, concise explanation (2-3 sentences max)
+1. "answer": A clear, concise explanation (2-3 sentences max) citing the numbers above
 2. "chart_highlight": Optional object with date/sku/store to highlight on charts
 3. "action": Optional action object with type and params for drill-down
 
@@ -67,6 +80,32 @@ Example response format:
 
 Respond only with valid JSON. No markdown or extra text.
 """
+
+
+def _parse_response(response_text: str) -> Dict[str, Any]:
+    response_text = response_text.strip()
+    if response_text.startswith("```json"):
+        response_text = response_text.replace("```json", "").replace("```", "").strip()
+    return json.loads(response_text)
+
+
+def run_copilot_query(query: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Handle copilot queries by integrating with LLM (e.g., Gemini) and returning structured JSON.
+    Injects filter context and asks Gemini to return actionable insights.
+    High-confidence intents are answered from the rollups without calling Gemini.
+    """
+    
+    fast_answer = _fast_path(query, filters)
+    if fast_answer:
+        return fast_answer
+    
+    # Near-duplicate questions on the same data and filters reuse an earlier answer
+    cached = copilot_cache.lookup(query, filters)
+    if cached:
+        return cached
+    
+    context_prompt = _build_prompt(query, filters)
     
     # Try to use Gemini if API key is available
     api_key = os.getenv("GOOGLE_API_KEY")
@@ -74,21 +113,130 @@ Respond only with valid JSON. No markdown or extra text.
         try:
             genai.configure(api_key=api_key)
             model = genai.GenerativeModel('gemini-1.5-flash')  # Use the correct model name
-            response = model.generate_content(context_prompt)
+            response = timed_gemini_call("copilot", gemini_breaker.call, model.generate_content, context_prompt)
             
-            # Parse JSON response
-            response_text = response.text.strip()
-            if response_text.startswith("```json"):
-                response_text = response_text.replace("```json", "").replace("```", "").strip()
-            
-            return json.loads(response_text)
+            result = _parse_response(response.text)
+            result["source"] = "llm"
+            copilot_cache.put(query, filters, result)
+            return result
             
+        except CircuitOpenError:
+            pass  # Gemini is down; answer from the fallback rules immediately
         except Exception as e:
             print(f"Gemini API error: {e}")
             # Fall through to fallback
     
     # Fallback response when LLM is not available
-    return _generate_fallback_response(query, filters)
+    return {**_generate_fallback_response(query, filters), "source": "fallback"}
+
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", '"': '"', "\\": "\\", "/": "/"}
+_ANSWER_KEY = re.compile(r'"answer"\s*:\s*"')
+
+
+class AnswerStreamParser:
+    """
+    Pulls the "answer" string out of the model's JSON while it is still being
+    generated, so its text can be shown before the rest of the object arrives.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.answer = ""
+        self._pos: Optional[int] = None  # next unread index inside the answer string
+        self._done = False
+
+    def feed(self, chunk: str) -> str:
+        """Append a chunk of model output; return the newly decoded answer text."""
+        self.buffer += chunk
+        if self._done:
+            return ""
+        if self._pos is None:
+            match = _ANSWER_KEY.search(self.buffer)
+            if not match:
+                return ""
+            self._pos = match.end()
+        buf, i, out = self.buffer, self._pos, []
+        while i < len(buf):
+            ch = buf[i]
+            if ch == '"':
+                self._done = True
+                i += 1
+                break
+            if ch == "\\":
+                # Wait for the rest of an escape sequence split across chunks
+                if i + 1 >= len(buf) or (buf[i + 1] == "u" and i + 6 > len(buf)):
+                    break
+                if buf[i + 1] == "u":
+                    out.append(chr(int(buf[i + 2:i + 6], 16)))
+                    i += 6
+                else:
+                    out.append(_ESCAPES.get(buf[i + 1], buf[i + 1]))
+                    i += 2
+                continue
+            out.append(ch)
+            i += 1
+        self._pos = i
+        delta = "".join(out)
+        self.answer += delta
+        return delta
+
+
+def stream_copilot_query(query: str, filters: Dict[str, Any]) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Streaming variant of run_copilot_query. Yields ("answer", {"text": delta}) events
+    while Gemini generates the answer, then a single ("final", response) event with the
+    complete answer, chart_highlight and action once the JSON is complete.
+    """
+    instant = _fast_path(query, filters) or copilot_cache.lookup(query, filters)
+    if instant:
+        yield "answer", {"text": instant["answer"]}
+        yield "final", instant
+        return
+
+    parser = AnswerStreamParser()
+    api_key = os.getenv("GOOGLE_API_KEY")
+    if api_key and gemini_breaker.allow_request():
+        outcome = None
+        started = time.perf_counter()
+        try:
+            genai.configure(api_key=api_key)
+            model = genai.GenerativeModel('gemini-1.5-flash')
+            response = model.generate_content(_build_prompt(query, filters), stream=True)
+            for chunk in response:
+                delta = parser.feed(chunk.text)
+                if delta:
+                    yield "answer", {"text": delta}
+            outcome = "ok"
+            gemini_breaker.record_success()
+            # Usage metadata is complete once the stream is drained
+            record_gemini_usage("copilot_stream", response)
+        except Exception as e:
+            outcome = "error"
+            gemini_breaker.record_failure(e)
+            print(f"Gemini API error: {e}")
+        finally:
+            if outcome is None:
+                # Closed mid-stream (client disconnect): no verdict on Gemini, but free the probe slot
+                gemini_breaker.release()
+            GEMINI_LATENCY.observe(time.perf_counter() - started, caller="copilot_stream", outcome=outcome or "cancelled")
+        if outcome == "ok":
+            try:
+                result = _parse_response(parser.buffer)
+            except ValueError:
+                # The answer streamed fine but the trailing fields did not parse
+                result = {"answer": parser.answer, "chart_highlight": None, "action": None}
+            if result.get("answer"):
+                result["source"] = "llm"
+                copilot_cache.put(query, filters, result)
+                yield "final", result
+                return
+
+    # Fallback; "final" always carries the full answer, replacing any partial text
+    fallback = {**_generate_fallback_response(query, filters), "source": "fallback"}
+    if not parser.answer:
+        yield "answer", {"text": fallback["answer"]}
+    yield "final", fallback
 
 
 def _generate_fallback_response(query: str, filters: Dict[str, Any]) -> Dict[str, Any]:
@@ -0,0 +1,134 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+from app.services.copilot_facts import normalize_copilot_filters
+from app.services.copilot_router import classify_query, extract_entities
+from app.services.forecast_store import ForecastStore, forecast_store
+
+COPILOT_CACHE_SIZE = int(os.getenv("COPILOT_CACHE_SIZE", 256))
+COPILOT_CACHE_SIMILARITY = float(os.getenv("COPILOT_CACHE_SIMILARITY", 0.85))
+
+Context = Tuple[Any, ...]
+EntryKey = Tuple[Context, str]
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(re.findall(r"[\w\-]+", query.lower()))
+
+
+def context_key(query: str, filters: Dict[str, Any]) -> Context:
+    """
+    Answers are only shared between questions with the same filter context, routed
+    intent and named SKU/store, so "spike" vs "drop" or SKU_1 vs SKU_2 never collide
+    however similar the wording.
+    """
+    ctx = normalize_copilot_filters(filters)
+    ctx.update(extract_entities(query))
+    return (ctx["sku"], ctx["store"], ctx["start"], ctx["end"], tuple(ctx["signals"]), classify_query(query).intent)
+
+
+class CopilotAnswerCache:
+    """
+    LRU cache of LLM copilot responses keyed by (context, query) and scoped to the
+    forecast data version.
+
+    Lookups fall back to the nearest cached query in the same context by cosine
+    similarity of character n-gram TF-IDF vectors. N-grams are hashed, so words
+    never seen before still count against the match; IDF weights are refit over
+    the cached queries whenever the entry set changes.
+    """
+
+    def __init__(self, max_entries: int = COPILOT_CACHE_SIZE, threshold: float = COPILOT_CACHE_SIMILARITY):
+        self.max_entries = max_entries
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[EntryKey, Tuple[Dict[str, Any], sp.csr_matrix]]" = OrderedDict()
+        self._version: Optional[int] = None
+        self._hasher = HashingVectorizer(
+            analyzer="char_wb", ngram_range=(3, 5), n_features=2 ** 18, alternate_sign=False, norm=None
+        )
+        self._index: Optional[Tuple[List[EntryKey], TfidfTransformer, sp.csr_matrix]] = None
+        self._stats = {"hits": 0, "similar_hits": 0, "misses": 0, "lru_evictions": 0, "version_evictions": 0}
+
+    def _sync_version(self, version: int) -> None:
+        # Caller holds the lock. A new data version invalidates every cached answer.
+        if version != self._version:
+            self._stats["version_evictions"] += len(self._entries)
+            self._entries.clear()
+            self._index = None
+            self._version = version
+
+    def on_store_change(self, store: ForecastStore, delta: Optional[pd.DataFrame]) -> None:
+        if delta is None:
+            # Reload or reset: the version number alone may not have moved
+            self.clear()
+        with self._lock:
+            self._sync_version(store.version)
+
+    def _ensure_index(self) -> Tuple[List[EntryKey], TfidfTransformer, sp.csr_matrix]:
+        if self._index is None:
+            keys = list(self._entries)
+            counts = sp.vstack([self._entries[key][1] for key in keys]).tocsr()
+            tfidf = TfidfTransformer(sublinear_tf=True).fit(counts)
+            self._index = (keys, tfidf, tfidf.transform(counts))
+        return self._index
+
+    def lookup(self, query: str, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        context, text = context_key(query, filters), normalize_query(query)
+        forecast_store.refresh_if_stale()
+        with self._lock:
+            self._sync_version(forecast_store.version)
+            exact = self._entries.get((context, text))
+            if exact is not None:
+                self._entries.move_to_end((context, text))
+                self._stats["hits"] += 1
+                return {**exact[0], "source": "cache", "cache_similarity": 1.0}
+            if not self._entries:
+                self._stats["misses"] += 1
+                return None
+            keys, tfidf, matrix = self._ensure_index()
+            rows = [i for i, key in enumerate(keys) if key[0] == context]
+            if rows:
+                vector = tfidf.transform(self._hasher.transform([text]))
+                similarity = (matrix[rows] @ vector.T).toarray().ravel()
+                best = int(similarity.argmax())
+                if similarity[best] >= self.threshold:
+                    key = keys[rows[best]]
+                    self._entries.move_to_end(key)
+                    self._stats["similar_hits"] += 1
+                    return {**self._entries[key][0], "source": "cache", "cache_similarity": round(float(similarity[best]), 3)}
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, query: str, filters: Dict[str, Any], response: Dict[str, Any]) -> None:
+        key = (context_key(query, filters), normalize_query(query))
+        counts = self._hasher.transform([key[1]])
+        with self._lock:
+            self._sync_version(forecast_store.version)
+            self._entries[key] = (response, counts)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._stats["lru_evictions"] += 1
+            self._index = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._index = None
+            self._version = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._entries), "data_version": self._version, "threshold": self.threshold, **self._stats}
+
+
+copilot_cache = CopilotAnswerCache()
+forecast_store.subscribe(copilot_cache.on_store_change)
@@ -0,0 +1,180 @@
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.services.rollups import rollups
+
+TOP_K = 5
+
+# Which fact tables a question needs, by keyword; questions matching none get all of them
+FACT_KEYWORDS = {
+    "top_drivers": ("driver", "influenc", "why", "cause", "reason", "factor", "promotion", "weather"),
+    "anomalies": ("anomal", "spike", "drop", "unusual", "outlier", "underperform", "decline", "which store"),
+    "week_over_week": ("week", "trend", "compare", "change", "rising", "falling", "increase", "decrease", "wow"),
+}
+SIGNAL_FACTS = {"anomalies": "anomalies", "promotions": "top_drivers", "weather": "top_drivers", "socialTrends": "top_drivers"}
+
+
+def _clean(value: Any) -> Optional[str]:
+    if not value or (isinstance(value, str) and value.lower().startswith("all ")):
+        return None
+    return value
+
+
+def normalize_copilot_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Map the dashboard filter payload to store query arguments."""
+    return {
+        "sku": _clean(filters.get("sku")),
+        "store": _clean(filters.get("store")),
+        "start": filters.get("startDate") or None,
+        "end": filters.get("endDate") or None,
+        "signals": sorted(name for name in SIGNAL_FACTS if filters.get(name)),
+    }
+
+
+def select_facts(query: str, signals: List[str]) -> List[str]:
+    query_lower = query.lower()
+    wanted = [name for name, words in FACT_KEYWORDS.items() if any(w in query_lower for w in words)]
+    for signal in signals:
+        if SIGNAL_FACTS[signal] not in wanted:
+            wanted.append(SIGNAL_FACTS[signal])
+    return wanted or list(FACT_KEYWORDS)
+
+
+def top_drivers(drivers: pd.DataFrame, k: int = TOP_K) -> List[Dict[str, Any]]:
+    if drivers.empty:
+        return []
+    grouped = drivers.groupby("driver", sort=False)[["rows", "predicted_sum"]].sum()
+    total_rows = grouped["rows"].sum()
+    total_units = grouped["predicted_sum"].sum()
+    grouped = grouped.nlargest(k, "rows")
+    return [
+        {
+            "driver": driver,
+            "share": round(row.rows / total_rows, 3),
+            "unit_share": round(row.predicted_sum / total_units, 3) if total_units else None,
+            "forecasts": int(row.rows),
+        }
+        for driver, row in grouped.iterrows()
+    ]
+
+
+def anomalous_store_days(daily: pd.DataFrame, k: int = TOP_K, direction: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Store-days ranked by deviation from baseline; direction "up"/"down" keeps one side."""
+    if daily.empty:
+        return []
+    grouped = daily.groupby(["store_id", "forecast_date"], sort=False)[
+        ["predicted_sum", "hist_4w_sum", "hist_var_sum", "anomaly_count"]
+    ].sum()
+    std = np.sqrt(grouped["hist_var_sum"].to_numpy())
+    deviation = grouped["predicted_sum"].to_numpy() - grouped["hist_4w_sum"].to_numpy()
+    z = np.divide(deviation, std, out=np.zeros_like(deviation), where=std > 0)
+    # Flagged anomalies rank alongside statistical outliers
+    score = np.abs(z) + grouped["anomaly_count"].to_numpy() * 2.0
+    if direction == "up":
+        score = np.where(deviation > 0, score, 0.0)
+    elif direction == "down":
+        score = np.where(deviation < 0, score, 0.0)
+    order = np.argsort(-score)[:k]
+    facts = []
+    for i in order:
+        if score[i] <= 0:
+            break
+        store_id, day = grouped.index[i]
+        baseline = grouped["hist_4w_sum"].iat[i]
+        facts.append({
+            "store": store_id,
+            "date": day.date().isoformat(),
+            "predicted": int(grouped["predicted_sum"].iat[i]),
+            "baseline": int(baseline),
+            "deviation_pct": round(deviation[i] / baseline * 100, 1) if baseline else None,
+            "z_score": round(float(z[i]), 2),
+            "flagged": int(grouped["anomaly_count"].iat[i]),
+        })
+    return facts
+
+
+def week_over_week(daily: pd.DataFrame, end: Any = None, k: int = TOP_K) -> Dict[str, Any]:
+    if daily.empty:
+        return {}
+    end_ts = pd.Timestamp(end) if end else daily["forecast_date"].max()
+    this_start = end_ts - pd.Timedelta(days=6)
+    prev_start = end_ts - pd.Timedelta(days=13)
+    dates = daily["forecast_date"]
+    this_week = daily[(dates >= this_start) & (dates <= end_ts)].groupby("sku_id")["predicted_sum"].sum()
+    prev_week = daily[(dates >= prev_start) & (dates < this_start)].groupby("sku_id")["predicted_sum"].sum()
+    both = pd.concat([this_week.rename("this_week"), prev_week.rename("prev_week")], axis=1).fillna(0.0)
+    both["delta"] = both["this_week"] - both["prev_week"]
+    movers = both.reindex(both["delta"].abs().nlargest(k).index)
+    this_total, prev_total = both["this_week"].sum(), both["prev_week"].sum()
+    return {
+        "week_ending": end_ts.date().isoformat(),
+        "this_week": int(this_total),
+        "prev_week": int(prev_total),
+        "delta_pct": round((this_total - prev_total) / prev_total * 100, 1) if prev_total else None,
+        "movers": [
+            {
+                "sku": sku,
+                "this_week": int(row.this_week),
+                "prev_week": int(row.prev_week),
+                "delta_pct": round(row.delta / row.prev_week * 100, 1) if row.prev_week else None,
+            }
+            for sku, row in movers.iterrows()
+        ],
+    }
+
+
+def build_copilot_facts(query: str, filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Compute the aggregate facts a copilot question needs for its filter context."""
+    ctx = normalize_copilot_filters(filters)
+    scope = (ctx["start"], ctx["end"], ctx["sku"], ctx["store"])
+    # store×day answers everything but per-SKU movers unless a SKU is selected
+    cube = rollups.cube_slice(rollups.cube_for(ctx["sku"]), *scope)
+    facts: Dict[str, Any] = {
+        "data_version": rollups.version,
+        "rows": int(cube["rows"].sum()) if not cube.empty else 0,
+        "tables": {},
+    }
+    if cube.empty:
+        return facts
+    facts["date_span"] = [
+        cube["forecast_date"].min().date().isoformat(),
+        cube["forecast_date"].max().date().isoformat(),
+    ]
+    for name in select_facts(query, ctx["signals"]):
+        if name == "top_drivers":
+            facts["tables"][name] = top_drivers(rollups.cube_slice(rollups.driver_cube_for(ctx["sku"]), *scope))
+        elif name == "anomalies":
+            facts["tables"][name] = anomalous_store_days(cube)
+        elif name == "week_over_week":
+            facts["tables"][name] = week_over_week(rollups.daily_slice(*scope), ctx["end"])
+    return facts
+
+
+def _table(rows: List[Dict[str, Any]]) -> str:
+    if not rows:
+        return "(none)"
+    headers = list(rows[0])
+    lines = [" | ".join(headers)]
+    lines += [" | ".join("-" if row[h] is None else str(row[h]) for h in headers) for row in rows]
+    return "\n".join(lines)
+
+
+def render_copilot_facts(facts: Dict[str, Any]) -> str:
+    """Compact text tables for the LLM prompt."""
+    if not facts.get("rows"):
+        return "No ingested forecast data matches this context."
+    sections = [f"{facts['rows']} forecasts from {facts['date_span'][0]} to {facts['date_span'][1]}."]
+    tables = facts["tables"]
+    if "top_drivers" in tables:
+        sections.append("TOP DRIVERS (share of forecasts):\n" + _table(tables["top_drivers"]))
+    if "anomalies" in tables:
+        sections.append("ANOMALOUS STORE-DAYS (predicted vs 4-week baseline):\n" + _table(tables["anomalies"]))
+    if tables.get("week_over_week"):
+        wow = tables["week_over_week"]
+        sections.append(
+            f"WEEK OVER WEEK (week ending {wow['week_ending']}): {wow['prev_week']} -> {wow['this_week']} units"
+            f" ({'-' if wow['delta_pct'] is None else str(wow['delta_pct']) + '%'})\n" + _table(wow["movers"])
+        )
+    return "\n\n".join(sections)
@@ -0,0 +1,172 @@
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Set, Tuple
+
+from app.services.copilot_facts import (
+    anomalous_store_days,
+    normalize_copilot_filters,
+    top_drivers,
+    week_over_week,
+)
+from app.services.rollups import rollups
+
+ROUTER_CONFIDENCE = float(os.getenv("COPILOT_ROUTER_CONFIDENCE", 0.8))
+
+WHY = r"\b(why|cause[ds]?|caused|reason|explain|what drove|behind)\b"
+UP = r"\b(spike[ds]?|surge[ds]?|jump(ed|s)?|increas\w*|ris(e|es|ing)|rose|higher)\b"
+DOWN = r"\b(drop(ped|s)?|declin\w*|fall(ing|s)?|fell|decreas\w*|lower|dip(ped|s)?)\b"
+
+# intent -> (patterns that must all match, confidence when they do)
+INTENT_RULES = {
+    "top_drivers": [((r"\b(drivers?|influenc\w*|biggest factor|main factor|what drives)\b",), 0.9)],
+    "anomalies": [
+        ((r"\b(anomal\w*|outliers?|unusual|underperform\w*)\b", r"\b(which|where|any|list|show)\b"), 0.95),
+        ((r"\b(anomal\w*|outliers?|unusual|underperform\w*)\b",), 0.85),
+    ],
+    "why_spike": [((WHY, UP), 0.9), ((UP,), 0.6)],
+    "drop": [((WHY, DOWN), 0.9), ((DOWN,), 0.7)],
+    "compare": [((r"\b(compare|comparison|vs\.?|versus|week over week|wow|last week vs)\b",), 0.85)],
+}
+# Phrases that signal a forward-looking or advisory question the aggregates cannot answer
+OPEN_ENDED = r"\b(should|recommend|what if|how (can|do|should)|predict|next|when will|when is|plan|strategy)\b"
+
+
+@dataclass
+class Route:
+    intent: str
+    confidence: float
+
+    @property
+    def fast_path(self) -> bool:
+        return self.intent != "open_ended" and self.confidence >= ROUTER_CONFIDENCE
+
+
+def classify_query(query: str) -> Route:
+    """Deterministic, rule-based intent classification."""
+    text = query.lower()
+    scores: Dict[str, float] = {}
+    for intent, rules in INTENT_RULES.items():
+        for patterns, confidence in rules:
+            if all(re.search(p, text) for p in patterns):
+                scores[intent] = max(scores.get(intent, 0.0), confidence)
+    if not scores:
+        return Route("open_ended", 1.0)
+    ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+    intent, confidence = ranked[0]
+    # Two strong competing intents means the question is ambiguous
+    if len(ranked) > 1 and ranked[1][1] >= ROUTER_CONFIDENCE:
+        confidence -= 0.2
+    if re.search(OPEN_ENDED, text):
+        confidence -= 0.3
+    return Route(intent, round(max(confidence, 0.0), 2))
+
+
+_entity_cache: Tuple[int, Set[str], Set[str]] = (-1, set(), set())
+_entity_lock = threading.Lock()
+
+
+def _known_entities() -> Tuple[Set[str], Set[str]]:
+    global _entity_cache
+    version, skus, stores = _entity_cache
+    if version != rollups.version:
+        daily = rollups.sorted_view("daily")
+        with _entity_lock:
+            skus = set(daily.skus)
+            stores = set(daily.codes["store_id"][1])
+            _entity_cache = (rollups.version, skus, stores)
+    return skus, stores
+
+
+def extract_entities(query: str) -> Dict[str, str]:
+    """SKU / store ids mentioned verbatim in the question override the filter context."""
+    skus, stores = _known_entities()
+    tokens = {t.lower(): t for t in re.findall(r"[\w\-]+", query)}
+    found: Dict[str, str] = {}
+    for sku in skus:
+        if sku.lower() in tokens:
+            found["sku"] = sku
+    for store in stores:
+        if store.lower() in tokens:
+            found["store"] = store
+    return found
+
+
+def _pct(value: Optional[float]) -> str:
+    return "n/a" if value is None else f"{value:+.1f}%"
+
+
+def _detail_action(sku: Optional[str], store: str, day: str) -> Dict[str, Any]:
+    return {
+        "type": "show_forecast_detail",
+        "params": {"sku": sku, "store": store, "forecast_date": day},
+    }
+
+
+def answer_from_aggregates(route: Route, query: str, filters: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Answer a high-confidence intent straight from the rollups; None if the data can't."""
+    ctx = normalize_copilot_filters(filters)
+    ctx.update(extract_entities(query))
+    window = (ctx["start"], ctx["end"], ctx["sku"], ctx["store"])
+    cube = rollups.cube_slice(rollups.cube_for(ctx["sku"]), *window)
+    if cube.empty:
+        return None
+    driver_cube = rollups.driver_cube_for(ctx["sku"])
+    scope = f"{ctx['sku'] or 'all SKUs'} at {ctx['store'] or 'all stores'}"
+    answer: Optional[str] = None
+    highlight = action = None
+
+    if route.intent == "top_drivers":
+        drivers = top_drivers(rollups.cube_slice(driver_cube, *window), k=3)
+        if not drivers:
+            return None
+        listed = ", ".join(f"{d['driver']} ({d['share'] * 100:.0f}% of forecasts)" for d in drivers)
+        answer = f"Top drivers for {scope}: {listed}."
+
+    elif route.intent in ("anomalies", "why_spike", "drop"):
+        direction = {"why_spike": "up", "drop": "down"}.get(route.intent)
+        days = anomalous_store_days(cube, k=3, direction=direction)
+        if not days:
+            answer = f"No {'spikes' if direction == 'up' else 'drops' if direction == 'down' else 'anomalies'} stand out for {scope} in this period."
+        else:
+            top = days[0]
+            day_drivers = top_drivers(rollups.cube_slice(driver_cube, top["date"], top["date"], ctx["sku"], top["store"]), k=1)
+            driver_note = f" The primary driver that day was {day_drivers[0]['driver']}." if day_drivers else ""
+            if route.intent == "anomalies":
+                listed = "; ".join(f"{d['store']} on {d['date']} ({_pct(d['deviation_pct'])} vs baseline)" for d in days)
+                answer = f"Most anomalous store-days for {scope}: {listed}.{driver_note}"
+            else:
+                verb = "spiked" if direction == "up" else "dropped"
+                answer = (
+                    f"Demand for {scope} {verb} most at {top['store']} on {top['date']}: "
+                    f"{top['predicted']} units vs a {top['baseline']}-unit baseline ({_pct(top['deviation_pct'])}).{driver_note}"
+                )
+            highlight = {"date": top["date"], "sku": ctx["sku"], "store": top["store"]}
+            action = _detail_action(ctx["sku"], top["store"], top["date"])
+
+    elif route.intent == "compare":
+        # "promotion vs weather" compares drivers; anything else compares weeks
+        drivers = top_drivers(rollups.cube_slice(driver_cube, *window), k=20)
+        named = [d for d in drivers if d["driver"].split("_")[0] in query.lower()]
+        if named:
+            listed = " vs ".join(f"{d['driver']} {d['share'] * 100:.0f}%" for d in named)
+            answer = f"Share of forecasts driven by each factor for {scope}: {listed}."
+        else:
+            wow = week_over_week(rollups.daily_slice(*window), ctx["end"], k=3)
+            movers = ", ".join(f"{m['sku']} ({_pct(m['delta_pct'])})" for m in wow["movers"])
+            answer = (
+                f"Week ending {wow['week_ending']}: {wow['this_week']} units vs {wow['prev_week']} the week before "
+                f"({_pct(wow['delta_pct'])}) for {scope}." + (f" Biggest movers: {movers}." if movers else "")
+            )
+
+    if answer is None:
+        return None
+    return {
+        "answer": answer,
+        "chart_highlight": highlight,
+        "action": action,
+        "source": "fast_path",
+        "intent": route.intent,
+        "confidence": route.confidence,
+    }
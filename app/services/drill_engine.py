@@ -0,0 +1,231 @@
+import base64
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.forecast_store import to_timestamp
+from app.services.rollups import SortedTable, rollups
+
+DRILL_CACHE_SIZE = int(os.getenv("DRILL_CACHE_SIZE", 16))
+MAX_PAGE_SIZE = 1000
+
+KEY_COLUMNS = ["sku_id", "store_id", "product_category"]
+NUMERIC_COLUMNS = [
+    "forecasts", "predicted", "actual", "abs_error", "error_pct", "bias_pct",
+    "missed", "confidence", "overrides", "anomalies",
+]
+DEFAULT_COLUMNS = ["sku_id", "store_id", "predicted", "actual", "error_pct", "missed", "confidence"]
+# metric -> (row filter column, default sort column, default order)
+METRICS = {
+    "missed": ("missed", "missed", "desc"),
+    "accuracy": ("actual_rows", "abs_error", "desc"),
+    "confidence": ("confidence_rows", "confidence", "asc"),
+    "override": ("overrides", "overrides", "desc"),
+    "all": (None, "predicted", "desc"),
+}
+
+
+class DrillError(ValueError):
+    pass
+
+
+class DrillSet:
+    """
+    Per sku×store drill rows for one filter and data version, with sort orders
+    built lazily per (column, direction) and reused by every later page.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+        self.keys = np.array([f"{sku}|{store}" for sku, store in zip(columns["sku_id"], columns["store_id"])], dtype=object)
+        self._orders: Dict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def sort_values(self, column: str, order: str) -> np.ndarray:
+        # Sort ascending on this; NaN goes last in either direction
+        values = self.columns[column]
+        values = -values if order == "desc" else values
+        return np.where(np.isnan(values), np.inf, values)
+
+    def order(self, column: str, order: str) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Presorted (row order, sort values, keys) with sku|store as the tiebreak."""
+        with self._lock:
+            cached = self._orders.get((column, order))
+            if cached is None:
+                values = self.sort_values(column, order)
+                rows = np.lexsort((self.keys, values))
+                cached = self._orders[(column, order)] = (rows, values[rows], self.keys[rows])
+            return cached
+
+    def has_order(self, column: str, order: str) -> bool:
+        return (column, order) in self._orders
+
+
+def _build(daily: SortedTable, metric: str, start: Any, end: Any, sku: Optional[str], store: Optional[str]) -> DrillSet:
+    lo, hi = daily.bounds(to_timestamp(start), to_timestamp(end))
+    mask = daily.mask(lo, hi, sku, store)
+    rows = np.arange(lo, hi) if mask is None else np.arange(lo, hi)[mask]
+
+    sku_codes, sku_labels = daily.codes["sku_id"]
+    store_codes, store_labels = daily.codes["store_id"]
+    category_codes, category_labels = daily.codes["product_category"]
+    pair = sku_codes[rows].astype(np.int64) * len(store_labels) + store_codes[rows]
+    groups, first, inverse = np.unique(pair, return_index=True, return_inverse=True)
+
+    def total(column: str) -> np.ndarray:
+        return np.bincount(inverse, weights=daily.values[rows, daily.columns[column]], minlength=len(groups))
+
+    sums = {col: total(col) for col in (
+        "rows", "predicted_sum", "actual_sum", "actual_rows", "abs_error_sum", "error_sum",
+        "miss_count", "confidence_sum", "confidence_rows", "override_count", "anomaly_count",
+    )}
+    with np.errstate(invalid="ignore", divide="ignore"):
+        actual = np.where(sums["actual_rows"] > 0, sums["actual_sum"], np.nan)
+        columns = {
+            "sku_id": np.asarray(sku_labels)[groups // len(store_labels)],
+            "store_id": np.asarray(store_labels)[groups % len(store_labels)],
+            "product_category": np.asarray(category_labels)[category_codes[rows[first]]],
+            "forecasts": sums["rows"],
+            "predicted": sums["predicted_sum"],
+            "actual": actual,
+            "abs_error": np.where(sums["actual_rows"] > 0, sums["abs_error_sum"], np.nan),
+            "error_pct": sums["abs_error_sum"] / actual * 100,
+            "bias_pct": sums["error_sum"] / actual * 100,
+            "missed": sums["miss_count"],
+            "confidence": np.where(sums["confidence_rows"] > 0, sums["confidence_sum"] / sums["confidence_rows"], np.nan),
+            "overrides": sums["override_count"],
+            "anomalies": sums["anomaly_count"],
+        }
+    filter_column = METRICS[metric][0]
+    if filter_column:
+        keep = (sums[filter_column] if filter_column in sums else columns[filter_column]) > 0
+        columns = {name: values[keep] for name, values in columns.items()}
+    return DrillSet(columns)
+
+
+_sets: "OrderedDict[Tuple, DrillSet]" = OrderedDict()
+_sets_lock = threading.Lock()
+
+
+def drill_set(metric: str, start: Any, end: Any, sku: Optional[str], store: Optional[str]) -> DrillSet:
+    """Drill rows for a filter, cached per data version so later pages skip the group-by."""
+    daily = rollups.sorted_view("daily")
+    key = (metric, start, end, sku, store, rollups.version)
+    with _sets_lock:
+        cached = _sets.get(key)
+        if cached is not None:
+            _sets.move_to_end(key)
+            return cached
+    built = _build(daily, metric, start, end, sku, store)
+    with _sets_lock:
+        _sets[key] = built
+        while len(_sets) > DRILL_CACHE_SIZE:
+            _sets.popitem(last=False)
+    return built
+
+
+def encode_cursor(sort: str, order: str, value: float, key: str) -> str:
+    raw = json.dumps({"s": sort, "o": order, "v": value, "k": key}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Dict[str, Any]:
+    try:
+        position = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as e:
+        raise DrillError(f"Invalid cursor: {e}")
+    # The seek compares v against float sort values and k against sku|store keys
+    if (
+        not isinstance(position, dict)
+        or not isinstance(position.get("v"), (int, float))
+        or isinstance(position.get("v"), bool)
+        or not isinstance(position.get("k"), str)
+    ):
+        raise DrillError("Invalid cursor")
+    return position
+
+
+def _page_rows(
+    drill: DrillSet, sort: str, order: str, limit: int, cursor: Optional[Dict[str, Any]]
+) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """Row numbers for one page, their sort values, and whether more rows follow it."""
+    if cursor is None and not drill.has_order(sort, order):
+        # First page with no index yet: top-K selection instead of a full sort
+        values = drill.sort_values(sort, order)
+        candidates = np.arange(len(values))
+        if limit < len(values):
+            candidates = np.argpartition(values, limit - 1)[:limit]
+            # Rows tied with the K-th value may fall outside the partition; include them all
+            candidates = np.union1d(candidates, np.flatnonzero(values == values[candidates].max()))
+        ranked = candidates[np.lexsort((drill.keys[candidates], values[candidates]))][:limit]
+        return ranked, values[ranked], len(values) > limit
+    rows, values, keys = drill.order(sort, order)
+    start = 0
+    if cursor is not None:
+        # Seek past (value, key): O(log n) whatever the page depth
+        lo = int(np.searchsorted(values, cursor["v"], side="left"))
+        hi = int(np.searchsorted(values, cursor["v"], side="right"))
+        start = lo + int(np.searchsorted(keys[lo:hi], cursor["k"], side="right"))
+    return rows[start:start + limit], values[start:start + limit], start + limit < len(rows)
+
+
+def _cell(value: Any) -> Any:
+    if isinstance(value, (float, np.floating)):
+        return None if np.isnan(value) else round(float(value), 4)
+    if isinstance(value, np.integer):
+        return int(value)
+    return value
+
+
+def drill_page(
+    metric: str,
+    start: Any = None,
+    end: Any = None,
+    sku: Optional[str] = None,
+    store: Optional[str] = None,
+    sort: Optional[str] = None,
+    order: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    columns: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    """One page of drill-through rows, keyset-paginated on (sort value, sku|store)."""
+    if metric not in METRICS:
+        raise DrillError(f"Unknown metric '{metric}'; expected one of {', '.join(METRICS)}")
+    _, default_sort, default_order = METRICS[metric]
+    sort, order = sort or default_sort, order or default_order
+    if sort not in NUMERIC_COLUMNS:
+        raise DrillError(f"Cannot sort by '{sort}'; numeric columns are {', '.join(NUMERIC_COLUMNS)}")
+    if order not in ("asc", "desc"):
+        raise DrillError("order must be asc or desc")
+    columns = columns or DEFAULT_COLUMNS
+    unknown = [c for c in columns if c not in KEY_COLUMNS and c not in NUMERIC_COLUMNS]
+    if unknown:
+        raise DrillError(f"Unknown columns: {', '.join(unknown)}")
+    position = decode_cursor(cursor) if cursor else None
+    if position is not None and (position.get("s"), position.get("o")) != (sort, order):
+        raise DrillError("Cursor was issued for a different sort")
+
+    drill = drill_set(metric, start, end, sku, store)
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    page, page_values, has_more = _page_rows(drill, sort, order, limit, position)
+    next_cursor = None
+    if has_more:
+        next_cursor = encode_cursor(sort, order, float(page_values[-1]), drill.keys[page[-1]])
+    return {
+        "columns": columns,
+        # Only the requested columns are materialized
+        "rows": [[_cell(drill.columns[c][i]) for c in columns] for i in page],
+        "total": len(drill),
+        "sort": sort,
+        "order": order,
+        "next_cursor": next_cursor,
+        "data_version": rollups.version,
+    }
@@ -0,0 +1,181 @@
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import date
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from app.services.explanation_store import ExplanationStore, explanation_store
+from app.services.forecast_store import ForecastStore, forecast_store, to_timestamp
+
+# Observations on each side of a change used to measure the shift in driver share
+DRIVER_SHARE_WINDOW = int(os.getenv("DRIVER_SHARE_WINDOW", 7))
+# Drivers that say nothing about what moved demand
+IGNORED_DRIVERS = {"unknown", ""}
+
+Series = Tuple[str, str]
+
+
+class Run(NamedTuple):
+    # None for a stretch with no usable driver ("unknown"); it ends the run before it
+    driver: Optional[str]
+    first: date
+    last: date
+    length: int
+
+
+def run_lengths(history: Dict[date, Optional[str]]) -> List[Run]:
+    """Run-length encode a series' top_influencer history in date order."""
+    runs: List[Run] = []
+    for day in sorted(history):
+        driver = history[day]
+        if runs and runs[-1].driver == driver:
+            runs[-1] = runs[-1]._replace(last=day, length=runs[-1].length + 1)
+        else:
+            runs.append(Run(driver, day, day, 1))
+    return runs
+
+
+def _share(runs: List[Run], driver: str, index: int, step: int, window: int) -> float:
+    """Share of `driver` over up to `window` observations walking runs from `index` by `step`."""
+    seen = hits = 0
+    while 0 <= index < len(runs) and seen < window:
+        take = min(runs[index].length, window - seen)
+        seen += take
+        hits += take if runs[index].driver == driver else 0
+        index += step
+    return hits / seen if seen else 0.0
+
+
+def change_points(series: Series, runs: List[Run], window: int = DRIVER_SHARE_WINDOW) -> List[Dict[str, Any]]:
+    """
+    One record per run boundary: the day the primary driver switched, and how
+    far its share moved. A switch across an unknown stretch is compared with
+    the last known driver; the same driver on both sides is no change.
+    """
+    changes = []
+    for i in range(1, len(runs)):
+        previous = i - 1 if runs[i - 1].driver is not None else i - 2
+        if runs[i].driver is None or previous < 0 or runs[previous].driver == runs[i].driver:
+            continue
+        before, after = _share(runs, runs[i].driver, i - 1, -1, window), _share(runs, runs[i].driver, i, 1, window)
+        changes.append({
+            "sku_id": series[0],
+            "store_id": series[1],
+            "date": runs[i].first,
+            "from_driver": runs[previous].driver,
+            "to_driver": runs[i].driver,
+            "share_before": round(before, 3),
+            "share_after": round(after, 3),
+            "magnitude": round(after - before, 3),
+        })
+    return changes
+
+
+def _rank(change: Dict[str, Any]) -> Tuple[float, int, str, str]:
+    return (-abs(change["magnitude"]), -change["date"].toordinal(), change["sku_id"], change["store_id"])
+
+
+class DriverChangeTracker:
+    """
+    Top-driver history per sku×store, kept in run-length form, with the change
+    points between runs ranked by the shift in driver share.
+
+    Drivers come from ingested forecast rows (top_influencer) and from recorded
+    explanations; each delta only re-encodes the series it touches and swaps
+    that series' change points in the ranked list, so serving a storycard is a
+    lookup over the ranked changes. An unknown driver ends the run it replaces.
+    """
+
+    def __init__(self, forecasts: ForecastStore, explanations: ExplanationStore):
+        self._forecasts = forecasts
+        self._explanations = explanations
+        self._lock = threading.RLock()
+        self._history: Dict[Series, Dict[date, Optional[str]]] = {}
+        self._runs: Dict[Series, List[Run]] = {}
+        self._changes: Dict[Series, List[Dict[str, Any]]] = {}
+        # Every series' change points, kept sorted by _rank
+        self._ranked: List[Dict[str, Any]] = []
+        self._rebuild()
+        forecasts.subscribe(self.on_forecast_change)
+        explanations.subscribe(self.on_explanations)
+
+    def _update(self, updates: List[Tuple[str, str, date, Optional[str]]]) -> None:
+        with self._lock:
+            touched = set()
+            for sku, store, day, driver in updates:
+                if driver is None or driver in IGNORED_DRIVERS:
+                    driver = None
+                    if (sku, store) not in self._history:
+                        continue
+                self._history.setdefault((sku, store), {})[day] = driver
+                touched.add((sku, store))
+            # Rebuilds sort once; deltas swap each touched series' changes in place
+            bulk = not self._ranked
+            for series in touched:
+                for change in self._changes.get(series, []):
+                    del self._ranked[bisect_left(self._ranked, _rank(change), key=_rank)]
+                self._runs[series] = run_lengths(self._history[series])
+                self._changes[series] = change_points(series, self._runs[series])
+                for change in self._changes[series]:
+                    if bulk:
+                        self._ranked.append(change)
+                    else:
+                        insort(self._ranked, change, key=_rank)
+            if bulk:
+                self._ranked.sort(key=_rank)
+
+    @staticmethod
+    def _frame_updates(frame: pd.DataFrame) -> List[Tuple[str, str, date, Optional[str]]]:
+        # Missing drivers are passed on too: a re-ingest without one ends the stored run
+        drivers = frame["top_influencer"].astype(object).where(frame["top_influencer"].notna(), None)
+        return list(zip(frame["sku_id"], frame["store_id"], frame["forecast_date"].dt.date, drivers))
+
+    def _rebuild(self) -> None:
+        with self._lock:
+            self._history, self._runs, self._changes, self._ranked = {}, {}, {}, []
+            self._update(self._frame_updates(self._forecasts.frame))
+            self._update([(e.sku_id, e.store_id, e.forecast_date, e.top_influencer) for e in self._explanations.all()])
+
+    def on_forecast_change(self, store: ForecastStore, delta: Optional[pd.DataFrame]) -> None:
+        if delta is None:
+            self._rebuild()
+        else:
+            self._update(self._frame_updates(delta))
+
+    def on_explanations(self, store: ExplanationStore, batch: Optional[list]) -> None:
+        if batch is None:
+            self._rebuild()
+        else:
+            self._update([(e.sku_id, e.store_id, e.forecast_date, e.top_influencer) for e in batch])
+
+    def runs(self, sku: str, store: str) -> List[Run]:
+        return list(self._runs.get((sku, store), []))
+
+    def changes(
+        self,
+        start: Any = None,
+        end: Any = None,
+        sku: Optional[str] = None,
+        store: Optional[str] = None,
+        limit: int = 1,
+    ) -> List[Dict[str, Any]]:
+        """Largest driver-share shifts dated within [start, end], biggest first."""
+        self._forecasts.refresh_if_stale()
+        start, end = to_timestamp(start), to_timestamp(end)
+        start, end = start and start.date(), end and end.date()
+        found = []
+        with self._lock:
+            for change in self._ranked:
+                if (start and change["date"] < start) or (end and change["date"] > end):
+                    continue
+                if (sku and change["sku_id"] != sku) or (store and change["store_id"] != store):
+                    continue
+                found.append(change)
+                if len(found) >= limit:
+                    break
+        return found
+
+
+driver_changes = DriverChangeTracker(forecast_store, explanation_store)
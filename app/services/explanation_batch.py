@@ -0,0 +1,123 @@
+import asyncio
+import os
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from app.models.forecast_explaination import ForecastExplanation
+from app.models.forecast_row import ForecastRow
+from app.services.explanation_store import explanation_store
+from app.services.forecast_explainer import generate_forecast_explanation
+from app.services.forecast_store import KEY_COLUMNS, forecast_store
+from app.utils.metrics import record_cache
+
+EXPLAIN_BATCH_LIMIT = int(os.getenv("EXPLAIN_BATCH_LIMIT", 500))
+# Explanations generated at once; each one is a Gemini call
+EXPLAIN_CONCURRENCY = int(os.getenv("EXPLAIN_CONCURRENCY", 4))
+
+Key = Tuple[str, str, date]
+
+
+def parse_keys(items: List[Dict[str, Any]]) -> List[Key]:
+    """(sku, store, date) keys from {sku_id|sku, store_id|store, forecast_date|date} objects."""
+    if not items:
+        raise ValueError("Empty key list provided")
+    if len(items) > EXPLAIN_BATCH_LIMIT:
+        raise ValueError(f"Too many keys (limit: {EXPLAIN_BATCH_LIMIT} per batch)")
+    keys = []
+    for i, item in enumerate(items):
+        sku = item.get("sku_id") or item.get("sku")
+        store = item.get("store_id") or item.get("store")
+        day = item.get("forecast_date") or item.get("date")
+        if not sku or not store or not day:
+            raise ValueError(f"Key {i} needs sku_id, store_id and forecast_date")
+        try:
+            keys.append((str(sku), str(store), datetime.strptime(str(day), "%Y-%m-%d").date()))
+        except ValueError:
+            raise ValueError(f"Key {i}: invalid forecast_date format; expected YYYY-MM-DD")
+    return keys
+
+
+def _clean(value: Any) -> Any:
+    if value is None or (not isinstance(value, (str, bool)) and pd.isna(value)):
+        return None
+    if isinstance(value, pd.Timestamp):
+        return value.date()
+    return value
+
+
+def stored_explanation(sku_id: str, store_id: str, forecast_date: date) -> Optional[ForecastExplanation]:
+    """
+    Explanation store lookup, counted in the "explanations" cache metrics. A
+    stored rule-based fallback is a miss, so it is regenerated once Gemini is back.
+    """
+    found = explanation_store.get(sku_id, store_id, forecast_date)
+    if found is not None and found.explanation_type == "rule_based":
+        found = None
+    record_cache("explanations", found is not None)
+    return found
+
+
+def record_generated(explanations: List[ForecastExplanation]) -> None:
+    """
+    Store explanations Gemini generated for ingested forecast rows. Rule-based
+    fallbacks are left out so an outage never reads as a driver change or a
+    confidence drop, and never replaces a real explanation.
+    """
+    explanation_store.record(exp for exp in explanations if exp.explanation_type == "ai_generated")
+
+
+def forecast_rows(keys: List[Key]) -> Dict[Key, Dict[str, Any]]:
+    """Ingested forecast rows for the keys, found with one join on the store frame."""
+    wanted = pd.DataFrame(keys, columns=KEY_COLUMNS)
+    wanted["forecast_date"] = pd.to_datetime(wanted["forecast_date"])
+    forecast_store.refresh_if_stale()
+    matched = forecast_store.frame.merge(wanted, on=KEY_COLUMNS, how="inner")
+    return {
+        (row["sku_id"], row["store_id"], row["forecast_date"].date()): {k: _clean(v) for k, v in row.items()}
+        for row in matched.to_dict("records")
+    }
+
+
+async def resolve_explanations(keys: List[Key], concurrency: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Explanations for every key, in request order, plus how many were served
+    from the explanation store, generated, or not found. Duplicate keys are
+    resolved once; misses are generated from their ingested forecast rows, at
+    most `concurrency` at a time, and stored. Keys with no ingested row come
+    back as source "not_found" and are never generated (or stored).
+    """
+    unique = list(dict.fromkeys(keys))
+    resolved: Dict[Key, Tuple[Optional[ForecastExplanation], str]] = {}
+    for key in unique:
+        found = stored_explanation(*key)
+        if found is not None:
+            resolved[key] = (found, "store")
+    missing = [key for key in unique if key not in resolved]
+    rows = forecast_rows(missing) if missing else {}
+    for key in missing:
+        if key not in rows:
+            resolved[key] = (None, "not_found")
+
+    semaphore = asyncio.Semaphore(max(1, concurrency or EXPLAIN_CONCURRENCY))
+
+    async def generate(key: Key) -> None:
+        row = ForecastRow(**{k: v for k, v in rows[key].items() if v is not None})
+        async with semaphore:
+            # The explainer blocks on Gemini; keep it off the event loop
+            explanation = await asyncio.to_thread(generate_forecast_explanation, row)
+        resolved[key] = (explanation, "generated")
+
+    await asyncio.gather(*(generate(key) for key in missing if key in rows))
+    record_generated([exp for exp, source in resolved.values() if source == "generated"])
+    counts = {"store": 0, "generated": 0, "not_found": 0}
+    for _, source in resolved.values():
+        counts[source] += 1
+    return [_entry(key, *resolved[key]) for key in keys], counts
+
+
+def _entry(key: Key, explanation: Optional[ForecastExplanation], source: str) -> Dict[str, Any]:
+    if explanation is None:
+        return {"sku_id": key[0], "store_id": key[1], "forecast_date": key[2], "source": source}
+    return {**explanation.model_dump(), "source": source}
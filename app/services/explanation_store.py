@@ -0,0 +1,91 @@
+import hashlib
+import logging
+import threading
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.models.forecast_explaination import ForecastExplanation
+
+logger = logging.getLogger(__name__)
+
+Key = Tuple[str, str, date]
+Listener = Callable[["ExplanationStore", Optional[List[ForecastExplanation]]], None]
+
+
+def _digest(exp: ForecastExplanation) -> int:
+    return int.from_bytes(hashlib.blake2b(exp.model_dump_json().encode(), digest_size=8).digest(), "big")
+
+
+class ExplanationStore:
+    """
+    In-process store of the latest explanation per (sku_id, store_id, forecast_date).
+
+    Only Gemini explanations of ingested forecast rows are recorded (see
+    explanation_batch.record_generated). Listeners are notified with each
+    recorded batch (or None on clear), so indexes over explanation history
+    update incrementally rather than rescanning.
+
+    `version` counts changes in this process. `fingerprint` is a digest of the
+    content (an order-independent sum of per-explanation hashes, kept
+    incrementally), so equal contents give equal fingerprints in any worker.
+    `updated_at` is the ISO time of the last change.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._listeners: List[Listener] = []
+        self._explanations: Dict[Key, ForecastExplanation] = {}
+        self.version = 0
+        self._fingerprint = 0
+        self.updated_at: Optional[str] = None
+
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, batch: Optional[List[ForecastExplanation]]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(self, batch)
+            except Exception as e:
+                logger.error(f"Explanation store listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+    def record(self, explanations: Iterable[ForecastExplanation]) -> None:
+        batch = [exp for exp in explanations if exp is not None]
+        if not batch:
+            return
+        with self._lock:
+            for exp in batch:
+                key = (exp.sku_id, exp.store_id, exp.forecast_date)
+                old = self._explanations.get(key)
+                if old is not None:
+                    self._fingerprint -= _digest(old)
+                self._fingerprint = (self._fingerprint + _digest(exp)) % (1 << 64)
+                self._explanations[key] = exp
+            self.version += 1
+            self.updated_at = datetime.now(timezone.utc).isoformat()
+            self._notify(batch)
+
+    @property
+    def fingerprint(self) -> str:
+        return f"{len(self._explanations)}-{self._fingerprint:016x}"
+
+    def get(self, sku_id: str, store_id: str, forecast_date: date) -> Optional[ForecastExplanation]:
+        return self._explanations.get((sku_id, store_id, forecast_date))
+
+    def all(self) -> List[ForecastExplanation]:
+        with self._lock:
+            return list(self._explanations.values())
+
+    def __len__(self) -> int:
+        return len(self._explanations)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._explanations.clear()
+            self.version = 0
+            self._fingerprint = 0
+            self.updated_at = datetime.now(timezone.utc).isoformat()
+            self._notify(None)
+
+
+explanation_store = ExplanationStore()
@@ -2,6 +2,8 @@ from typing import Optional, List, Dict, Any
 from app.models.forecast_row import ForecastRow
 from app.models.forecast_explaination import ForecastExplanation
 import app.services.context_fetcher as context_fetcher
+from app.utils.circuit_breaker import CircuitOpenError, gemini_breaker
+from app.utils.metrics import GEMINI_FALLBACKS, timed_gemini_call
 import google.generativeai as genai
 import pandas as pd
 import json
@@ -121,7 +123,10 @@ Strictly output this JSON:
     # Call Gemini
     try:
         logger.debug("\n==== LLM PROMPT START ====\n%s\n==== LLM PROMPT END ====", prompt)
-        response = gemini_model.generate_content(
+        response = timed_gemini_call(
+            "explainer",
+            gemini_breaker.call,
+            gemini_model.generate_content,
             prompt,
             generation_config=genai.types.GenerationConfig(
                 temperature=0.3,
@@ -163,11 +168,17 @@ Strictly output this JSON:
             explanation_type="ai_generated"
         )
 
+    except CircuitOpenError:
+        # Gemini is known to be down; degrade to rules without waiting on the API
+        GEMINI_FALLBACKS.inc(reason="circuit_open")
+        return create_fallback_explanation(forecast_row, "AI service temporarily unavailable")
     except json.JSONDecodeError as e:
         print(f"[JSON Parse Error] {e} - Response: {output_text[:200]}..." )
+        GEMINI_FALLBACKS.inc(reason="parse_error")
         return create_fallback_explanation(forecast_row, "JSON parsing failed")
     except Exception as e:
         print(f"[Gemini API Error] {e}")
+        GEMINI_FALLBACKS.inc(reason="error")
         return create_fallback_explanation(forecast_row, f"AI service error: {str(e)}")
 
 def create_fallback_explanation(forecast_row: ForecastRow, error_msg: str) -> ForecastExplanation:
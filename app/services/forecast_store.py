@@ -0,0 +1,289 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.models.forecast_row import ForecastRow
+
+try:
+    import fcntl
+except ImportError:  # Windows: ingests are only serialized within one process
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+KEY_COLUMNS = ["sku_id", "store_id", "forecast_date"]
+STRING_COLUMNS = ["sku_id", "store_id", "product_category", "weather_type", "event_type", "top_influencer"]
+NUMERIC_COLUMNS = [
+    "predicted_demand", "hist_sales_1w", "hist_sales_4w_avg", "hist_sales_stddev",
+    "conf_interval_lower", "conf_interval_upper", "weather_severity", "social_sentiment_score",
+    "actual_demand", "override_demand",
+]
+FLAG_COLUMNS = ["holiday_flag", "promotion_flag", "anomaly_flag", "supply_constraint_flag"]
+DATE_COLUMNS = ["forecast_date", "generated_at"]
+COLUMNS = STRING_COLUMNS + DATE_COLUMNS + NUMERIC_COLUMNS + FLAG_COLUMNS
+
+# listener(store, delta): delta holds the newly ingested rows, or None after a full reload.
+# delta.attrs["replaced_generated_at"] lists the snapshots of the rows an ingest replaced.
+Listener = Callable[["ForecastStore", Optional[pd.DataFrame]], None]
+
+
+def _store_dir() -> str:
+    return os.getenv("FORECAST_STORE_DIR", "data/store")
+
+
+@contextmanager
+def _snapshot_lock(enabled: bool = True) -> Iterator[None]:
+    """Exclusive lock shared by every worker process using the store directory."""
+    if fcntl is None or not enabled:
+        yield
+        return
+    directory = _store_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, "store.lock"), "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def empty_frame() -> pd.DataFrame:
+    frame = pd.DataFrame({col: pd.Series(dtype=object) for col in STRING_COLUMNS})
+    for col in DATE_COLUMNS:
+        frame[col] = pd.Series(dtype="datetime64[ns]")
+    for col in NUMERIC_COLUMNS:
+        frame[col] = pd.Series(dtype="float64")
+    for col in FLAG_COLUMNS:
+        frame[col] = pd.Series(dtype=bool)
+    return frame[COLUMNS]
+
+
+def conform_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    """Add columns introduced after a snapshot was written, with their empty-frame dtype."""
+    missing = [col for col in COLUMNS if col not in frame]
+    if missing:
+        template = empty_frame()
+        frame = frame.copy()
+        for col in missing:
+            fill = False if col in FLAG_COLUMNS else None
+            frame[col] = pd.Series(fill, index=frame.index).astype(template[col].dtype)
+    return frame[COLUMNS]
+
+
+def rows_to_frame(rows: List[ForecastRow]) -> pd.DataFrame:
+    """Columnar view of validated rows with stable dtypes."""
+    if not rows:
+        return empty_frame()
+    frame = pd.DataFrame([row.model_dump(include=set(COLUMNS)) for row in rows])
+    for col in STRING_COLUMNS:
+        if col not in frame:
+            frame[col] = None
+        frame[col] = frame[col].astype(object)
+    for col in DATE_COLUMNS:
+        frame[col] = pd.to_datetime(frame[col]).astype("datetime64[ns]")
+    for col in NUMERIC_COLUMNS:
+        frame[col] = pd.to_numeric(frame[col], errors="coerce").astype("float64")
+    for col in FLAG_COLUMNS:
+        frame[col] = frame[col].fillna(False).astype(bool)
+    return frame[COLUMNS]
+
+
+def to_timestamp(value: Any) -> Optional[pd.Timestamp]:
+    """Accept date, datetime or YYYY-MM-DD strings from query params."""
+    if value in (None, ""):
+        return None
+    if isinstance(value, (date, datetime)):
+        return pd.Timestamp(value).normalize()
+    return pd.Timestamp(datetime.strptime(str(value)[:10], "%Y-%m-%d"))
+
+
+class ForecastStore:
+    """
+    In-process columnar store of every ingested forecast row.
+
+    Rows are upserted on (sku_id, store_id, forecast_date); a replaced row keeps
+    its actual_demand unless the new row brings one. Each ingest bumps
+    `version`, notifies listeners with the delta (rollups, indexes and caches hang
+    off this) and writes a snapshot so restarts and sibling workers see the data.
+
+    Persisting writes hold a file lock on the store directory and first load any
+    newer sibling snapshot, so concurrent workers never both write version N+1.
+    Writing a snapshot blocks, so async handlers call ingest and apply_actuals
+    through asyncio.to_thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._listeners: List[Listener] = []
+        self.frame = empty_frame()
+        self.version = 0
+        self.updated_at: Optional[str] = None
+        self._last_stale_check = 0.0
+
+    def subscribe(self, listener: Listener) -> None:
+        self._listeners.append(listener)
+
+    def _notify(self, delta: Optional[pd.DataFrame]) -> None:
+        for listener in self._listeners:
+            try:
+                listener(self, delta)
+            except Exception as e:
+                logger.error(f"Forecast store listener {getattr(listener, '__name__', listener)} failed: {e}")
+
+    def ingest(self, rows: List[ForecastRow], persist: bool = True) -> Dict[str, Any]:
+        delta = rows_to_frame(rows)
+        if delta.empty:
+            return self.info()
+        delta = delta.drop_duplicates(KEY_COLUMNS, keep="last").reset_index(drop=True)
+        with self._lock, _snapshot_lock(persist):
+            self.refresh_if_stale(interval=0)
+            delta = self._carry_over(delta)
+            combined = pd.concat([self.frame, delta], ignore_index=True) if len(self.frame) else delta
+            # Frames are replaced, never mutated, so readers can hold a reference lock-free
+            self.frame = combined.drop_duplicates(KEY_COLUMNS, keep="last").reset_index(drop=True)
+            self.version += 1
+            self.updated_at = datetime.now(timezone.utc).isoformat()
+            self._notify(delta)
+            if persist:
+                self.save()
+            return self.info()
+
+    def _carry_over(self, delta: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keep the recorded actual_demand of rows the delta replaces (a re-uploaded
+        forecast has none), and note which snapshots those rows came from.
+        """
+        delta.attrs["replaced_generated_at"] = []
+        frame = self.frame
+        if not len(frame):
+            return delta
+        positions = pd.MultiIndex.from_frame(frame[KEY_COLUMNS]).get_indexer(pd.MultiIndex.from_frame(delta[KEY_COLUMNS]))
+        found = positions >= 0
+        if not found.any():
+            return delta
+        replaced = frame.iloc[positions[found]]
+        previous = np.full(len(delta), np.nan)
+        previous[found] = replaced["actual_demand"].to_numpy(dtype=float)
+        actual = delta["actual_demand"].to_numpy(dtype=float)
+        delta = delta.assign(actual_demand=np.where(np.isnan(actual), previous, actual))
+        delta.attrs["replaced_generated_at"] = sorted(set(replaced["generated_at"].dropna()))
+        return delta
+
+    def apply_actuals(self, actuals: pd.DataFrame, persist: bool = True) -> Dict[str, Any]:
+        """
+        Record realized demand on existing forecast rows, matched by key.
+        Listeners get the updated rows as the delta; actuals for keys with no
+        forecast are counted as unmatched and dropped.
+        """
+        actuals = actuals.drop_duplicates(KEY_COLUMNS, keep="last")
+        with self._lock, _snapshot_lock(persist):
+            self.refresh_if_stale(interval=0)
+            frame = self.frame
+            positions = pd.MultiIndex.from_frame(frame[KEY_COLUMNS]).get_indexer(
+                pd.MultiIndex.from_frame(actuals[KEY_COLUMNS].astype({"forecast_date": "datetime64[ns]"}))
+            )
+            found = positions >= 0
+            if found.any():
+                column = frame["actual_demand"].to_numpy(dtype=float, copy=True)
+                column[positions[found]] = actuals["actual_demand"].to_numpy(dtype=float)[found]
+                self.frame = frame.assign(actual_demand=column)
+                self.version += 1
+                self.updated_at = datetime.now(timezone.utc).isoformat()
+                self._notify(self.frame.iloc[positions[found]].reset_index(drop=True))
+                if persist:
+                    self.save()
+            return {**self.info(), "matched": int(found.sum()), "unmatched": int((~found).sum())}
+
+    def query(
+        self,
+        start: Any = None,
+        end: Any = None,
+        sku: Optional[str] = None,
+        store: Optional[str] = None,
+    ) -> pd.DataFrame:
+        self.refresh_if_stale()
+        frame = self.frame
+        mask = np.ones(len(frame), dtype=bool)
+        start, end = to_timestamp(start), to_timestamp(end)
+        if start is not None:
+            mask &= (frame["forecast_date"] >= start).to_numpy()
+        if end is not None:
+            mask &= (frame["forecast_date"] <= end).to_numpy()
+        if sku:
+            mask &= (frame["sku_id"] == sku).to_numpy()
+        if store:
+            mask &= (frame["store_id"] == store).to_numpy()
+        return frame[mask]
+
+    def info(self) -> Dict[str, Any]:
+        return {"version": self.version, "rows": len(self.frame), "updated_at": self.updated_at}
+
+    # --- persistence --------------------------------------------------------------
+
+    def save(self) -> None:
+        directory = _store_dir()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            tmp_path = os.path.join(directory, "forecasts.pkl.tmp")
+            self.frame.to_pickle(tmp_path)
+            os.replace(tmp_path, os.path.join(directory, "forecasts.pkl"))
+            # version.json is what siblings poll; replace it whole, after the frame
+            tmp_meta = os.path.join(directory, "version.json.tmp")
+            with open(tmp_meta, "w") as f:
+                json.dump({"version": self.version, "updated_at": self.updated_at}, f)
+            os.replace(tmp_meta, os.path.join(directory, "version.json"))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not snapshot forecast store: {e}")
+
+    def _disk_version(self) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(_store_dir(), "version.json")) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def load(self) -> bool:
+        """Load the on-disk snapshot if it is newer than what is in memory."""
+        meta = self._disk_version()
+        if not meta or meta["version"] <= self.version:
+            return False
+        try:
+            frame = conform_frame(pd.read_pickle(os.path.join(_store_dir(), "forecasts.pkl")))
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load forecast store snapshot: {e}")
+            return False
+        with self._lock:
+            self.frame = frame
+            self.version = meta["version"]
+            self.updated_at = meta.get("updated_at")
+            self._notify(None)
+        logger.info(f"📦 Loaded forecast store v{self.version} ({len(frame)} rows)")
+        return True
+
+    def refresh_if_stale(self, interval: float = 1.0) -> None:
+        """Pick up snapshots written by sibling workers, checking at most once per interval."""
+        now = time.monotonic()
+        if now - self._last_stale_check < interval:
+            return
+        self._last_stale_check = now
+        meta = self._disk_version()
+        if meta and meta["version"] > self.version:
+            self.load()
+
+    def reset(self) -> None:
+        with self._lock:
+            self.frame = empty_frame()
+            self.version = 0
+            self.updated_at = None
+            self._notify(None)
+
+
+forecast_store = ForecastStore()
@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.forecast_store import to_timestamp
+from app.services.query_cache import Scope, query_cache
+from app.services.rollups import SortedTable, rollups
+
+KPI_SUMS = [
+    "rows", "actual_rows", "actual_sum", "abs_error_sum", "error_sum",
+    "miss_count", "confidence_rows", "confidence_sum", "override_count",
+]
+
+
+def _ratio(numerator: float, denominator: float) -> Optional[float]:
+    return float(numerator / denominator) if denominator else None
+
+
+def _period_kpis(sums: np.ndarray, missed_skus: int) -> Dict[str, Any]:
+    totals = dict(zip(KPI_SUMS, sums))
+    wape = _ratio(totals["abs_error_sum"], totals["actual_sum"])
+    return {
+        "forecasts": int(totals["rows"]),
+        "forecasts_with_actuals": int(totals["actual_rows"]),
+        # 1 - WAPE, floored at zero so one wild SKU cannot push accuracy negative
+        "forecast_accuracy": None if wape is None else round(max(0.0, 1.0 - wape), 4),
+        "bias": None if wape is None else round(_ratio(totals["error_sum"], totals["actual_sum"]), 4),
+        "confidence_score": None if not totals["confidence_rows"] else round(_ratio(totals["confidence_sum"], totals["confidence_rows"]), 4),
+        "missed_forecasts": int(totals["miss_count"]),
+        "missed_skus": missed_skus,
+        "overrides": int(totals["override_count"]),
+        "ai_override_pct": None if not totals["rows"] else round(_ratio(totals["override_count"], totals["rows"]), 4),
+    }
+
+
+def _period_sums(cube: SortedTable, lo: int, hi: int, sku: Optional[str], store: Optional[str]) -> np.ndarray:
+    mask = cube.mask(lo, hi, sku, store)
+    values = cube.values[lo:hi]
+    sums = values.sum(axis=0) if mask is None else values[mask].sum(axis=0)
+    return sums[[cube.columns[col] for col in KPI_SUMS]]
+
+
+def _missed_skus(daily: SortedTable, lo: int, hi: int, sku: Optional[str], store: Optional[str]) -> int:
+    """Distinct SKUs with a missed forecast, scanning only the sku×store×day rows that have misses."""
+    missed = daily.nonzero("miss_count")
+    rows = missed[np.searchsorted(missed, lo):np.searchsorted(missed, hi)]
+    mask = daily.code_mask(rows, sku, store)
+    if mask is not None:
+        rows = rows[mask]
+    return int(np.count_nonzero(np.bincount(daily.sku_codes[rows], minlength=len(daily.skus))))
+
+
+def _driver_breakdown(start: pd.Timestamp, end: pd.Timestamp, sku: Optional[str], store: Optional[str]) -> Dict[str, float]:
+    drivers = rollups.sorted_view(rollups.driver_cube_for(sku))
+    lo, hi = drivers.bounds(start, end)
+    mask = drivers.mask(lo, hi, sku, store)
+    codes, rows = drivers.label_codes[lo:hi], drivers.column("rows", lo, hi)
+    if mask is not None:
+        codes, rows = codes[mask], rows[mask]
+    counts = np.bincount(codes, weights=rows, minlength=len(drivers.labels))
+    total = counts.sum()
+    if not total:
+        return {}
+    order = np.argsort(-counts, kind="stable")
+    return {drivers.labels[i]: round(float(counts[i] / total), 3) for i in order if counts[i]}
+
+
+def compute_kpis(start: Any, end: Any, sku: Optional[str] = None, store: Optional[str] = None) -> Dict[str, Any]:
+    """
+    KPIs for [start, end] and for the equally long period just before it (for trends).
+    Sums come from the coarsest cube that answers the filter (store×day unless a
+    SKU is selected); cubes are date-sorted, so each period is a contiguous slice.
+    """
+    start, end = to_timestamp(start), to_timestamp(end)
+    if start is None or end is None or end < start:
+        raise ValueError("start and end dates are required and end must not precede start")
+    prev_start = start - (end - start) - pd.Timedelta(days=1)
+    return query_cache.get_or_compute(
+        "kpis", {"start": start, "end": end, "sku": sku, "store": store},
+        Scope(prev_start, end, sku, store),
+        lambda: _compute_kpis(start, end, prev_start, sku, store),
+    )
+
+
+def _compute_kpis(start: pd.Timestamp, end: pd.Timestamp, prev_start: pd.Timestamp, sku: Optional[str], store: Optional[str]) -> Dict[str, Any]:
+    cube, daily = rollups.sorted_view(rollups.cube_for(sku)), rollups.sorted_view("daily")
+
+    periods = {}
+    for name, (a, b) in (("current", (start, end)), ("previous", (prev_start, start - pd.Timedelta(days=1)))):
+        sums = _period_sums(cube, *cube.bounds(a, b), sku, store)
+        periods[name] = _period_kpis(sums, _missed_skus(daily, *daily.bounds(a, b), sku, store))
+    return {
+        "start": start.date().isoformat(),
+        "end": end.date().isoformat(),
+        "data_version": rollups.version,
+        **periods,
+        "top_influencer_breakdown": _driver_breakdown(start, end, sku, store),
+    }
+
+
+def _delta(current: Optional[float], previous: Optional[float], scale: float, suffix: str, digits: int) -> str:
+    if current is None or previous is None:
+        return "n/a"
+    return f"{(current - previous) * scale:+.{digits}f}{suffix}"
+
+
+def kpi_tiles(kpis: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Dashboard tile view of compute_kpis(); trends compare with the previous period."""
+    cur, prev = kpis["current"], kpis["previous"]
+    accuracy, confidence = cur["forecast_accuracy"], cur["confidence_score"]
+    return [
+        {
+            "key": "accuracy",
+            "title": "Forecast Accuracy",
+            "value": "n/a" if accuracy is None else f"{accuracy * 100:.1f}%",
+            "trend": _delta(accuracy, prev["forecast_accuracy"], 100, "%", 1),
+            "color": "green"
+        },
+        {
+            "key": "confidence",
+            "title": "Avg Confidence",
+            "value": "n/a" if confidence is None else f"{confidence:.2f}",
+            "trend": _delta(confidence, prev["confidence_score"], 1, "", 2),
+            "color": "blue"
+        },
+        {
+            "key": "missed",
+            "title": "Missed Forecasts",
+            "value": str(cur["missed_skus"]),
+            "trend": _delta(cur["missed_skus"], prev["missed_skus"], 1, "", 0),
+            "color": "red"
+        },
+        {
+            "key": "override",
+            "title": "AI Overrides",
+            "value": str(cur["overrides"]),
+            "trend": _delta(cur["overrides"], prev["overrides"], 1, "", 0),
+            "color": "orange"
+        },
+    ]
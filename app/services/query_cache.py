@@ -0,0 +1,206 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import pandas as pd
+
+from app.services.forecast_store import ForecastStore, forecast_store, to_timestamp
+from app.utils import cache_codec
+from app.utils.redis_pool import get_redis
+
+logger = logging.getLogger(__name__)
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", 512))
+QUERY_CACHE_TTL = int(os.getenv("QUERY_CACHE_TTL", 600))
+# Ingest footprints remembered for range invalidation; older entries are dropped wholesale
+QUERY_CACHE_TOUCH_LOG = int(os.getenv("QUERY_CACHE_TOUCH_LOG", 256))
+REDIS_PREFIX = "qcache:"
+
+
+class Scope(NamedTuple):
+    """The slice of forecast data a cached result was computed from; None is unbounded."""
+    start: Optional[pd.Timestamp] = None
+    end: Optional[pd.Timestamp] = None
+    sku: Optional[str] = None
+    store: Optional[str] = None
+
+
+class Touch(NamedTuple):
+    """Footprint of one ingest: the data version it produced and what it changed."""
+    version: int
+    updated_at: Optional[str]
+    first: pd.Timestamp
+    last: pd.Timestamp
+    skus: frozenset
+    stores: frozenset
+
+    def overlaps(self, scope: Scope) -> bool:
+        return (
+            (scope.end is None or self.first <= scope.end)
+            and (scope.start is None or self.last >= scope.start)
+            and (not scope.sku or scope.sku in self.skus)
+            and (not scope.store or scope.store in self.stores)
+        )
+
+
+def normalize_filters(filters: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonical filters: ISO dates, blanks as None, list values sorted and de-duplicated."""
+    normalized = {}
+    for name, value in sorted(filters.items()):
+        if isinstance(value, (list, tuple, set)):
+            value = sorted({str(v) for v in value if v})
+        elif isinstance(value, (date, pd.Timestamp)):
+            value = to_timestamp(value).date().isoformat()
+        elif value == "":
+            value = None
+        normalized[name] = value
+    return normalized
+
+
+def cache_key(name: str, filters: Dict[str, Any]) -> str:
+    raw = json.dumps(normalize_filters(filters), sort_keys=True, default=str)
+    return f"{name}:{hashlib.sha1(raw.encode()).hexdigest()[:24]}"
+
+
+def _encode_scope(scope: Scope) -> List[Optional[str]]:
+    return [scope.start and scope.start.isoformat(), scope.end and scope.end.isoformat(), scope.sku, scope.store]
+
+
+def _decode_scope(raw: List[Optional[str]]) -> Scope:
+    return Scope(to_timestamp(raw[0]), to_timestamp(raw[1]), raw[2], raw[3])
+
+
+class QueryCache:
+    """
+    Two-tier cache of dashboard query results: an in-process LRU in front of
+    Redis, shared by every worker.
+
+    Entries are keyed by endpoint and normalized filters. Each entry records the
+    data version it was computed at and the Scope it read. Rather than putting
+    the version in the key (which would drop every entry on every ingest), each
+    ingest is logged as a Touch; an entry is stale only if a later touch overlaps
+    its scope. Touched local entries are evicted, along with their Redis copies.
+    A snapshot reload has no delta, so it invalidates all older entries.
+    Local entries also expire after QUERY_CACHE_TTL, like their Redis copies, so
+    an invalidation one worker missed cannot keep a result alive forever.
+    """
+
+    def __init__(self, store: ForecastStore, redis_client: Any = None, max_entries: int = QUERY_CACHE_SIZE):
+        self._store = store
+        self.redis = redis_client
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        # key -> (value, version, updated_at, scope, expires at on the monotonic clock)
+        self._local: "OrderedDict[str, Tuple[Any, int, Optional[str], Scope, float]]" = OrderedDict()
+        self._touches: List[Touch] = []
+        self._floor: Tuple[int, Optional[str]] = (store.version, store.updated_at)
+        self._stats = {"local_hits": 0, "redis_hits": 0, "misses": 0, "invalidated": 0, "redis_errors": 0}
+        store.subscribe(self.on_store_change)
+
+    # --- invalidation -------------------------------------------------------------
+
+    def on_store_change(self, store: ForecastStore, delta: Optional[pd.DataFrame]) -> None:
+        with self._lock:
+            if delta is None:
+                self._stats["invalidated"] += len(self._local)
+                self._local.clear()
+                self._touches = []
+                self._floor = (store.version, store.updated_at)
+                return
+            touch = Touch(
+                store.version, store.updated_at,
+                delta["forecast_date"].min(), delta["forecast_date"].max(),
+                frozenset(delta["sku_id"]), frozenset(delta["store_id"]),
+            )
+            self._touches.append(touch)
+            if len(self._touches) > QUERY_CACHE_TOUCH_LOG:
+                dropped = self._touches.pop(0)
+                self._floor = (dropped.version, dropped.updated_at)
+            stale = [key for key, entry in self._local.items() if touch.overlaps(entry[3])]
+            for key in stale:
+                del self._local[key]
+            self._stats["invalidated"] += len(stale)
+        if stale and self.redis is not None:
+            try:
+                self.redis.delete(*[REDIS_PREFIX + key for key in stale])
+            except Exception:
+                self._stats["redis_errors"] += 1
+
+    def _valid(self, version: int, updated_at: Optional[str], scope: Scope) -> bool:
+        # Caller holds the lock. The entry's version must be one this worker knows
+        # (the reload floor or a logged ingest) and no later ingest may overlap it.
+        known = (version, updated_at) == self._floor or any(
+            (t.version, t.updated_at) == (version, updated_at) for t in self._touches
+        )
+        return known and not any(t.version > version and t.overlaps(scope) for t in self._touches)
+
+    # --- lookup -------------------------------------------------------------------
+
+    def get_or_compute(self, name: str, filters: Dict[str, Any], scope: Scope, compute: Callable[[], Any]) -> Any:
+        self._store.refresh_if_stale()
+        key = cache_key(name, filters)
+        with self._lock:
+            entry = self._local.get(key)
+            if entry is not None and entry[4] > time.monotonic() and self._valid(entry[1], entry[2], entry[3]):
+                self._local.move_to_end(key)
+                self._stats["local_hits"] += 1
+                return entry[0]
+        shared = self._redis_get(key)
+        if shared is not None:
+            with self._lock:
+                if self._valid(shared["version"], shared["updated_at"], _decode_scope(shared["scope"])):
+                    self._remember(key, shared["value"], shared["version"], shared["updated_at"], scope)
+                    self._stats["redis_hits"] += 1
+                    return shared["value"]
+        # Label with the version seen before computing; an ingest racing the
+        # computation then makes the entry look older, never newer
+        version, updated_at = self._store.version, self._store.updated_at
+        value = compute()
+        with self._lock:
+            self._stats["misses"] += 1
+            self._remember(key, value, version, updated_at, scope)
+        self._redis_set(key, {"value": value, "version": version, "updated_at": updated_at, "scope": _encode_scope(scope)})
+        return value
+
+    def _remember(self, key: str, value: Any, version: int, updated_at: Optional[str], scope: Scope) -> None:
+        # Caller holds the lock
+        self._local[key] = (value, version, updated_at, scope, time.monotonic() + QUERY_CACHE_TTL)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_entries:
+            self._local.popitem(last=False)
+
+    def _redis_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self.redis is None:
+            return None
+        try:
+            raw = self.redis.get(REDIS_PREFIX + key)
+            return cache_codec.decode(raw) if raw else None
+        except Exception:
+            self._stats["redis_errors"] += 1
+            return None
+
+    def _redis_set(self, key: str, entry: Dict[str, Any]) -> None:
+        if self.redis is None:
+            return
+        try:
+            self.redis.setex(REDIS_PREFIX + key, QUERY_CACHE_TTL, cache_codec.encode(entry))
+        except Exception:
+            self._stats["redis_errors"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._local.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"entries": len(self._local), "touch_log": len(self._touches), **self._stats}
+
+
+# Shared pooled Redis client; every call goes through the redis breaker
+query_cache = QueryCache(forecast_store, get_redis())
@@ -0,0 +1,322 @@
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.forecast_store import ForecastStore, forecast_store, to_timestamp
+
+DAY_KEYS = ["sku_id", "store_id", "forecast_date"]
+DRIVER_VALUES = ["rows", "predicted_sum"]
+# cube name -> group keys. Each sku×store×day cube has a driver cube keyed by the
+# same keys plus top_influencer; coarser cubes are derived from the sku×store×day rows.
+CUBES = {
+    "daily": DAY_KEYS,
+    "store_day": ["store_id", "forecast_date"],
+    "category_day": ["product_category", "forecast_date"],
+}
+DRIVER_CUBES = {
+    "drivers": DAY_KEYS,
+    "store_day_drivers": ["store_id", "forecast_date"],
+    "category_day_drivers": ["product_category", "forecast_date"],
+}
+# filter argument -> key column
+FILTER_COLUMNS = {"sku": "sku_id", "store": "store_id", "category": "product_category"}
+# Relative error beyond which a forecast without an interval counts as missed
+MISS_TOLERANCE = float(os.getenv("METRICS_MISS_TOLERANCE", 0.2))
+SUM_COLUMNS = [
+    "rows", "predicted_sum", "hist_1w_sum", "hist_4w_sum", "hist_var_sum",
+    "anomaly_count", "promotion_count", "holiday_count", "rain_count", "event_count",
+    "actual_rows", "actual_sum", "abs_error_sum", "error_sum", "miss_count",
+    "confidence_rows", "confidence_sum", "override_count",
+]
+
+
+def _accuracy_columns(frame: pd.DataFrame) -> dict:
+    """Per-row error, interval-confidence and override terms; zero where the input is missing."""
+    predicted = frame["predicted_demand"].to_numpy(dtype=float)
+    actual = frame["actual_demand"].to_numpy(dtype=float)
+    lower = frame["conf_interval_lower"].to_numpy(dtype=float)
+    upper = frame["conf_interval_upper"].to_numpy(dtype=float)
+    override = frame["override_demand"].to_numpy(dtype=float)
+
+    has_actual = ~np.isnan(actual)
+    has_interval = ~np.isnan(lower) & ~np.isnan(upper)
+    error = np.where(has_actual, predicted - actual, 0.0)
+    with np.errstate(invalid="ignore"):
+        outside = has_interval & ((actual < lower) | (actual > upper))
+        off_by = np.abs(error) > MISS_TOLERANCE * np.where(has_actual, actual, 0.0)
+        # Narrow intervals relative to the forecast mean high confidence
+        confidence = np.clip(1.0 - (upper - lower) / (2.0 * np.maximum(predicted, 1.0)), 0.0, 1.0)
+    missed = has_actual & np.where(has_interval, outside, off_by)
+    return {
+        "actual_rows": has_actual.astype(np.int64),
+        "actual_sum": np.where(has_actual, actual, 0.0),
+        "abs_error_sum": np.abs(error),
+        "error_sum": error,
+        "miss_count": missed.astype(np.int64),
+        "confidence_rows": has_interval.astype(np.int64),
+        "confidence_sum": np.where(has_interval, confidence, 0.0),
+        "override_count": (~np.isnan(override) & (override != predicted)).astype(np.int64),
+    }
+
+
+def _has_event(event_type: pd.Series) -> pd.Series:
+    # CSV exports spell "no event" as an empty cell or the literal string None
+    return event_type.notna() & ~event_type.astype(str).str.lower().isin(["", "none", "nan"])
+
+
+def daily_partials(frame: pd.DataFrame) -> pd.DataFrame:
+    """Collapse raw rows to per sku×store×day sums/counts that later queries add up."""
+    work = pd.DataFrame({
+        "sku_id": frame["sku_id"],
+        "store_id": frame["store_id"],
+        "product_category": frame["product_category"].fillna("Uncategorized"),
+        "forecast_date": frame["forecast_date"],
+        "rows": 1,
+        "predicted_sum": frame["predicted_demand"].fillna(0.0),
+        "hist_1w_sum": frame["hist_sales_1w"].fillna(0.0),
+        "hist_4w_sum": frame["hist_sales_4w_avg"].fillna(0.0),
+        "hist_var_sum": frame["hist_sales_stddev"].fillna(0.0) ** 2,
+        "anomaly_count": frame["anomaly_flag"].astype(np.int64),
+        "promotion_count": frame["promotion_flag"].astype(np.int64),
+        "holiday_count": frame["holiday_flag"].astype(np.int64),
+        "rain_count": (frame["weather_type"] == "rain").astype(np.int64),
+        "event_count": _has_event(frame["event_type"]).astype(np.int64),
+        **_accuracy_columns(frame),
+    })
+    return work.groupby(DAY_KEYS, sort=False, as_index=False).agg(
+        {"product_category": "first", **{col: "sum" for col in SUM_COLUMNS}}
+    )
+
+
+def _driver_counts(frame: pd.DataFrame) -> pd.DataFrame:
+    drivers = frame.loc[frame["top_influencer"].notna(), DAY_KEYS + ["product_category", "top_influencer", "predicted_demand"]]
+    return (
+        drivers.rename(columns={"top_influencer": "driver"})
+        .assign(
+            product_category=drivers["product_category"].fillna("Uncategorized"),
+            rows=1,
+            predicted_sum=drivers["predicted_demand"].fillna(0.0),
+        )
+        .groupby(DAY_KEYS + ["driver"], sort=False, as_index=False)
+        .agg({"product_category": "first", "rows": "sum", "predicted_sum": "sum"})
+    )
+
+
+def _derive(daily: pd.DataFrame, drivers: pd.DataFrame) -> Dict[str, pd.DataFrame]:
+    """All cubes from sku×store×day partials and driver counts (any set of days)."""
+    cubes = {"daily": daily, "drivers": drivers}
+    for name, keys in CUBES.items():
+        if name != "daily":
+            cubes[name] = daily.groupby(keys, sort=False, as_index=False)[SUM_COLUMNS].sum()
+    for name, keys in DRIVER_CUBES.items():
+        if name != "drivers":
+            cubes[name] = drivers.groupby(keys + ["driver"], sort=False, as_index=False)[DRIVER_VALUES].sum()
+    return cubes
+
+
+def _split_days(frame: pd.DataFrame) -> Dict[pd.Timestamp, pd.DataFrame]:
+    return {day: part.reset_index(drop=True) for day, part in frame.groupby("forecast_date", sort=False)}
+
+
+def _replace_keys(old: Optional[pd.DataFrame], new: pd.DataFrame, keys: pd.MultiIndex) -> pd.DataFrame:
+    """Drop rows of `old` whose sku/store key is in `keys`, then append `new`."""
+    if old is None or old.empty:
+        return new.reset_index(drop=True)
+    stale = pd.MultiIndex.from_frame(old[["sku_id", "store_id"]]).isin(keys)
+    kept = old[~stale]
+    return pd.concat([kept, new], ignore_index=True) if len(new) else kept.reset_index(drop=True)
+
+
+class SortedTable:
+    """Date-sorted numpy columns of a rollup table; a date range is a contiguous slice."""
+
+    def __init__(self, table: pd.DataFrame, value_columns: List[str], label_column: Optional[str] = None):
+        table = table.sort_values("forecast_date", kind="stable")
+        self.columns = {col: i for i, col in enumerate(value_columns)}
+        self.dates = table["forecast_date"].to_numpy()
+        self.values = table[value_columns].to_numpy(dtype=float)
+        self.codes: Dict[str, Tuple[np.ndarray, pd.Index]] = {
+            column: pd.factorize(table[column]) for column in FILTER_COLUMNS.values() if column in table
+        }
+        if label_column:
+            self.label_codes, self.labels = pd.factorize(table[label_column])
+        self._nonzero: Dict[str, np.ndarray] = {}
+
+    @property
+    def sku_codes(self) -> np.ndarray:
+        return self.codes["sku_id"][0]
+
+    @property
+    def skus(self) -> pd.Index:
+        return self.codes["sku_id"][1]
+
+    def column(self, name: str, lo: int = 0, hi: Optional[int] = None) -> np.ndarray:
+        return self.values[lo:hi, self.columns[name]]
+
+    def nonzero(self, name: str) -> np.ndarray:
+        """Ascending row numbers where a count column is non-zero, for sparse scans."""
+        rows = self._nonzero.get(name)
+        if rows is None:
+            rows = self._nonzero[name] = np.flatnonzero(self.column(name))
+        return rows
+
+    def bounds(self, start: Optional[pd.Timestamp], end: Optional[pd.Timestamp]) -> Tuple[int, int]:
+        lo = 0 if start is None else int(np.searchsorted(self.dates, start.to_datetime64(), side="left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, end.to_datetime64(), side="right"))
+        return lo, hi
+
+    def code_mask(self, rows: Any, sku: Optional[str] = None, store: Optional[str] = None, category: Optional[str] = None) -> Optional[np.ndarray]:
+        """Mask over self rows[rows] (a slice or index array) for the filters; None when unfiltered."""
+        mask = None
+        for arg, value in (("sku", sku), ("store", store), ("category", category)):
+            if not value:
+                continue
+            codes, uniques = self.codes[FILTER_COLUMNS[arg]]
+            code = uniques.get_indexer([value])[0]
+            part = codes[rows] == code
+            mask = part if mask is None else mask & part
+        return mask
+
+    def mask(self, lo: int, hi: int, sku: Optional[str] = None, store: Optional[str] = None, category: Optional[str] = None) -> Optional[np.ndarray]:
+        """Row mask within [lo, hi) for the filters; None when unfiltered."""
+        return self.code_mask(slice(lo, hi), sku, store, category)
+
+
+class Rollups:
+    """
+    Rollup cubes over the forecast store, partitioned by forecast_date:
+
+    daily        - sku×store×day demand, history, flag, error and confidence sums
+    store_day    - the same sums per store×day
+    category_day - the same sums per product_category×day
+    drivers, store_day_drivers, category_day_drivers
+                 - top_influencer row counts and demand at each of those grains
+
+    An ingest delta only rebuilds the day partitions it touches: the affected
+    sku×store×day rows are replaced and the coarser cubes for those days are
+    re-derived from them. Whole-cube frames and date-sorted views are assembled
+    lazily, once per data version.
+    """
+
+    def __init__(self, store: ForecastStore):
+        self._store = store
+        self._lock = threading.RLock()
+        self._parts: Dict[str, Dict[pd.Timestamp, pd.DataFrame]] = {}
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._views: Dict[str, SortedTable] = {}
+        self.version = -1
+        self._rebuild(store.frame)
+        store.subscribe(self.on_store_change)
+
+    def _rebuild(self, frame: pd.DataFrame) -> None:
+        cubes = _derive(daily_partials(frame), _driver_counts(frame))
+        with self._lock:
+            self._parts = {name: _split_days(cube) for name, cube in cubes.items()}
+            self._empty = {name: cube.iloc[:0] for name, cube in cubes.items()}
+            self._frames, self._views = {}, {}
+
+    def _apply_delta(self, delta: pd.DataFrame) -> None:
+        new_daily, new_drivers = _split_days(daily_partials(delta)), _split_days(_driver_counts(delta))
+        with self._lock:
+            daily_parts, driver_parts = self._parts["daily"], self._parts["drivers"]
+            days, touched_daily, touched_drivers = [], [], []
+            for day, rows in delta.groupby("forecast_date", sort=False):
+                days.append(day)
+                keys = pd.MultiIndex.from_frame(rows[["sku_id", "store_id"]])
+                touched_daily.append(_replace_keys(daily_parts.get(day), new_daily[day], keys))
+                touched_drivers.append(_replace_keys(driver_parts.get(day), new_drivers.get(day, self._empty["drivers"]), keys))
+            cubes = _derive(pd.concat(touched_daily, ignore_index=True), pd.concat(touched_drivers, ignore_index=True))
+            for name, cube in cubes.items():
+                # A touched day the new cube has no rows for (e.g. a driver that went away) must be dropped
+                split, parts = _split_days(cube), self._parts[name]
+                for day in days:
+                    if day in split:
+                        parts[day] = split[day]
+                    else:
+                        parts.pop(day, None)
+            self._frames, self._views = {}, {}
+
+    def on_store_change(self, store: ForecastStore, delta: Optional[pd.DataFrame]) -> None:
+        if delta is None:
+            self._rebuild(store.frame)
+        else:
+            self._apply_delta(delta)
+        with self._lock:
+            self.version = store.version
+
+    def _ensure_current(self) -> None:
+        self._store.refresh_if_stale()
+
+    def frame(self, name: str) -> pd.DataFrame:
+        """A whole cube, date-ordered."""
+        self._ensure_current()
+        with self._lock:
+            frame = self._frames.get(name)
+            if frame is None:
+                parts = [self._parts[name][day] for day in sorted(self._parts[name])]
+                frame = pd.concat(parts, ignore_index=True) if parts else self._empty[name]
+                self._frames[name] = frame
+            return frame
+
+    @property
+    def daily(self) -> pd.DataFrame:
+        return self.frame("daily")
+
+    @property
+    def drivers(self) -> pd.DataFrame:
+        return self.frame("drivers")
+
+    def sorted_view(self, name: str) -> SortedTable:
+        """Date-sorted numpy view of a cube, built once per data version."""
+        frame = self.frame(name)
+        with self._lock:
+            view = self._views.get(name)
+            if view is None:
+                if name in DRIVER_CUBES:
+                    view = SortedTable(frame, DRIVER_VALUES, label_column="driver")
+                else:
+                    view = SortedTable(frame, SUM_COLUMNS)
+                self._views[name] = view
+            return view
+
+    def cube_slice(
+        self,
+        name: str,
+        start: Any = None,
+        end: Any = None,
+        sku: Optional[str] = None,
+        store: Optional[str] = None,
+        category: Optional[str] = None,
+    ) -> pd.DataFrame:
+        table = self.frame(name)
+        mask = np.ones(len(table), dtype=bool)
+        start, end = to_timestamp(start), to_timestamp(end)
+        if start is not None:
+            mask &= (table["forecast_date"] >= start).to_numpy()
+        if end is not None:
+            mask &= (table["forecast_date"] <= end).to_numpy()
+        for arg, value in (("sku", sku), ("store", store), ("category", category)):
+            if value:
+                mask &= (table[FILTER_COLUMNS[arg]] == value).to_numpy()
+        return table[mask]
+
+    def daily_slice(self, start: Any = None, end: Any = None, sku: Optional[str] = None, store: Optional[str] = None) -> pd.DataFrame:
+        return self.cube_slice("daily", start, end, sku, store)
+
+    def driver_slice(self, start: Any = None, end: Any = None, sku: Optional[str] = None, store: Optional[str] = None) -> pd.DataFrame:
+        return self.cube_slice("drivers", start, end, sku, store)
+
+    @staticmethod
+    def cube_for(sku: Optional[str]) -> str:
+        """Coarsest cube that can answer a sku/store filter."""
+        return "daily" if sku else "store_day"
+
+    @staticmethod
+    def driver_cube_for(sku: Optional[str]) -> str:
+        return "drivers" if sku else "store_day_drivers"
+
+
+rollups = Rollups(forecast_store)
@@ -0,0 +1,117 @@
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from app.models.forecast_row import ForecastRow
+from app.utils import cache_codec
+from app.utils.redis_pool import get_async_redis
+
+logger = logging.getLogger(__name__)
+
+# Forecast sessions are Redis hashes of fixed-size row chunks:
+#   forecast_session:{id}      meta -> {row_count, chunk_size, chunk_count, ...}
+#                              chunk:{n} -> rows[n*chunk_size:(n+1)*chunk_size]
+#   explanations_session:{id}  chunk:{n} -> explanations for forecast chunk n
+# Readers page through chunk indexes, so a session is never loaded in full.
+SESSION_CHUNK_SIZE = int(os.getenv("SESSION_CHUNK_SIZE", 100))
+SESSION_TTL = int(os.getenv("SESSION_TTL_SECONDS", 86400))
+WRITE_PIPELINE_CHUNKS = 50
+META_FIELD = "meta"
+
+
+def forecast_session_key(session_id: str) -> str:
+    return f"forecast_session:{session_id}"
+
+
+def explanation_session_key(session_id: str) -> str:
+    return f"explanations_session:{session_id}"
+
+
+def chunk_field(index: int) -> str:
+    return f"chunk:{index}"
+
+
+async def write_forecast_session(
+    redis_client,
+    rows: List[ForecastRow],
+    chunk_size: int = SESSION_CHUNK_SIZE,
+    session_id: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Store rows as a chunked session using pipelined HSETs; returns the session meta."""
+    session_id = session_id or uuid.uuid4().hex
+    key = forecast_session_key(session_id)
+    chunk_count = (len(rows) + chunk_size - 1) // chunk_size
+    meta = {
+        "session_id": session_id,
+        "row_count": len(rows),
+        "chunk_size": chunk_size,
+        "chunk_count": chunk_count,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+    # The TTL is set in the first round trip so a write that fails part-way
+    # never leaves chunks behind without one; meta goes last, so readers only
+    # see sessions whose chunks are all written.
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.delete(key)
+    try:
+        for index in range(chunk_count):
+            chunk = rows[index * chunk_size:(index + 1) * chunk_size]
+            pipe.hset(key, chunk_field(index), cache_codec.encode([row.model_dump(mode="json") for row in chunk]))
+            if index == 0:
+                pipe.expire(key, SESSION_TTL)
+            if (index + 1) % WRITE_PIPELINE_CHUNKS == 0:
+                await pipe.execute()
+                pipe = redis_client.pipeline(transaction=False)
+        pipe.hset(key, META_FIELD, cache_codec.encode(meta))
+        pipe.expire(key, SESSION_TTL)
+        await pipe.execute()
+    except Exception:
+        try:
+            await redis_client.delete(key)
+        except Exception as e:
+            logger.debug(f"Could not remove partial session {session_id}: {e}")
+        raise
+    return meta
+
+
+async def store_forecast_session(rows: List[ForecastRow]) -> Optional[Dict[str, Any]]:
+    """Ingest hook: write the session, or return None when Redis is unavailable."""
+    if not rows:
+        return None
+    try:
+        return await write_forecast_session(get_async_redis(), rows)
+    except Exception as e:
+        logger.warning(f"⚠️ Could not store forecast session: {e}")
+        return None
+
+
+async def read_session_page(redis_client, session_id: str, cursor: int) -> Dict[str, Any]:
+    """
+    Fetch the session meta, forecast chunk and cached explanation chunk for one
+    cursor position in a single round trip.
+    """
+    field = chunk_field(cursor)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hmget(forecast_session_key(session_id), [META_FIELD, field])
+    pipe.hget(explanation_session_key(session_id), field)
+    (meta, rows), explanations = await pipe.execute()
+    return {
+        "meta": cache_codec.decode(meta),
+        "rows": cache_codec.decode(rows),
+        "explanations": cache_codec.decode(explanations),
+    }
+
+
+async def write_explanation_chunk(redis_client, session_id: str, cursor: int, explanations: List[Dict[str, Any]]) -> None:
+    key = explanation_session_key(session_id)
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hset(key, chunk_field(cursor), cache_codec.encode(explanations))
+    pipe.expire(key, SESSION_TTL)
+    await pipe.execute()
+
+
+def next_cursor(meta: Dict[str, Any], cursor: int) -> Optional[int]:
+    return cursor + 1 if cursor + 1 < meta["chunk_count"] else None
@@ -1,56 +1,31 @@
 from typing import List, Dict, Any, Optional
-from datetime import date
+from datetime import date, timedelta
 
+from app.services.anomaly_engine import anomaly_cards
+from app.services.driver_changes import driver_changes
+from app.services.explanation_store import explanation_store
+from app.services.forecast_store import to_timestamp
+from app.services.query_cache import Scope, query_cache
+from app.services.rollups import rollups
 
-def generate_narrative_storycards(
-    start: date,
-    end: date,
-    sku: Optional[str] = None,
-    store: Optional[str] = None,
-    signals: Optional[List[str]] = None
-) -> List[Dict[str, Any]]:
+# Category demand changes smaller than this read as "stable"
+STABLE_CHANGE_PCT = 5.0
+
+
+def _category_insight(start: date, end: date, sku: Optional[str], store: Optional[str]) -> Dict[str, Any]:
     """
-    Generate narrative storycards for the given filters.
-    Returns a list of dicts with keys: type, title, subtitle, body, confidence, primary_driver, action.
+    Biggest category-level demand change against the preceding period of equal
+    length, read from the product_category×day cube (or the sku×store×day cube
+    when a SKU/store filter narrows it).
     """
-    # Dummy storycards data for testing layout
-    cards: List[Dict[str, Any]] = []
-    # Example anomaly card
-    cards.append({
-        "type": "anomaly",
-        "title": f"Anomaly detected: {sku or 'All SKUs'}",
-        "subtitle": f"{store or 'All Stores'} {end.isoformat()}",
-        "body": "Unexpected spike in sales detected.",
-        "confidence": 0.95,
-        "primary_driver": "anomaly",
-        "action": {
-            "label": "Explain",
-            "params": {
-                "sku_id": sku,
-                "store_id": store,
-                "forecast_date": end.isoformat()
-            }
-        }
-    })
-    # Example driver card
-    cards.append({
-        "type": "driver",
-        "title": "Top driver changed",
-        "subtitle": f"{sku or 'All SKUs'} week ending {end.isoformat()}",
-        "body": "Promotional activity became the primary driver.",
-        "confidence": 0.88,
-        "primary_driver": "promotion",
-        "action": {
-            "label": "Explain",
-            "params": {
-                "sku_id": sku,
-                "store_id": store,
-                "forecast_date": end.isoformat()
-            }
-        }
-    })
-    # Example insight card
-    cards.append({
+    prev_start = start - (end - start) - timedelta(days=1)
+    if sku or store:
+        table = rollups.daily_slice(prev_start, end, sku, store)
+        drivers = rollups.driver_slice(start, end, sku, store)
+    else:
+        table = rollups.cube_slice("category_day", prev_start, end)
+        drivers = rollups.cube_slice("category_day_drivers", start, end)
+    card = {
         "type": "insight",
         "title": "Stable forecasts",
         "subtitle": f"{start.isoformat()} to {end.isoformat()}",
@@ -61,5 +36,102 @@ def generate_narrative_storycards(
             "label": "More",
             "params": {}
         }
-    })
+    }
+    if table.empty:
+        return card
+    current = (table["forecast_date"] >= to_timestamp(start)).to_numpy()
+    by_category = table.assign(current=table["predicted_sum"].where(current, 0.0), previous=table["predicted_sum"].where(~current, 0.0))
+    totals = by_category.groupby("product_category", sort=False)[["current", "previous", "confidence_sum", "confidence_rows"]].sum()
+    totals = totals[totals["previous"] > 0]
+    if totals.empty:
+        return card
+    change = (totals["current"] - totals["previous"]) / totals["previous"] * 100
+    category = change.abs().idxmax()
+    pct = float(change[category])
+    row = totals.loc[category]
+    if row["confidence_rows"]:
+        card["confidence"] = round(float(row["confidence_sum"] / row["confidence_rows"]), 2)
+    if abs(pct) < STABLE_CHANGE_PCT:
+        card["body"] = f"Forecast demand stayed within ±{STABLE_CHANGE_PCT:.0f}% of the previous period across {len(totals)} categories."
+        return card
+    category_drivers = drivers[drivers["product_category"] == category]
+    if not category_drivers.empty:
+        card["primary_driver"] = category_drivers.groupby("driver")["rows"].sum().idxmax()
+    card["title"] = f"{category} demand {'up' if pct > 0 else 'down'} {abs(pct):.0f}%"
+    card["body"] = (
+        f"{category} forecasts total {int(row['current'])} units vs {int(row['previous'])} in the previous period."
+    )
+    card["action"] = {"label": "More", "params": {"product_category": category}}
+    return card
+
+
+def _driver_label(driver: str) -> str:
+    return driver.replace("_", " ")
+
+
+def _driver_change_card(start: date, end: date, sku: Optional[str], store: Optional[str]) -> Dict[str, Any]:
+    """Largest top-driver switch in the window, looked up from the incrementally maintained tracker."""
+    changes = driver_changes.changes(start, end, sku, store)
+    if not changes:
+        return {
+            "type": "driver",
+            "title": "Top driver unchanged",
+            "subtitle": f"{sku or 'All SKUs'} {start.isoformat()} to {end.isoformat()}",
+            "body": "No series changed its primary demand driver in this period.",
+            "confidence": 0.80,
+            "primary_driver": "historical_pattern",
+            "action": {
+                "label": "More",
+                "params": {}
+            }
+        }
+    change = changes[0]
+    return {
+        "type": "driver",
+        "title": "Top driver changed",
+        "subtitle": f"{change['sku_id']} {change['store_id']} {change['date'].isoformat()}",
+        "body": (
+            f"{_driver_label(change['to_driver']).capitalize()} replaced {_driver_label(change['from_driver'])} "
+            f"as the primary driver; its share moved from {change['share_before']:.0%} to {change['share_after']:.0%}."
+        ),
+        "confidence": round(change["share_after"], 2),
+        "primary_driver": change["to_driver"],
+        "action": {
+            "label": "Explain",
+            "params": {
+                "sku_id": change["sku_id"],
+                "store_id": change["store_id"],
+                "forecast_date": change["date"].isoformat()
+            }
+        }
+    }
+
+
+def generate_narrative_storycards(
+    start: date,
+    end: date,
+    sku: Optional[str] = None,
+    store: Optional[str] = None,
+    signals: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Generate narrative storycards for the given filters.
+    Returns a list of dicts with keys: type, title, subtitle, body, confidence, primary_driver, action.
+    Cached per filter set; driver shares reach outside the window, so any ingest
+    touching the sku/store invalidates the cards whatever its dates.
+    """
+    return query_cache.get_or_compute(
+        "storycards",
+        {"start": start, "end": end, "sku": sku, "store": store, "signals": signals or [],
+         "explanations": explanation_store.fingerprint},
+        Scope(None, None, sku, store),
+        lambda: _storycards(start, end, sku, store),
+    )
+
+
+def _storycards(start: date, end: date, sku: Optional[str], store: Optional[str]) -> List[Dict[str, Any]]:
+    cards: List[Dict[str, Any]] = anomaly_cards(start, end, sku, store)
+    cards.append(_driver_change_card(start, end, sku, store))
+    # Category-level insight from the rollup cubes
+    cards.append(_category_insight(start, end, sku, store))
     return cards
@@ -0,0 +1,172 @@
+import os
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.services.bitmap_index import bitmap_index
+from app.services.forecast_store import to_timestamp
+from app.services.query_cache import Scope, query_cache
+from app.services.rollups import daily_partials, rollups
+
+# Upper bound on points returned when the client does not say how wide the chart is
+DEFAULT_MAX_POINTS = int(os.getenv("TIMESERIES_MAX_POINTS", 1000))
+MIN_POINTS = 3
+DOWNSAMPLE_METHODS = ("lttb", "minmax")
+# overlay name -> daily partial count column
+OVERLAYS = {"holiday": "holiday_count", "rain": "rain_count", "event": "event_count"}
+
+DAY = np.timedelta64(1, "D")
+
+
+DAY_COLUMNS = ["rows", "predicted_sum", "actual_sum", "actual_rows", *OVERLAYS.values()]
+
+
+def daily_series(
+    start: Any = None,
+    end: Any = None,
+    sku: Optional[str] = None,
+    store: Optional[str] = None,
+    signals: Optional[List[str]] = None,
+) -> Dict[str, np.ndarray]:
+    """
+    Predicted vs actual demand per day over the filter, summed from the rollup
+    cubes with one bincount per column. Days without forecasts are dropped;
+    actual is NaN on days with no actuals yet. With `signals`, only forecast
+    rows carrying one of them count; those rows come from the bitmap index.
+    """
+    if signals:
+        partials = daily_partials(bitmap_index.query(start, end, sku, store, signals=signals))
+        dates = partials["forecast_date"].to_numpy()
+        values = {col: partials[col].to_numpy(dtype=float) for col in DAY_COLUMNS}
+    else:
+        daily = rollups.sorted_view(rollups.cube_for(sku))
+        lo, hi = daily.bounds(to_timestamp(start), to_timestamp(end))
+        mask = daily.mask(lo, hi, sku, store)
+        dates = daily.dates[lo:hi]
+        values = {col: daily.column(col, lo, hi) for col in DAY_COLUMNS}
+        if mask is not None:
+            dates = dates[mask]
+            values = {col: v[mask] for col, v in values.items()}
+    if not len(dates):
+        return {"dates": dates, "predicted": np.empty(0), "actual": np.empty(0), "flags": {name: np.empty(0, dtype=bool) for name in OVERLAYS}}
+
+    # Both sources are date-ordered, so the first row is the earliest day
+    day_index = ((dates - dates[0]) // DAY).astype(np.int64)
+    sums = {col: np.bincount(day_index, weights=v) for col, v in values.items()}
+    present = sums["rows"] > 0
+    actual = np.where(sums["actual_rows"] > 0, sums["actual_sum"], np.nan)
+    return {
+        "dates": (dates[0] + np.arange(len(present)) * DAY)[present],
+        "predicted": sums["predicted_sum"][present],
+        "actual": actual[present],
+        "flags": {name: sums[col][present] > 0 for name, col in OVERLAYS.items()},
+    }
+
+
+Selection = Tuple[np.ndarray, np.ndarray, np.ndarray]  # kept indices, bucket starts, bucket stops
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    return np.linspace(0, n, buckets + 1).astype(np.int64)
+
+
+def _identity(n: int) -> Selection:
+    index = np.arange(n)
+    return index, index, index + 1
+
+
+def lttb(y: np.ndarray, threshold: int) -> Selection:
+    """
+    Largest-Triangle-Three-Buckets on evenly spaced points. The first and last
+    points are always kept; each other kept point represents one bucket.
+    """
+    n = len(y)
+    if threshold >= n or threshold < MIN_POINTS:
+        return _identity(n)
+    x = np.arange(n, dtype=float)
+    y = np.nan_to_num(y)
+    # Interior points split into threshold - 2 buckets between the fixed endpoints
+    edges = np.concatenate(([0], 1 + _bucket_edges(n - 2, threshold - 2), [n]))
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for b in range(1, threshold - 1):
+        lo, hi = edges[b], edges[b + 1]
+        avg_x, avg_y = x[hi:edges[b + 2]].mean(), y[hi:edges[b + 2]].mean()
+        area = np.abs((x[prev] - avg_x) * (y[lo:hi] - y[prev]) - (x[prev] - x[lo:hi]) * (avg_y - y[prev]))
+        prev = lo + int(area.argmax())
+        keep[b] = prev
+    return keep, edges[:-1], edges[1:]
+
+
+def minmax(y: np.ndarray, threshold: int) -> Selection:
+    """Keep the min and the max of each of threshold // 2 buckets, in time order."""
+    n = len(y)
+    buckets = threshold // 2
+    if threshold >= n or buckets < 1:
+        return _identity(n)
+    edges = _bucket_edges(n, buckets)
+    y = np.nan_to_num(y)
+    lows = np.array([lo + y[lo:hi].argmin() for lo, hi in zip(edges[:-1], edges[1:])])
+    highs = np.array([lo + y[lo:hi].argmax() for lo, hi in zip(edges[:-1], edges[1:])])
+    pairs = np.stack([np.minimum(lows, highs), np.maximum(lows, highs)], axis=1).ravel()
+    # A flat bucket has min == max; keep that point once
+    unique = np.ones(len(pairs), dtype=bool)
+    unique[1::2] = pairs[1::2] != pairs[0::2]
+    return pairs[unique], np.repeat(edges[:-1], 2)[unique], np.repeat(edges[1:], 2)[unique]
+
+
+def _any_in_bucket(flags: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    counts = np.concatenate(([0], np.cumsum(flags, dtype=np.int64)))
+    return counts[stops] - counts[starts] > 0
+
+
+def _iso(value: np.datetime64) -> str:
+    return pd.Timestamp(value).date().isoformat()
+
+
+def downsample(series: Dict[str, Any], width: Optional[int] = None, method: str = "lttb") -> Dict[str, Any]:
+    """
+    Reduce a daily series to at most `width` points, choosing points on predicted
+    demand. Each point carries the date range of its bucket, and overlays are
+    set when any day in that bucket had the flag.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"method must be one of {', '.join(DOWNSAMPLE_METHODS)}")
+    threshold = max(MIN_POINTS, width or DEFAULT_MAX_POINTS)
+    dates, predicted, actual = series["dates"], series["predicted"], series["actual"]
+    keep, starts, stops = (lttb if method == "lttb" else minmax)(predicted, threshold)
+    flags = {name: _any_in_bucket(values, starts, stops) for name, values in series["flags"].items()}
+    return {
+        "points": [
+            {
+                "date": _iso(dates[i]),
+                "actual": None if np.isnan(actual[i]) else round(float(actual[i]), 2),
+                "predicted": round(float(predicted[i]), 2),
+                "overlays": [name for name, bucket in flags.items() if bucket[k]],
+                "bucket_start": _iso(dates[starts[k]]),
+                "bucket_end": _iso(dates[stops[k] - 1]),
+            }
+            for k, i in enumerate(keep)
+        ],
+        "total_points": len(dates),
+        "downsampled": len(keep) < len(dates),
+        "method": method,
+    }
+
+
+def chart_series(
+    start: Any = None,
+    end: Any = None,
+    sku: Optional[str] = None,
+    store: Optional[str] = None,
+    width: Optional[int] = None,
+    method: str = "lttb",
+    signals: Optional[List[str]] = None,
+) -> Dict[str, Any]:
+    return query_cache.get_or_compute(
+        "chart", {"start": start, "end": end, "sku": sku, "store": store, "width": width, "method": method, "signals": signals or []},
+        Scope(to_timestamp(start), to_timestamp(end), sku, store),
+        lambda: {**downsample(daily_series(start, end, sku, store, signals), width, method), "data_version": rollups.version},
+    )
@@ -0,0 +1,136 @@
+"""
+Versioned binary codec for values stored in Redis.
+
+Layout: MAGIC (1 byte) | VERSION (1 byte) | FLAGS (1 byte) | payload
+The payload is msgpack, zstd-compressed when it exceeds CACHE_COMPRESS_THRESHOLD.
+Entries without the header are legacy json.dumps text and are still decoded.
+"""
+import json
+import os
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Optional, Union
+
+import msgpack
+import zstandard
+
+MAGIC = b"\xfc"
+VERSION = 1
+FLAG_ZSTD = 0x01
+HEADER_SIZE = 3
+
+COMPRESS_THRESHOLD = int(os.getenv("CACHE_COMPRESS_THRESHOLD", 1024))
+ZSTD_LEVEL = int(os.getenv("CACHE_ZSTD_LEVEL", 3))
+
+# zstd (de)compressor objects are not safe for concurrent use; keep one per thread
+_local = threading.local()
+
+
+def _compressor() -> zstandard.ZstdCompressor:
+    if not hasattr(_local, "compressor"):
+        _local.compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL)
+    return _local.compressor
+
+
+def _decompressor() -> zstandard.ZstdDecompressor:
+    if not hasattr(_local, "decompressor"):
+        _local.decompressor = zstandard.ZstdDecompressor()
+    return _local.decompressor
+
+
+def _default(obj: Any) -> Any:
+    # Dates are stored the same way json.dumps(model_dump(mode="json")) would
+    if isinstance(obj, (date, datetime)):
+        return obj.isoformat()
+    raise TypeError(f"Cannot encode {type(obj).__name__} for cache")
+
+
+class CodecStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.encoded = 0
+        self.decoded = 0
+        self.legacy_decoded = 0
+        self.compressed = 0
+        self.packed_bytes = 0
+        self.stored_bytes = 0
+        self.encode_seconds = 0.0
+        self.decode_seconds = 0.0
+
+    def record_encode(self, packed: int, stored: int, compressed: bool, seconds: float) -> None:
+        with self._lock:
+            self.encoded += 1
+            self.compressed += int(compressed)
+            self.packed_bytes += packed
+            self.stored_bytes += stored
+            self.encode_seconds += seconds
+
+    def record_decode(self, legacy: bool, seconds: float) -> None:
+        with self._lock:
+            self.decoded += 1
+            self.legacy_decoded += int(legacy)
+            self.decode_seconds += seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "version": VERSION,
+                "compress_threshold_bytes": COMPRESS_THRESHOLD,
+                "encoded": self.encoded,
+                "decoded": self.decoded,
+                "legacy_decoded": self.legacy_decoded,
+                "compressed": self.compressed,
+                "packed_bytes": self.packed_bytes,
+                "stored_bytes": self.stored_bytes,
+                "compression_ratio": round(self.packed_bytes / self.stored_bytes, 3) if self.stored_bytes else None,
+                "avg_encode_ms": round(self.encode_seconds / self.encoded * 1000, 4) if self.encoded else None,
+                "avg_decode_ms": round(self.decode_seconds / self.decoded * 1000, 4) if self.decoded else None,
+            }
+
+
+stats = CodecStats()
+
+
+def encode(value: Any) -> bytes:
+    """Serialize a cache value into the versioned binary format."""
+    started = time.perf_counter()
+    packed = msgpack.packb(value, default=_default, use_bin_type=True)
+    flags = 0
+    body = packed
+    if len(packed) > COMPRESS_THRESHOLD:
+        compressed = _compressor().compress(packed)
+        if len(compressed) < len(packed):
+            body = compressed
+            flags |= FLAG_ZSTD
+    data = MAGIC + bytes((VERSION, flags)) + body
+    stats.record_encode(len(packed), len(data), bool(flags & FLAG_ZSTD), time.perf_counter() - started)
+    return data
+
+
+def decode(data: Optional[Union[bytes, str]]) -> Any:
+    """Deserialize a cache value; returns None for a missing key."""
+    if data is None:
+        return None
+    started = time.perf_counter()
+    if isinstance(data, str) or not data.startswith(MAGIC):
+        # Pre-codec entry written as json.dumps text
+        value = json.loads(data)
+        stats.record_decode(True, time.perf_counter() - started)
+        return value
+    version, flags = data[1], data[2]
+    if version != VERSION:
+        raise ValueError(f"Unsupported cache codec version {version}")
+    body = data[HEADER_SIZE:]
+    if flags & FLAG_ZSTD:
+        body = _decompressor().decompress(body)
+    value = msgpack.unpackb(body, raw=False)
+    stats.record_decode(False, time.perf_counter() - started)
+    return value
+
+
+def codec_stats() -> Dict[str, Any]:
+    return stats.snapshot()
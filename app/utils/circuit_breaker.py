@@ -0,0 +1,293 @@
+import os
+import time
+import threading
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+DEFAULT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", 3))
+DEFAULT_RECOVERY_SECONDS = float(os.getenv("CIRCUIT_RECOVERY_SECONDS", 30))
+
+
+class CircuitOpenError(Exception):
+    """Raised when a call is rejected because its circuit is open."""
+
+    def __init__(self, name: str, retry_after: float):
+        self.name = name
+        self.retry_after = retry_after
+        super().__init__(f"Circuit '{name}' is open; retry in {retry_after:.1f}s")
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    closed    -> calls pass through; consecutive failures are counted
+    open      -> calls fail fast with CircuitOpenError until recovery_timeout elapses
+    half_open -> a limited number of probe calls are let through; a success closes
+                 the circuit, a failure re-opens it
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = DEFAULT_FAILURE_THRESHOLD,
+        recovery_timeout: float = DEFAULT_RECOVERY_SECONDS,
+        half_open_max_calls: int = 1,
+        expected_exceptions: Tuple[Type[BaseException], ...] = (Exception,),
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.expected_exceptions = expected_exceptions
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._half_open_calls = 0
+        self._total_failures = 0
+        self._total_rejections = 0
+        self._last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        # Caller must hold the lock. Promotes open -> half_open once the timeout passes.
+        if self._state == OPEN and self._clock() - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+            self._half_open_calls = 0
+        return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if a call may proceed, reserving a probe slot when half-open."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return True
+            if state == HALF_OPEN and self._half_open_calls < self.half_open_max_calls:
+                self._half_open_calls += 1
+                return True
+            self._total_rejections += 1
+            return False
+
+    def release(self) -> None:
+        """Give back a probe slot whose call ended without an outcome (e.g. cancelled)."""
+        with self._lock:
+            if self._state == HALF_OPEN and self._half_open_calls > 0:
+                self._half_open_calls -= 1
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._state != OPEN or self._opened_at is None:
+                return 0.0
+            return max(0.0, self.recovery_timeout - (self._clock() - self._opened_at))
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info(f"Circuit '{self.name}' closed after successful probe")
+            self._state = CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+            self._opened_at = None
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            self._failures += 1
+            self._total_failures += 1
+            if error is not None:
+                self._last_error = f"{type(error).__name__}: {error}"
+            state = self._current_state()
+            if state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if state != OPEN:
+                    logger.warning(f"Circuit '{self.name}' opened after {self._failures} failure(s): {self._last_error}")
+                self._state = OPEN
+                self._opened_at = self._clock()
+                self._half_open_calls = 0
+
+    def call(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Invoke func through the breaker, raising CircuitOpenError when open."""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after())
+        try:
+            result = func(*args, **kwargs)
+        except self.expected_exceptions as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            # Cancellation or shutdown says nothing about the dependency, but the slot must not leak
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+    async def call_async(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """Await func(*args, **kwargs) through the breaker."""
+        if not self.allow_request():
+            raise CircuitOpenError(self.name, self.retry_after())
+        try:
+            result = await func(*args, **kwargs)
+        except self.expected_exceptions as e:
+            self.record_failure(e)
+            raise
+        except BaseException:
+            # Cancellation or shutdown says nothing about the dependency, but the slot must not leak
+            self.release()
+            raise
+        self.record_success()
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._failures = 0
+            self._half_open_calls = 0
+            self._opened_at = None
+            self._last_error = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            retry_after = 0.0
+            if state == OPEN:
+                retry_after = max(0.0, self.recovery_timeout - (self._clock() - self._opened_at))
+            return {
+                "state": state,
+                "consecutive_failures": self._failures,
+                "total_failures": self._total_failures,
+                "rejected_calls": self._total_rejections,
+                "retry_after_seconds": round(retry_after, 1),
+                "last_error": self._last_error,
+            }
+
+
+class GuardedClient:
+    """
+    Proxy that routes every method call on the wrapped client through a breaker.
+    Used for Redis clients so that every caller fails fast while the server is down.
+    `latency`, a histogram with a "command" label, times each call when given.
+    """
+
+    def __init__(self, client: Any, breaker: CircuitBreaker, latency: Any = None):
+        self._client = client
+        self._breaker = breaker
+        self._latency = latency
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        if name == "pipeline":
+            # Building a pipeline is local; only its execute() touches the network
+            return lambda *args, **kwargs: GuardedPipeline(attr(*args, **kwargs), self._breaker, self._latency)
+        if self._latency is not None:
+            def timed(*args, **kwargs):
+                with self._latency.time(command=name):
+                    return self._breaker.call(attr, *args, **kwargs)
+
+            return timed
+
+        def guarded(*args, **kwargs):
+            return self._breaker.call(attr, *args, **kwargs)
+
+        return guarded
+
+
+class GuardedPipeline:
+    """Pipeline proxy: commands are queued locally, execute() goes through the breaker."""
+
+    def __init__(self, pipeline: Any, breaker: CircuitBreaker, latency: Any = None):
+        self._pipeline = pipeline
+        self._breaker = breaker
+        self._latency = latency
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pipeline, name)
+
+    def execute(self, *args, **kwargs) -> Any:
+        if self._latency is None:
+            return self._breaker.call(self._pipeline.execute, *args, **kwargs)
+        with self._latency.time(command="pipeline"):
+            return self._breaker.call(self._pipeline.execute, *args, **kwargs)
+
+
+class AsyncGuardedClient:
+    """Async counterpart of GuardedClient for redis.asyncio clients."""
+
+    def __init__(self, client: Any, breaker: CircuitBreaker, latency: Any = None):
+        self._client = client
+        self._breaker = breaker
+        self._latency = latency
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self._client, name)
+        if not callable(attr):
+            return attr
+        if name == "pipeline":
+            return lambda *args, **kwargs: AsyncGuardedPipeline(attr(*args, **kwargs), self._breaker, self._latency)
+        if self._latency is not None:
+            async def timed(*args, **kwargs):
+                with self._latency.time(command=name):
+                    return await self._breaker.call_async(attr, *args, **kwargs)
+
+            return timed
+
+        async def guarded(*args, **kwargs):
+            return await self._breaker.call_async(attr, *args, **kwargs)
+
+        return guarded
+
+
+class AsyncGuardedPipeline:
+    def __init__(self, pipeline: Any, breaker: CircuitBreaker, latency: Any = None):
+        self._pipeline = pipeline
+        self._breaker = breaker
+        self._latency = latency
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._pipeline, name)
+
+    async def execute(self, *args, **kwargs) -> Any:
+        if self._latency is None:
+            return await self._breaker.call_async(self._pipeline.execute, *args, **kwargs)
+        with self._latency.time(command="pipeline"):
+            return await self._breaker.call_async(self._pipeline.execute, *args, **kwargs)
+
+
+_registry: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_breaker(name: str, **kwargs) -> CircuitBreaker:
+    """Return the process-wide breaker for name, creating it on first use."""
+    with _registry_lock:
+        breaker = _registry.get(name)
+        if breaker is None:
+            breaker = CircuitBreaker(name, **kwargs)
+            _registry[name] = breaker
+        return breaker
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of every registered breaker, for /health."""
+    with _registry_lock:
+        breakers = list(_registry.values())
+    return {b.name: b.snapshot() for b in breakers}
+
+
+# Shared breakers for the external dependencies
+redis_breaker = get_breaker("redis")
+newsapi_breaker = get_breaker("newsapi")
+trends_breaker = get_breaker("google_trends")
+gemini_breaker = get_breaker("gemini")
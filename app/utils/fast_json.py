@@ -0,0 +1,81 @@
+"""
+orjson-backed responses for large payloads.
+
+FastAPI's default path runs return values through response_model validation and
+jsonable_encoder before json.dumps. For explanation batches, drill pages and
+timeseries that is most of the request CPU. These helpers serialize directly
+with orjson: pydantic models are dumped without being re-validated, and arrays
+past JSON_STREAM_MIN_ITEMS are streamed in chunks instead of built into one
+buffer.
+"""
+import os
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+import orjson
+from pydantic import BaseModel
+from starlette.responses import JSONResponse, Response, StreamingResponse
+
+JSON_STREAM_MIN_ITEMS = int(os.getenv("JSON_STREAM_MIN_ITEMS", 5000))
+JSON_STREAM_CHUNK_ITEMS = int(os.getenv("JSON_STREAM_CHUNK_ITEMS", 1000))
+
+OPTIONS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        # Already validated when it was built; just dump the fields
+        return obj.model_dump()
+    if hasattr(obj, "isoformat"):
+        return obj.isoformat()
+    if hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Type is not JSON serializable: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default, option=OPTIONS)
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+def iter_json_array(items: Iterable[Any], chunk_items: int = JSON_STREAM_CHUNK_ITEMS) -> Iterator[bytes]:
+    """Encode a JSON array incrementally, one chunk of items per yielded piece."""
+    yield b"["
+    batch, first = [], True
+    for item in items:
+        batch.append(dumps(item))
+        if len(batch) >= chunk_items:
+            yield (b"" if first else b",") + b",".join(batch)
+            batch, first = [], False
+    if batch:
+        yield (b"" if first else b",") + b",".join(batch)
+    yield b"]"
+
+
+def iter_json_object(content: Dict[str, Any], array_key: str) -> Iterator[bytes]:
+    """Encode an object whose `array_key` member is streamed; other members go first."""
+    head = {k: v for k, v in content.items() if k != array_key}
+    encoded = dumps(head)
+    yield encoded[:-1] + (b"," if head else b"") + dumps(array_key) + b":"
+    yield from iter_json_array(content[array_key])
+    yield b"}"
+
+
+def fast_response(
+    content: Any,
+    status_code: int = 200,
+    headers: Optional[Dict[str, str]] = None,
+    array_key: Optional[str] = None,
+) -> Response:
+    """
+    orjson response for `content`; a top-level list (or the `array_key` member
+    of a dict) with at least JSON_STREAM_MIN_ITEMS items is streamed.
+    """
+    array = content.get(array_key) if array_key and isinstance(content, dict) else content
+    if isinstance(array, list) and len(array) >= JSON_STREAM_MIN_ITEMS:
+        body = iter_json_array(content) if array is content else iter_json_object(content, array_key)
+        return StreamingResponse(body, status_code=status_code, headers=headers, media_type="application/json")
+    return FastJSONResponse(content, status_code=status_code, headers=headers)
@@ -3,10 +3,13 @@ import pandas as pd
 from datetime import datetime
 from pydantic import ValidationError
 from app.models.forecast_row import ForecastRow
+from app.utils.metrics import record_ingest
+import time
 
 def ingest_forecast_csv(
     csv_path: str
 ) -> Tuple[List[ForecastRow], List[Dict[str, Any]]]:
+    started = time.perf_counter()
     df = pd.read_csv(csv_path)
     
     valid_rows: List[ForecastRow] = []
@@ -52,4 +55,41 @@ def ingest_forecast_csv(
                 "raw_data": record
             })
     
-    return valid_rows, invalid_rows
\ No newline at end of file
+    record_ingest("forecasts", len(valid_rows), len(invalid_rows), time.perf_counter() - started)
+    return valid_rows, invalid_rows
+
+ACTUAL_COLUMNS = ["sku_id", "store_id", "forecast_date", "actual_demand"]
+
+
+def ingest_actuals_csv(csv_path: str) -> Tuple[pd.DataFrame, List[Dict[str, Any]]]:
+    """
+    Realized sales from a CSV with sku_id, store_id, forecast_date and
+    actual_demand columns. Validated column-wise, since actuals files cover
+    every sku×store×day; returns the valid rows as a frame.
+    """
+    started = time.perf_counter()
+    df = pd.read_csv(csv_path, dtype={"sku_id": str, "store_id": str})
+    missing = [col for col in ACTUAL_COLUMNS if col not in df]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    dates = pd.to_datetime(df["forecast_date"], format="%Y-%m-%d", errors="coerce")
+    actual = pd.to_numeric(df["actual_demand"], errors="coerce")
+    # Whole units only, like ActualRow.actual_demand on the JSON path (5.0 is fine, 5.5 is not)
+    valid = df["sku_id"].notna() & df["store_id"].notna() & dates.notna() & (actual >= 0) & (actual % 1 == 0)
+    rejected = df.loc[~valid, ACTUAL_COLUMNS]
+    invalid_rows = [
+        {
+            "row_index": idx,
+            "errors": "expected sku_id, store_id, forecast_date (YYYY-MM-DD) and a whole-number actual_demand >= 0",
+            "raw_data": {key: None if pd.isna(value) else value for key, value in record.items()},
+        }
+        for idx, record in zip(rejected.index, rejected.to_dict("records"))
+    ]
+    actuals = pd.DataFrame({
+        "sku_id": df.loc[valid, "sku_id"],
+        "store_id": df.loc[valid, "store_id"],
+        "forecast_date": dates[valid].astype("datetime64[ns]"),
+        "actual_demand": actual[valid].astype("float64"),
+    }).reset_index(drop=True)
+    record_ingest("actuals", len(actuals), len(invalid_rows), time.perf_counter() - started)
+    return actuals, invalid_rows
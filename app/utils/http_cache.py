@@ -0,0 +1,213 @@
+import gzip
+import hashlib
+import os
+import zlib
+from datetime import datetime
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+DASHBOARD_PREFIX = "/api/dashboard/"
+# Bodies smaller than this are sent as-is; compressing them costs more than it saves
+COMPRESS_MIN_BYTES = int(os.getenv("HTTP_COMPRESS_MIN_BYTES", 1024))
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+# route under /api/dashboard/ -> (Cache-Control, validators follow the data version)
+# Data-backed routes always revalidate: a 304 costs one round trip and no recompute.
+CACHE_POLICIES: Dict[str, Tuple[str, bool]] = {
+    "metrics": ("private, no-cache", True),
+    "chart": ("private, no-cache", True),
+    "timeseries": ("private, no-cache", True),
+    "tiles": ("private, no-cache", True),
+    "drill": ("private, no-cache", True),
+    "storycards": ("private, no-cache", True),
+    "accuracy": ("private, no-cache", True),
+    # Explanations are generated per request; let the browser reuse one briefly
+    "detail": ("private, max-age=300", False),
+    "explain": ("private, max-age=300", False),
+    "confidence-history": ("private, max-age=300", False),
+    "copilot": ("public, max-age=3600", False),
+}
+DEFAULT_POLICY = ("no-store", False)
+
+# () -> (opaque data version token, ISO time of the last data change or None)
+VersionSource = Callable[[], Tuple[str, Optional[str]]]
+
+
+def data_validators(scope: Scope, version: str, updated_at: Optional[str]) -> Tuple[str, Optional[datetime]]:
+    """
+    Weak ETag for this URL at a data version, and Last-Modified from the last
+    data change. The query string is part of the tag since it selects the view.
+    """
+    url = f"{scope['path']}?{scope.get('query_string', b'').decode('latin-1')}"
+    digest = hashlib.sha1(f"{version}|{url}".encode()).hexdigest()[:20]
+    modified = datetime.fromisoformat(updated_at).replace(microsecond=0) if updated_at else None
+    return f'W/"{digest}"', modified
+
+
+def not_modified(headers: Headers, etag: str, last_modified: Optional[datetime]) -> bool:
+    """RFC 9110 conditional GET: If-None-Match wins over If-Modified-Since."""
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        # Weak comparison: W/"x" matches "x"
+        return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            return last_modified <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = {}
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        q = 1.0
+        if params.strip().startswith("q="):
+            try:
+                q = float(params.strip()[2:])
+            except ValueError:
+                q = 0.0
+        accepted[coding.strip().lower()] = q
+    if brotli is not None and accepted.get("br", 0) > 0:
+        return "br"
+    if accepted.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6)
+
+
+class StreamCompressor:
+    """Incremental gzip/brotli; each chunk is flushed so streamed pieces still reach the client as produced."""
+
+    def __init__(self, encoding: str):
+        self._br = brotli.Compressor(quality=5) if encoding == "br" else None
+        self._gz = None if self._br is not None else zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self._br is not None:
+            return self._br.process(chunk) + self._br.flush()
+        return self._gz.compress(chunk) + self._gz.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._br.finish() if self._br is not None else self._gz.flush()
+
+
+def compressible(start: Message) -> bool:
+    """A successful, not yet encoded JSON or text response."""
+    headers = Headers(raw=start["headers"])
+    return (
+        start["status"] == 200
+        and "content-encoding" not in headers
+        and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+    )
+
+
+class DashboardHTTPCache:
+    """
+    ASGI middleware for GET /api/dashboard/*: data-version ETag/Last-Modified
+    with conditional 304s (answered before the route runs), per-route
+    Cache-Control, and gzip/brotli for large bodies. Streamed responses (the
+    largest payloads) are compressed chunk by chunk as they are forwarded.
+    """
+
+    def __init__(self, app: ASGIApp, version_source: VersionSource, prefix: str = DASHBOARD_PREFIX, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.version_source = version_source
+        self.prefix = prefix
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] not in ("GET", "HEAD") or not scope["path"].startswith(self.prefix):
+            await self.app(scope, receive, send)
+            return
+        cache_control, versioned = CACHE_POLICIES.get(scope["path"][len(self.prefix):].strip("/"), DEFAULT_POLICY)
+        request_headers = Headers(scope=scope)
+        validators: Dict[str, str] = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if versioned:
+            etag, last_modified = data_validators(scope, *self.version_source())
+            validators["ETag"] = etag
+            if last_modified is not None:
+                validators["Last-Modified"] = format_datetime(last_modified, usegmt=True)
+            if not_modified(request_headers, etag, last_modified):
+                await send({"type": "http.response.start", "status": 304,
+                            "headers": [(k.lower().encode(), v.encode()) for k, v in validators.items()]})
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        encoding = choose_encoding(request_headers.get("accept-encoding", ""))
+        start: Optional[Message] = None
+        chunks: List[bytes] = []
+        streaming = False
+        compressor: Optional[StreamCompressor] = None
+
+        async def send_streamed(body: bytes, more_body: bool) -> None:
+            if compressor is not None:
+                body = compressor.compress(body) + (b"" if more_body else compressor.finish())
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal start, streaming, compressor
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            if streaming:
+                await send_streamed(message.get("body", b""), message.get("more_body", False))
+                return
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                # Streaming body: forward what we have and stop buffering
+                streaming = True
+                use = encoding if encoding and scope["method"] != "HEAD" and compressible(start) else None
+                compressor = StreamCompressor(use) if use else None
+                await send(self._start(start, validators, use))
+                await send_streamed(b"".join(chunks), True)
+                return
+            body = b"".join(chunks)
+            if scope["method"] == "HEAD":
+                await send(self._start(start, validators, None))
+                await send({"type": "http.response.body", "body": body})
+                return
+            use = encoding if encoding and len(body) >= self.minimum_size and compressible(start) else None
+            if use:
+                body = compress(body, use)
+            await send(self._start(start, validators, use, len(body)))
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    @staticmethod
+    def _start(start: Message, validators: Dict[str, str], encoding: Optional[str], length: Optional[int] = None) -> Message:
+        headers = MutableHeaders(raw=list(start["headers"]))
+        if start["status"] == 200:
+            for name, value in validators.items():
+                if name == "Vary":
+                    headers.add_vary_header(value)
+                else:
+                    headers[name] = value
+        if encoding:
+            headers["Content-Encoding"] = encoding
+        if length is not None:
+            headers["Content-Length"] = str(length)
+        elif encoding and "content-length" in headers:
+            # A streamed body's compressed length is not known up front
+            del headers["Content-Length"]
+        return {**start, "headers": headers.raw}
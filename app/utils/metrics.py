@@ -0,0 +1,311 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+A handful of counters, gauges and histograms, each a dict of label values to
+numbers behind one lock, so recording a sample costs a dict lookup and an
+add. Gauges can instead be computed at scrape time from a callback. GET
+/metrics renders everything with render().
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.utils.circuit_breaker import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+REDIS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+# Interval of the event-loop lag probe
+LOOP_LAG_INTERVAL = float(os.getenv("METRICS_LOOP_LAG_INTERVAL", 0.5))
+
+Labels = Tuple[str, ...]
+
+_registry: List["Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _key(self, labels: Dict[str, Any]) -> Labels:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Exposition lines for every label set, without HELP/TYPE."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = list(self._values.items())
+        for key, value in values:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Labels, float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._collect = collect
+
+    def set(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def samples(self) -> Iterator[str]:
+        if self._collect is not None:
+            try:
+                values = self._collect()
+            except Exception as e:
+                logger.debug(f"Metric {self.name} collection failed: {e}")
+                return
+            with self._lock:
+                self._values = dict(values)
+        yield from super().samples()
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [per-bucket counts (not cumulative), sum, count]
+        self._values: Dict[Labels, List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = self._key(labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels: Any) -> int:
+        entry = self._values.get(self._key(labels))
+        return entry[2] if entry else 0
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = [(key, list(entry[0]), entry[1], entry[2]) for key, entry in self._values.items()]
+        for key, counts, total, count in values:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {count}"
+
+
+def render() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# --- application metrics ----------------------------------------------------------
+
+HTTP_LATENCY = Histogram("http_request_duration_seconds", "HTTP request latency by route template", ["method", "route", "status"])
+GEMINI_LATENCY = Histogram("gemini_request_duration_seconds", "Gemini generate_content latency", ["caller", "outcome"])
+GEMINI_TOKENS = Counter("gemini_tokens_total", "Gemini tokens reported in usage metadata", ["caller", "kind"])
+GEMINI_FALLBACKS = Counter("gemini_fallbacks_total", "Explanations that fell back to rules instead of Gemini output", ["reason"])
+REDIS_LATENCY = Histogram("redis_command_duration_seconds", "Redis command latency, including breaker rejections", ["command"], REDIS_BUCKETS)
+CACHE_REQUESTS = Counter("cache_requests_total", "Cache lookups by cache and result", ["cache", "result"])
+INGEST_ROWS = Counter("ingest_rows_total", "Rows parsed from uploaded files", ["kind", "result"])
+INGEST_DURATION = Histogram("ingest_duration_seconds", "Time to parse and validate an uploaded file", ["kind"])
+INGEST_RATE = Gauge("ingest_rows_per_second", "Rows per second of the most recent file parse", ["kind"])
+LOOP_LAG = Gauge("event_loop_lag_seconds", "How late the event loop woke the lag probe, latest sample")
+LOOP_LAG_HISTOGRAM = Histogram("event_loop_lag_observed_seconds", "Event loop lag samples", buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0))
+
+
+def _hit_ratios() -> Dict[Labels, float]:
+    with CACHE_REQUESTS._lock:
+        caches = {key[0] for key in CACHE_REQUESTS._values}
+    ratios = {}
+    for cache in caches:
+        hits, misses = CACHE_REQUESTS.value(cache=cache, result="hit"), CACHE_REQUESTS.value(cache=cache, result="miss")
+        if hits + misses:
+            ratios[(cache,)] = hits / (hits + misses)
+    return ratios
+
+
+CACHE_HIT_RATIO = Gauge("cache_hit_ratio", "Hits over lookups since start, per cache", ["cache"], collect=_hit_ratios)
+
+
+def record_cache(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def record_ingest(kind: str, valid: int, invalid: int, seconds: float) -> None:
+    INGEST_ROWS.inc(valid, kind=kind, result="valid")
+    INGEST_ROWS.inc(invalid, kind=kind, result="invalid")
+    INGEST_DURATION.observe(seconds, kind=kind)
+    if seconds > 0:
+        INGEST_RATE.set((valid + invalid) / seconds, kind=kind)
+
+
+def record_gemini_usage(caller: str, response: Any) -> None:
+    """Token counts from a Gemini response's usage_metadata, when it has one."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage is None:
+        return
+    for kind, field in (("prompt", "prompt_token_count"), ("completion", "candidates_token_count")):
+        count = getattr(usage, field, None)
+        if isinstance(count, int) and count:
+            GEMINI_TOKENS.inc(count, caller=caller, kind=kind)
+
+
+def timed_gemini_call(caller: str, call: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """call(*args, **kwargs), recording its latency by outcome and the tokens it used."""
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        response = call(*args, **kwargs)
+        outcome = "ok"
+    except CircuitOpenError:
+        outcome = "circuit_open"
+        raise
+    finally:
+        GEMINI_LATENCY.observe(time.perf_counter() - started, caller=caller, outcome=outcome)
+    record_gemini_usage(caller, response)
+    return response
+
+
+# --- HTTP middleware and loop lag probe ----------------------------------------------
+
+class MetricsMiddleware:
+    """
+    ASGI middleware timing every HTTP request by route template (not raw path,
+    so path parameters do not explode the label set), method and status.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started = time.perf_counter()
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            HTTP_LATENCY.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", None) or "unmatched",
+                status=status,
+            )
+
+
+class LoopLagMonitor:
+    """Sleeps LOOP_LAG_INTERVAL at a time and records how much later than asked it woke."""
+
+    def __init__(self, interval: float = LOOP_LAG_INTERVAL):
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            LOOP_LAG.set(lag)
+            LOOP_LAG_HISTOGRAM.observe(lag)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+loop_lag_monitor = LoopLagMonitor()
@@ -0,0 +1,244 @@
+"""
+Opt-in per-request profiling.
+
+A request is profiled when it carries the admin token (X-Profile-Token header
+or ?profile=<token>), or is picked by PROFILE_SAMPLE_RATE. For that request
+three files are written under PROFILE_DIR:
+
+  <id>.pstats      cProfile of the event-loop thread (pstats / snakeviz);
+                   coroutines of other requests running meanwhile are
+                   included, counted as overlapping_requests in the meta
+  <id>.folded      sampled stacks of every thread in collapsed format
+                   (flamegraph.pl, speedscope), so work handed to
+                   asyncio.to_thread is included
+  <id>.memory.txt  tracemalloc diff between request start and end
+
+plus <id>.json with the request metadata. Only one request is profiled at a
+time. Sampling also needs PROFILE_TOKEN, since that is what unlocks the
+/api/profiles endpoints. With no token configured the middleware passes
+requests straight through.
+"""
+import cProfile
+import hmac
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN") or None
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", 0.0))
+# Seconds between stack samples
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", 0.005))
+# Oldest profiles are deleted beyond this many
+PROFILE_MAX_KEEP = int(os.getenv("PROFILE_MAX_KEEP", 50))
+PROFILE_MEMORY_TOP = 50
+PROFILE_HEADER = "x-profile-token"
+# Never profile the endpoints that serve profiles
+EXCLUDED_PREFIX = "/api/profiles"
+
+PROFILE_FILES = {"pstats": ".pstats", "folded": ".folded", "memory": ".memory.txt"}
+PROFILE_ID = re.compile(r"^[0-9]{8}T[0-9]{6}-[0-9a-f]{6}-[A-Za-z0-9_.-]+$")
+
+
+class StackSampler(threading.Thread):
+    """Samples every other thread's stack at a fixed interval into collapsed-stack counts."""
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        super().__init__(name="profile-sampler", daemon=True)
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        own = threading.get_ident()
+        names = {t.ident: t.name for t in threading.enumerate()}
+        while not self._stop_event.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                    frame = frame.f_back
+                if ident not in names:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                stack.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def stop(self) -> None:
+        self._stop_event.set()
+        self.join()
+
+    def folded(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class RequestProfile:
+    """CPU profile, stack samples and allocation diff for one request."""
+
+    def __init__(self, scope: Scope, trigger: str):
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", scope["path"].strip("/"))[:60] or "root"
+        self.id = f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S}-{os.urandom(3).hex()}-{slug}"
+        self.meta: Dict[str, Any] = {
+            "id": self.id,
+            "method": scope["method"],
+            "path": scope["path"],
+            "trigger": trigger,
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            # cProfile sees every coroutine on the loop thread, not just this request's
+            "pstats_scope": "event_loop_thread",
+            "overlapping_requests": 0,
+        }
+        self._profiler = cProfile.Profile()
+        self._sampler = StackSampler()
+        self._own_tracemalloc = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._own_tracemalloc = True
+        self._before = tracemalloc.take_snapshot()
+        self._sampler.start()
+        self._started = time.perf_counter()
+        self._profiler.enable()
+
+    def stop(self, status: int) -> None:
+        self._profiler.disable()
+        self.meta["duration_seconds"] = round(time.perf_counter() - self._started, 4)
+        self.meta["status"] = status
+        self._sampler.stop()
+        after = tracemalloc.take_snapshot()
+        if self._own_tracemalloc:
+            tracemalloc.stop()
+        self._diff = after.compare_to(self._before, "lineno")
+
+    def save(self, directory: Optional[str] = None) -> None:
+        directory = directory or PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.id)
+        self._profiler.dump_stats(base + PROFILE_FILES["pstats"])
+        with open(base + PROFILE_FILES["folded"], "w") as f:
+            f.write(self._sampler.folded())
+        growth = sum(stat.size_diff for stat in self._diff)
+        with open(base + PROFILE_FILES["memory"], "w") as f:
+            f.write(f"# {self.meta['method']} {self.meta['path']}: {growth / 1024:.1f} KiB net allocated\n")
+            for stat in self._diff[:PROFILE_MEMORY_TOP]:
+                f.write(f"{stat}\n")
+        self.meta["memory_growth_bytes"] = growth
+        self.meta["samples"] = sum(self._sampler.stacks.values())
+        with open(base + ".json", "w") as f:
+            json.dump(self.meta, f)
+        _prune(directory)
+
+
+def _prune(directory: str) -> None:
+    profiles = sorted(p for p in os.listdir(directory) if p.endswith(".json"))
+    for name in profiles[:max(0, len(profiles) - PROFILE_MAX_KEEP)]:
+        profile_id = name[:-len(".json")]
+        for suffix in [".json", *PROFILE_FILES.values()]:
+            try:
+                os.remove(os.path.join(directory, profile_id + suffix))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles(directory: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Saved profiles, newest first."""
+    directory = directory or PROFILE_DIR
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in sorted((p for p in os.listdir(directory) if p.endswith(".json")), reverse=True):
+        try:
+            with open(os.path.join(directory, name)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return profiles
+
+
+def profile_path(profile_id: str, kind: str, directory: Optional[str] = None) -> Optional[str]:
+    """Path of one saved profile file, or None if the id or kind is unknown."""
+    directory = directory or PROFILE_DIR
+    if kind not in PROFILE_FILES or not PROFILE_ID.match(profile_id):
+        return None
+    path = os.path.join(directory, profile_id + PROFILE_FILES[kind])
+    return path if os.path.isfile(path) else None
+
+
+class ProfilingMiddleware:
+    """Profiles token-flagged or sampled HTTP requests; see the module docstring."""
+
+    def __init__(self, app: ASGIApp, token: Optional[str] = PROFILE_TOKEN, sample_rate: float = PROFILE_SAMPLE_RATE, directory: Optional[str] = None):
+        self.app = app
+        self.token = token
+        self.sample_rate = sample_rate
+        self.directory = directory
+        self._busy = threading.Lock()
+        self._active: Optional[RequestProfile] = None
+        if sample_rate and not token:
+            logger.warning("⚠️ PROFILE_SAMPLE_RATE is ignored without PROFILE_TOKEN")
+
+    def _matches(self, value: Optional[str]) -> bool:
+        return value is not None and hmac.compare_digest(value.encode(), self.token.encode())
+
+    def _trigger(self, scope: Scope) -> Optional[str]:
+        if self._matches(Headers(scope=scope).get(PROFILE_HEADER)):
+            return "header"
+        query = scope.get("query_string", b"")
+        if b"profile=" in query and self._matches(parse_qs(query.decode("latin-1")).get("profile", [None])[0]):
+            return "query"
+        if self.sample_rate and random.random() < self.sample_rate:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not self.token:
+            await self.app(scope, receive, send)
+            return
+        trigger = None if scope["path"].startswith(EXCLUDED_PREFIX) else self._trigger(scope)
+        if trigger is None or not self._busy.acquire(blocking=False):
+            active = self._active
+            if active is not None:
+                active.meta["overlapping_requests"] += 1
+            await self.app(scope, receive, send)
+            return
+        profile = self._active = RequestProfile(scope, trigger)
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        try:
+            profile.start()
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            try:
+                profile.stop(status)
+                profile.save(self.directory)
+                logger.info(f"🔬 Saved profile {profile.id} ({profile.meta['duration_seconds']}s)")
+            except Exception as e:
+                logger.warning(f"⚠️ Could not save profile {profile.id}: {e}")
+            finally:
+                self._active = None
+                self._busy.release()
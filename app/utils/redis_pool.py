@@ -0,0 +1,108 @@
+"""
+Shared, connection-pooled Redis access for the whole app.
+
+Sync code paths (context fetchers, the context warmer's worker thread) use
+get_redis(); async request handlers use get_async_redis() so they never block
+the event loop. Both clients are routed through the redis circuit breaker.
+Responses are raw bytes: cached values go through app.utils.cache_codec.
+"""
+import asyncio
+import logging
+import os
+import threading
+import weakref
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+import redis
+import redis.asyncio as aioredis
+
+from app.utils.circuit_breaker import AsyncGuardedClient, GuardedClient, redis_breaker
+from app.utils.metrics import REDIS_LATENCY
+
+logger = logging.getLogger(__name__)
+
+
+def _redis_url() -> str:
+    url = os.getenv("REDIS_URL")
+    if url:
+        return url
+    host = os.getenv("REDIS_HOST", "localhost")
+    port = int(os.getenv("REDIS_PORT", 6379))
+    return f"redis://{host}:{port}/0"
+
+
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", 50))
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", 1.0))
+
+_POOL_KWARGS = {
+    "max_connections": REDIS_MAX_CONNECTIONS,
+    "decode_responses": False,
+    "socket_connect_timeout": REDIS_SOCKET_TIMEOUT,
+    "socket_timeout": REDIS_SOCKET_TIMEOUT,
+}
+
+_lock = threading.Lock()
+_sync_pool: Optional[redis.ConnectionPool] = None
+_sync_client: Optional[GuardedClient] = None
+# asyncio connections are bound to the loop that created them, so keep one pool per loop
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+
+def get_redis() -> GuardedClient:
+    """Return the process-wide pooled sync client."""
+    global _sync_pool, _sync_client
+    if _sync_client is None:
+        with _lock:
+            if _sync_client is None:
+                _sync_pool = redis.ConnectionPool.from_url(_redis_url(), **_POOL_KWARGS)
+                _sync_client = GuardedClient(redis.Redis(connection_pool=_sync_pool), redis_breaker, REDIS_LATENCY)
+    return _sync_client
+
+
+def get_async_redis() -> AsyncGuardedClient:
+    """Return the pooled asyncio client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        pool = aioredis.ConnectionPool.from_url(_redis_url(), **_POOL_KWARGS)
+        client = AsyncGuardedClient(aioredis.Redis(connection_pool=pool), redis_breaker, REDIS_LATENCY)
+        _async_clients[loop] = client
+    return client
+
+
+def _pool_metrics(pool: Any) -> Dict[str, Any]:
+    in_use = len(getattr(pool, "_in_use_connections", ()))
+    available = len(getattr(pool, "_available_connections", ()))
+    return {
+        "max_connections": pool.max_connections,
+        "created_connections": getattr(pool, "_created_connections", in_use + available),
+        "in_use_connections": in_use,
+        "available_connections": available,
+    }
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Connection pool metrics for /health."""
+    stats: Dict[str, Any] = {"host": urlparse(_redis_url()).hostname, "sync": None, "async": None}
+    if _sync_pool is not None:
+        stats["sync"] = _pool_metrics(_sync_pool)
+    try:
+        client = _async_clients.get(asyncio.get_running_loop())
+    except RuntimeError:
+        client = None
+    if client is not None:
+        stats["async"] = _pool_metrics(client.connection_pool)
+    return stats
+
+
+async def close_redis() -> None:
+    """Release pooled connections on shutdown; the pools reconnect lazily if reused."""
+    try:
+        client = _async_clients.pop(asyncio.get_running_loop(), None)
+    except RuntimeError:
+        client = None
+    if client is not None:
+        await client.connection_pool.disconnect()
+    if _sync_pool is not None:
+        _sync_pool.disconnect()
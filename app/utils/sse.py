@@ -0,0 +1,13 @@
+"""Server-sent events framing for streaming endpoints."""
+import json
+from typing import Any, Iterable, Iterator, Tuple
+
+
+def format_sse(event: str, data: Any) -> str:
+    # json.dumps never emits raw newlines, so each payload fits on one data: line
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_stream(events: Iterable[Tuple[str, Any]]) -> Iterator[str]:
+    for event, data in events:
+        yield format_sse(event, data)
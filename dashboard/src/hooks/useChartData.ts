@@ -2,8 +2,8 @@ import { useQuery } from 'react-query';
 import dayjs from 'dayjs';
 import { FilterState } from '../ui/FilterPane';
 
-export function useChartData(filters: FilterState) {
-  return useQuery(['chart-data', filters], async () => {
+export function useChartData(filters: FilterState, width?: number) {
+  return useQuery(['chart-data', filters, width], async () => {
     // Set default date range to last 7 days if not provided
     const start = filters.startDate || dayjs().subtract(7, 'day').format('YYYY-MM-DD');
     const end = filters.endDate || dayjs().format('YYYY-MM-DD');
@@ -12,6 +12,8 @@ export function useChartData(filters: FilterState) {
     url.searchParams.append('end', end);
     if (filters.sku) url.searchParams.append('sku', filters.sku);
     if (filters.store) url.searchParams.append('store', filters.store);
+    // Server downsamples long ranges to roughly one point per pixel
+    if (width) url.searchParams.append('width', String(Math.round(width)));
     // Additional signal filters (if API supports)
     // ...existing code for other filters...
     const res = await fetch(url.toString());
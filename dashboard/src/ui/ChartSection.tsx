@@ -24,10 +24,12 @@ const defaultChartData = [
 ];
 
 export const ChartSection: React.FC<{ filters: FilterState }> = ({ filters }) => {
-  const { data: chartData, isLoading, error } = useChartData(filters);
+  // Bucket the server-side downsampling to 100px so resizes don't refetch constantly
+  const chartWidth = Math.max(200, Math.ceil(window.innerWidth / 100) * 100);
+  const { data: chartData, isLoading, error } = useChartData(filters, chartWidth);
   const [selectedForecast, setSelectedForecast] = useState<any>(null);
   const [loadingDetail, setLoadingDetail] = useState<boolean>(false);
-  // Transform API response { labels: string[], values: number[] } into array of data points
+  // Transform API response { labels, values, actual, points } into array of data points
   const formattedData = useMemo(() => {
     if (
       chartData &&
@@ -39,7 +41,8 @@ export const ChartSection: React.FC<{ filters: FilterState }> = ({ filters }) =>
         store_id: filters.store,
         forecast_date: date,
         predicted: (chartData as any).values[i],
-        actual: (chartData as any).values[i]
+        actual: (chartData as any).actual?.[i] ?? null,
+        overlays: (chartData as any).points?.[i]?.overlays ?? []
       }));
     }
     return [];
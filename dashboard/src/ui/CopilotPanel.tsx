@@ -14,6 +14,33 @@ interface CopilotResponse {
   };
 }
 
+// Minimal SSE reader for a fetch() body (EventSource only supports GET)
+const readEvents = async (
+  body: ReadableStream<Uint8Array>,
+  onEvent: (event: string, data: any) => void
+) => {
+  const reader = body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, boundary);
+      buffer = buffer.slice(boundary + 2);
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+};
+
 export const CopilotPanel: React.FC<{ 
   filters: FilterState;
   onAction?: (action: { type: string; params: Record<string, any> }) => void;
@@ -34,18 +61,33 @@ export const CopilotPanel: React.FC<{
   const submit = async () => {
     if (!query.trim()) return;
     setLoading(true);
+    setAnswer(null);
     try {
       const res = await fetch('/api/dashboard/copilot', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ query, filters }),
+        headers: { 'Content-Type': 'application/json', Accept: 'text/event-stream' },
+        body: JSON.stringify({ query, filters, stream: true }),
       });
-      const data = await res.json();
-      setAnswer(data);
-      
+      if (!res.ok || !res.body) throw new Error(`Copilot request failed: ${res.status}`);
+
+      // Render "answer" deltas as they arrive; "final" carries the complete response
+      let final: CopilotResponse | null = null;
+      let text = '';
+      await readEvents(res.body, (event, data) => {
+        if (event === 'answer') {
+          text += data.text;
+          setLoading(false);
+          setAnswer({ answer: text });
+        } else if (event === 'final') {
+          final = data;
+          setAnswer(data);
+        }
+      });
+
       // Trigger action if provided
-      if (data.action && onAction) {
-        onAction(data.action);
+      const action = (final as CopilotResponse | null)?.action;
+      if (action && onAction) {
+        onAction(action);
       }
     } catch (err) {
       console.error('Copilot error', err);
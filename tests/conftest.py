@@ -0,0 +1,191 @@
+import time
+from datetime import date
+
+import pytest
+
+from app.models.forecast_row import ForecastRow
+
+
+def forecast_row(sku_id="SKU_A", store_id="S1", forecast_date=date(2025, 7, 1), **overrides):
+    """ForecastRow with test defaults; keyword overrides use ForecastRow field names."""
+    fields = {"generated_at": date(2025, 6, 1), "predicted_demand": 100, **overrides}
+    return ForecastRow(sku_id=sku_id, store_id=store_id, forecast_date=forecast_date, **fields)
+
+
+class FakePipeline:
+    """Queues commands and replays them against FakeRedis on execute()."""
+
+    def __init__(self, redis):
+        self._redis = redis
+        self._commands = []
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        commands, self._commands = self._commands, []
+        return [getattr(self._redis, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the subset of redis-py used by the app."""
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+
+    def _alive(self, key):
+        exp = self.expiry.get(key)
+        if exp is not None and exp <= time.time():
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return key in self.data
+
+    def ping(self):
+        return True
+
+    def get(self, key):
+        return self.data.get(key) if self._alive(key) else None
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and self._alive(key):
+            return None
+        self.data[key] = value
+        self.expiry.pop(key, None)
+        if ex:
+            self.expiry[key] = time.time() + ex
+        return True
+
+    def setex(self, key, ttl, value):
+        return self.set(key, value, ex=ttl)
+
+    def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self._alive(key):
+                removed += 1
+            self.data.pop(key, None)
+            self.expiry.pop(key, None)
+        return removed
+
+    def exists(self, *keys):
+        return sum(1 for key in keys if self._alive(key))
+
+    def expire(self, key, ttl):
+        if not self._alive(key):
+            return False
+        self.expiry[key] = time.time() + ttl
+        return True
+
+    def ttl(self, key):
+        if not self._alive(key):
+            return -2
+        exp = self.expiry.get(key)
+        return -1 if exp is None else int(exp - time.time())
+
+    def hset(self, key, field, value):
+        self._alive(key)
+        fields = self.data.setdefault(key, {})
+        added = field not in fields
+        fields[field] = value
+        return int(added)
+
+    def hget(self, key, field):
+        return self.data[key].get(field) if self._alive(key) else None
+
+    def hmget(self, key, fields):
+        return [self.hget(key, field) for field in fields]
+
+    def hlen(self, key):
+        return len(self.data[key]) if self._alive(key) else 0
+
+    def zincrby(self, key, amount, member):
+        self._alive(key)
+        zset = self.data.setdefault(key, {})
+        zset[member] = zset.get(member, 0) + amount
+        return zset[member]
+
+    def zunion(self, keys, withscores=False):
+        totals = {}
+        for key in keys:
+            if self._alive(key):
+                for member, score in self.data[key].items():
+                    totals[member] = totals.get(member, 0) + score
+        ranked = sorted(totals.items(), key=lambda item: item[1])
+        return [list(item) for item in ranked] if withscores else [m for m, _ in ranked]
+
+    def zrevrange(self, key, start, end):
+        if not self._alive(key):
+            return []
+        ranked = sorted(self.data[key].items(), key=lambda item: item[1], reverse=True)
+        return [m for m, _ in ranked[start:end + 1]]
+
+    def xadd(self, key, fields, maxlen=None, approximate=True):
+        stream = self.data.setdefault(key, [])
+        stream.append(fields)
+        if maxlen is not None:
+            del stream[:-maxlen]
+        return f"{int(time.time() * 1000)}-{len(stream)}".encode()
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class AsyncFakePipeline(FakePipeline):
+    async def execute(self):
+        return FakePipeline.execute(self)
+
+
+class AsyncFakeRedis:
+    """Awaitable facade over FakeRedis, mirroring redis.asyncio."""
+
+    def __init__(self, sync=None):
+        self.sync = sync or FakeRedis()
+        self.pipelines_executed = 0
+
+    def pipeline(self, transaction=True):
+        fake = self
+
+        class CountingPipeline(AsyncFakePipeline):
+            async def execute(self):
+                fake.pipelines_executed += 1
+                return await AsyncFakePipeline.execute(self)
+
+        return CountingPipeline(self.sync)
+
+    def __getattr__(self, name):
+        method = getattr(self.sync, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+
+        return call
+
+
+@pytest.fixture(autouse=True)
+def isolated_forecast_store(tmp_path, monkeypatch):
+    """Keep store snapshots out of the repo and start every test with no data."""
+    from app.services.explanation_store import explanation_store
+    from app.services.forecast_store import forecast_store
+    from app.services.query_cache import query_cache
+    monkeypatch.setenv("FORECAST_STORE_DIR", str(tmp_path / "store"))
+    # Query results are shared through Redis; give each test its own
+    monkeypatch.setattr(query_cache, "redis", FakeRedis())
+    forecast_store.reset()
+    explanation_store.clear()
+    yield forecast_store
+    forecast_store.reset()
+    explanation_store.clear()
+
+
+@pytest.fixture
+def fake_redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def async_fake_redis():
+    return AsyncFakeRedis()
@@ -0,0 +1,87 @@
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import analytics_sink as sink_module
+from app.services.analytics_sink import AnalyticsSink, BufferFull
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def sink(tmp_path, monkeypatch):
+    sink = AnalyticsSink(capacity=5, directory=str(tmp_path / "analytics"))
+    monkeypatch.setattr("app.api.analytics.analytics_sink", sink)
+    return sink
+
+
+def read_events(directory):
+    events = []
+    for path in sorted(directory.iterdir()):
+        with gzip.open(path, "rt") as f:
+            events.extend(json.loads(line) for line in f)
+    return events
+
+
+def test_batches_are_buffered_and_counted(sink):
+    response = client.post("/api/analytics", json=[
+        {"type": "tile_click", "page": "/dashboard", "tile": "accuracy"},
+        {"event": "chart_hover", "path": "/dashboard"},
+    ])
+    assert response.status_code == 202 and response.json() == {"accepted": 2}
+    # A single event object is still accepted
+    assert client.post("/api/analytics", json={"type": "tile_click", "page": "/ui"}).status_code == 202
+    assert len(sink) == 3
+    summary = client.get("/api/analytics/summary").json()
+    assert summary["totals"]["by_type"] == {"tile_click": 2, "chart_hover": 1}
+    assert summary["window"]["by_page"] == {"/dashboard": 2, "/ui": 1}
+
+
+def test_labels_are_capped_and_events_size_limited(tmp_path, monkeypatch):
+    monkeypatch.setattr(sink_module, "ANALYTICS_MAX_LABELS", 2)
+    sink = AnalyticsSink(capacity=100, directory=str(tmp_path))
+    sink.record([{"type": f"t{i}", "page": "/p"} for i in range(5)])
+    sink.record([{"type": "t0"}, {"type": "t9"}])
+    assert sink.summary()["totals"]["by_type"] == {"other": 4, "t0": 2, "t1": 1}
+    monkeypatch.setattr("app.api.analytics.analytics_sink", sink)
+    response = client.post("/api/analytics", json={"type": "big", "blob": "x" * 10_000})
+    assert response.status_code == 400 and "limit" in response.json()["error"]
+
+
+def test_full_buffer_refuses_batch(sink):
+    sink.record([{"type": "a"}] * 4)
+    response = client.post("/api/analytics", json=[{"type": "b"}, {"type": "b"}])
+    assert response.status_code == 429 and "Retry-After" in response.headers
+    # Refused events are not counted
+    assert sink.summary()["totals"]["events"] == 4
+    assert client.post("/api/analytics", json=["not an object"]).status_code == 400
+
+
+def test_flush_appends_compressed_members(sink, tmp_path):
+    sink.record([{"type": "a", "page": "/x", "tile": 1}])
+    assert sink.flush() == 1
+    sink.record([{"type": "b"}, {"type": "c"}])
+    assert sink.flush() == 2 and len(sink) == 0
+    events = read_events(tmp_path / "analytics")
+    assert [e["type"] for e in events] == ["a", "b", "c"]
+    assert events[0]["props"] == {"tile": 1}
+
+
+def test_redis_stream_and_failed_flush_keeps_events(fake_redis, monkeypatch):
+    sink = AnalyticsSink(capacity=10, sink="redis", redis_client=fake_redis)
+    sink.record([{"type": "a"}, {"type": "b"}])
+    assert sink.flush() == 2
+    assert [e["type"] for e in fake_redis.data[sink_module.ANALYTICS_STREAM]] == ["a", "b"]
+
+    def broken(batch):
+        raise ConnectionError("redis down")
+
+    monkeypatch.setattr(sink, "_write_stream", broken)
+    sink.record([{"type": "c"}])
+    assert sink.flush() == 0 and len(sink) == 1
+    assert sink.stats()["flush_errors"] == 1
+    with pytest.raises(BufferFull):
+        sink.record([{"type": "d"}] * 10)
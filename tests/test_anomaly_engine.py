@@ -0,0 +1,53 @@
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.anomaly_engine import anomaly_cards, score_rows
+from tests.conftest import forecast_row
+
+client = TestClient(app)
+START = date(2025, 7, 1)
+
+
+def row(sku, store, day, **fields):
+    """A forecast `day` days after START with a 100 ± 10 history."""
+    return forecast_row(sku, store, START + timedelta(days=day), hist_sales_4w_avg=100, hist_sales_stddev=10, **fields)
+
+
+def test_scores_z_breach_and_flag(isolated_forecast_store):
+    isolated_forecast_store.ingest([
+        row("SKU_A", "S1", 0, actual_demand=160),  # +6σ
+        row("SKU_B", "S1", 0, actual_demand=105),
+        row("SKU_C", "S1", 0, anomaly_flag=True),
+        row("SKU_D", "S1", 0, actual_demand=104, conf_interval_lower=90, conf_interval_upper=102),
+    ])
+    scores = score_rows()
+    assert scores["anomalous"].sum() == 3
+    assert sorted(scores["z"].round(1)) == [0.0, 0.4, 0.5, 6.0]
+
+
+def test_cards_rank_series_by_peak_impact(isolated_forecast_store):
+    rows = [row(f"SKU_{i}", "S1", day, actual_demand=100) for i in range(20) for day in range(5)]
+    rows += [
+        row("SKU_3", "S1", 1, actual_demand=200),
+        row("SKU_3", "S1", 2, actual_demand=180),
+        row("SKU_7", "S1", 4, actual_demand=20),
+        row("SKU_9", "S1", 3, actual_demand=150),
+        row("SKU_12", "S1", 0, actual_demand=140),
+    ]
+    isolated_forecast_store.ingest(rows)
+    cards = anomaly_cards(START, START + timedelta(days=4))
+    assert [c["title"] for c in cards] == ["Demand spike: SKU_3", "Demand drop: SKU_7", "Demand spike: SKU_9"]
+    assert cards[0]["action"]["params"] == {"sku_id": "SKU_3", "store_id": "S1", "forecast_date": "2025-07-02"}
+    assert cards[0]["body"].startswith("Actual 200 units vs 100 expected (+10.0σ")
+    # The window and filters narrow the candidates
+    assert [c["title"] for c in anomaly_cards(START, START, store="S1")] == ["Demand spike: SKU_12"]
+
+
+def test_storycards_endpoint_serves_anomaly_cards(isolated_forecast_store):
+    isolated_forecast_store.ingest([row("SKU_A", "S1", 0, actual_demand=160), row("SKU_B", "S1", 0, actual_demand=100)])
+    res = client.get("/api/dashboard/storycards", params={"start": "2025-07-01", "end": "2025-07-01"})
+    anomalies = [c for c in res.json() if c["type"] == "anomaly"]
+    assert [c["title"] for c in anomalies] == ["Demand spike: SKU_A"]
+    assert anomalies[0]["confidence"] == 0.99
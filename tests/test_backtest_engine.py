@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import backtest_engine as engine
+from app.services.backtest_engine import backtest_engine
+from tests.conftest import forecast_row
+
+client = TestClient(app)
+DAY = date(2025, 7, 1)
+JUNE, JULY = date(2025, 6, 1), date(2025, 6, 8)
+
+
+def actuals(*rows):
+    return [{"sku_id": sku, "store_id": store, "forecast_date": day.isoformat(), "actual_demand": actual}
+            for sku, store, day, actual in rows]
+
+
+@pytest.fixture
+def store(isolated_forecast_store):
+    isolated_forecast_store.ingest([
+        forecast_row("SKU_A", "S1", DAY, predicted_demand=120, conf_interval_lower=100, conf_interval_upper=130, product_category="Rainwear"),
+        forecast_row("SKU_A", "S1", DAY + timedelta(days=1), predicted_demand=80, conf_interval_lower=70, conf_interval_upper=90,
+                     product_category="Rainwear"),
+        forecast_row("SKU_B", "S2", DAY, predicted_demand=150, conf_interval_lower=90, conf_interval_upper=110, product_category="Umbrellas"),
+        # A later snapshot that has no actuals yet
+        forecast_row("SKU_C", "S2", DAY + timedelta(days=7), predicted_demand=50, generated_at=JULY, product_category="Rainwear"),
+    ])
+    return isolated_forecast_store
+
+
+def test_actuals_ingest_and_metrics(store):
+    response = client.post("/api/ingest/actuals", json=actuals(
+        ("SKU_A", "S1", DAY, 100), ("SKU_A", "S1", DAY + timedelta(days=1), 100),
+        ("SKU_B", "S2", DAY, 100), ("SKU_X", "S9", DAY, 5),
+    ))
+    assert response.status_code == 200
+    assert response.json()["matched_row_count"] == 3 and response.json()["unmatched_row_count"] == 1
+
+    report = client.get("/api/dashboard/accuracy", params={"level": "store"}).json()
+    # Defaults to the newest snapshot with actuals
+    assert report["generated_at"] == "2025-06-01"
+    overall = report["overall"]
+    # Errors +20, -20, +50 against 300 units of actual demand
+    assert overall["forecasts"] == 3
+    assert overall["wape"] == pytest.approx(90 / 300, abs=1e-4)
+    assert overall["bias"] == pytest.approx(50 / 300, abs=1e-4)
+    assert overall["mape"] == pytest.approx(0.3, abs=1e-4)
+    # Actuals of 100 fall inside [100, 130] and [90, 110] but not [70, 90]
+    assert overall["interval_coverage"] == pytest.approx(2 / 3, abs=1e-4)
+    assert [(g["store_id"], g["wape"]) for g in report["groups"]] == [("S2", 0.5), ("S1", 0.2)]
+    assert [(s["generated_at"], s["with_actuals"]) for s in report["snapshots"]] == [("2025-06-08", 0), ("2025-06-01", 3)]
+
+    category = client.get("/api/dashboard/accuracy", params={"level": "category", "limit": 1}).json()
+    assert category["group_count"] == 2 and category["groups"][0]["product_category"] == "Umbrellas"
+
+
+def test_results_cached_per_snapshot(store, monkeypatch):
+    client.post("/api/ingest/actuals", json=actuals(("SKU_A", "S1", DAY, 100)))
+    first = backtest_engine.report("2025-06-01", "sku")
+    calls = []
+    original = engine.backtest
+    monkeypatch.setattr(engine, "backtest", lambda frame, level: calls.append(level) or original(frame, level))
+    assert backtest_engine.report("2025-06-01", "sku") == first and calls == []
+    # Actuals for another snapshot leave this one cached
+    store.ingest([forecast_row("SKU_D", "S3", DAY, predicted_demand=10, generated_at=JULY, product_category="Rainwear")])
+    backtest_engine.report("2025-06-01", "sku")
+    assert calls == []
+    # Actuals for this snapshot recompute it
+    client.post("/api/ingest/actuals", json=actuals(("SKU_B", "S2", DAY, 100)))
+    assert backtest_engine.report("2025-06-01", "sku")["overall"]["forecasts"] == 2
+    assert calls == ["sku"]
+
+
+def test_reingest_keeps_actuals_and_evicts_replaced_snapshot(store):
+    client.post("/api/ingest/actuals", json=actuals(("SKU_A", "S1", DAY, 100)))
+    assert backtest_engine.report("2025-06-01", "sku")["overall"]["forecasts"] == 1
+    # The same forecast re-uploaded in a newer snapshot keeps its actual
+    store.ingest([forecast_row("SKU_A", "S1", DAY, predicted_demand=110, generated_at=JULY)])
+    assert store.query(sku="SKU_A", start=DAY, end=DAY)["actual_demand"].tolist() == [100.0]
+    # and the older snapshot's cached report no longer counts the replaced row
+    assert backtest_engine.report("2025-06-01", "sku")["overall"]["forecasts"] == 0
+    assert backtest_engine.report("2025-06-08", "sku")["overall"]["forecasts"] == 1
+
+
+def test_actuals_csv_and_bad_level(store, tmp_path):
+    path = tmp_path / "actuals.csv"
+    path.write_text("sku_id,store_id,forecast_date,actual_demand\nSKU_A,S1,2025-07-01,100\nSKU_B,S2,07/01/2025,100\nSKU_B,S2,2025-07-01,-4\nSKU_B,S2,2025-07-01,2.5\n")
+    with open(path, "rb") as f:
+        body = client.post("/api/ingest/actuals/csv", files={"file": ("actuals.csv", f, "text/csv")}).json()
+    # Fractional demand is rejected, as the JSON path's ActualRow does
+    assert (body["valid_row_count"], body["invalid_row_count"], body["matched_row_count"]) == (1, 3, 1)
+    assert client.post("/api/ingest/actuals", json=[{"sku_id": "SKU_A", "store_id": "S1", "forecast_date": "2025-07-01", "actual_demand": 2.5}]).status_code == 422
+    assert client.get("/api/dashboard/accuracy", params={"level": "planet"}).status_code == 400
@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.forecast_row import ForecastRow
+from app.services.bitmap_index import _container, bitmap_index
+
+client = TestClient(app)
+START = date(2025, 7, 1)
+
+
+@pytest.fixture
+def store(isolated_forecast_store):
+    rng = np.random.default_rng(7)
+    rows = []
+    for i in range(6):
+        for sku in ("SKU_A", "SKU_B", "SKU_C"):
+            for store in ("S1", "S2", "S3"):
+                rows.append(ForecastRow(
+                    sku_id=sku, store_id=store, forecast_date=START + timedelta(days=i), generated_at=START,
+                    product_category="Rainwear" if sku != "SKU_C" else "Snacks",
+                    predicted_demand=int(rng.integers(10, 100)),
+                    weather_type=["rain", "sunny", "snow", "cloudy"][int(rng.integers(4))],
+                    promotion_flag=bool(rng.random() < 0.3), anomaly_flag=bool(rng.random() < 0.1),
+                    top_influencer="social_trend" if rng.random() < 0.2 else "weather",
+                ))
+    isolated_forecast_store.ingest(rows)
+    return isolated_forecast_store
+
+
+def brute_force(frame, start=None, end=None, sku=None, store=None, category=None, weather=False, promotions=False):
+    mask = np.ones(len(frame), dtype=bool)
+    if start:
+        mask &= (frame["forecast_date"] >= str(start)).to_numpy()
+    if end:
+        mask &= (frame["forecast_date"] <= str(end)).to_numpy()
+    for column, value in (("sku_id", sku), ("store_id", store), ("product_category", category)):
+        if value:
+            mask &= (frame[column] == value).to_numpy()
+    if weather or promotions:
+        signal = np.zeros(len(frame), dtype=bool)
+        if weather:
+            signal |= frame["weather_type"].isin(["rain", "snow"]).to_numpy()
+        if promotions:
+            signal |= frame["promotion_flag"].to_numpy()
+        mask &= signal
+    return frame[mask]
+
+
+def keys(frame):
+    return sorted(zip(frame["sku_id"], frame["store_id"], frame["forecast_date"]))
+
+
+@pytest.mark.parametrize("filters, signals", [
+    ({}, None),
+    ({"store": "S2"}, None),
+    ({"sku": "SKU_B", "store": "S1"}, ["weather"]),
+    ({"category": "Rainwear"}, ["weather", "promotions"]),
+    ({"start": START + timedelta(days=2), "end": START + timedelta(days=3), "store": "S3"}, ["promotions"]),
+    ({"sku": "SKU_Z"}, None),
+])
+def test_query_matches_scan(store, filters, signals):
+    found = bitmap_index.query(signals=signals, **filters)
+    expected = brute_force(store.frame, **filters, weather="weather" in (signals or []), promotions="promotions" in (signals or []))
+    assert keys(found) == keys(expected)
+    assert found["forecast_date"].is_monotonic_increasing
+
+
+def test_ingest_rebuilds_touched_partitions(store):
+    day = START + timedelta(days=8)
+    assert bitmap_index.query(day, day).empty
+    store.ingest([ForecastRow(sku_id="SKU_A", store_id="S9", forecast_date=day, generated_at=START,
+                              predicted_demand=5, anomaly_flag=True)])
+    found = bitmap_index.query(day, day, signals=["anomalies"])
+    assert keys(found) == [("SKU_A", "S9", np.datetime64(day, "ns"))]
+    with pytest.raises(ValueError):
+        bitmap_index.query(signals=["astrology"])
+
+
+def test_sparse_values_use_row_arrays():
+    rows = np.array([3, 900])
+    assert _container(rows, 1000).dtype == np.int32
+    dense = _container(np.arange(0, 1000, 2), 1000)
+    assert dense.dtype == np.uint8 and len(dense) == 125
+
+
+def test_chart_signal_filter(store):
+    promoted = brute_force(store.frame, promotions=True)
+    body = client.get("/api/dashboard/chart", params={"signals": "promotions"}).json()
+    assert sum(body["values"]) == promoted["predicted_demand"].sum()
+    assert client.get("/api/dashboard/chart", params={"signals": "astrology"}).status_code == 400
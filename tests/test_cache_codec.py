@@ -0,0 +1,46 @@
+import json
+from datetime import date
+import pytest
+from app.utils import cache_codec
+
+
+@pytest.fixture(autouse=True)
+def reset_stats():
+    cache_codec.stats.reset()
+
+
+def test_small_value_roundtrip_uncompressed():
+    data = cache_codec.encode(["Headline One", "Headline Two"])
+    assert data[:2] == cache_codec.MAGIC + bytes([cache_codec.VERSION])
+    assert not data[2] & cache_codec.FLAG_ZSTD
+    assert cache_codec.decode(data) == ["Headline One", "Headline Two"]
+
+
+def test_large_value_is_compressed():
+    explanations = [
+        {
+            "sku_id": f"SKU{i}", "store_id": "ST01", "forecast_date": date(2025, 7, 20),
+            "narrative_explanation": "Demand is expected to rise due to promotional activity.",
+            "confidence_score": 0.8,
+        }
+        for i in range(200)
+    ]
+    data = cache_codec.encode(explanations)
+    assert data[2] & cache_codec.FLAG_ZSTD
+    decoded = cache_codec.decode(data)
+    assert decoded[0]["forecast_date"] == "2025-07-20"
+    assert len(decoded) == 200
+    assert len(data) < len(json.dumps(explanations, default=str))
+    assert cache_codec.codec_stats()["compression_ratio"] > 1
+
+
+def test_legacy_json_entries_still_decode():
+    assert cache_codec.decode('[10, 20, 30]') == [10, 20, 30]
+    assert cache_codec.decode(b'["a"]') == ["a"]
+    assert cache_codec.decode(None) is None
+    assert cache_codec.codec_stats()["legacy_decoded"] == 2
+
+
+def test_unknown_version_rejected():
+    with pytest.raises(ValueError):
+        cache_codec.decode(cache_codec.MAGIC + bytes([99, 0]) + b"\x90")
@@ -0,0 +1,118 @@
+import asyncio
+
+import pytest
+from app.utils.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    GuardedClient,
+    CLOSED,
+    OPEN,
+    HALF_OPEN,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def failing():
+    raise ConnectionError("boom")
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker("test", failure_threshold=2, recovery_timeout=10, clock=clock)
+
+
+def test_opens_after_threshold_and_fails_fast(breaker):
+    calls = []
+
+    def tracked():
+        calls.append(1)
+        raise ConnectionError("down")
+
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(tracked)
+    assert breaker.state == OPEN
+
+    # Open circuit rejects without invoking the function
+    with pytest.raises(CircuitOpenError):
+        breaker.call(tracked)
+    assert len(calls) == 2
+    assert breaker.snapshot()["rejected_calls"] == 1
+
+
+def test_half_open_probe_success_closes(breaker, clock):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+    clock.now = 10
+    assert breaker.state == HALF_OPEN
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == CLOSED
+    assert breaker.snapshot()["consecutive_failures"] == 0
+
+
+def test_half_open_probe_failure_reopens(breaker, clock):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+    clock.now = 10
+    with pytest.raises(ConnectionError):
+        breaker.call(failing)
+    assert breaker.state == OPEN
+    assert breaker.retry_after() == pytest.approx(10)
+
+
+def test_half_open_limits_concurrent_probes(breaker, clock):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+    clock.now = 10
+    assert breaker.allow_request() is True
+    assert breaker.allow_request() is False
+
+
+def test_cancelled_half_open_probe_releases_its_slot(breaker, clock):
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(failing)
+    clock.now = 10
+
+    async def scenario():
+        probe = asyncio.ensure_future(breaker.call_async(asyncio.sleep, 60))
+        await asyncio.sleep(0)
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        # The cancelled probe says nothing about the dependency; the next one runs
+        return await breaker.call_async(asyncio.sleep, 0, "ok")
+
+    assert asyncio.run(scenario()) == "ok"
+    assert breaker.state == CLOSED
+
+
+def test_guarded_client_routes_calls_through_breaker(breaker):
+    class Client:
+        host = "localhost"
+
+        def get(self, key):
+            raise ConnectionError("redis down")
+
+    guarded = GuardedClient(Client(), breaker)
+    assert guarded.host == "localhost"
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            guarded.get("k")
+    with pytest.raises(CircuitOpenError):
+        guarded.get("k")
@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.forecast_explaination import ForecastExplanation
+from app.services.confidence_history import ConfidenceHistory
+from app.services.explanation_store import ExplanationStore, explanation_store
+
+client = TestClient(app)
+START = date(2025, 7, 1)
+
+
+def explanation(sku, day, confidence, store="S1"):
+    return ForecastExplanation(sku_id=sku, store_id=store, forecast_date=START + timedelta(days=day),
+                               narrative_explanation="n", confidence_score=confidence)
+
+
+def test_ring_keeps_last_scores_oldest_first():
+    history = ConfidenceHistory(ExplanationStore(), length=3, slots=1)
+    for day, score in enumerate([0.1, 0.2, 0.3, 0.4, 0.5]):
+        history.push("SKU_A", "S1", START + timedelta(days=day), score)
+    history.push("SKU_B", "S1", START, 0.9)  # forces the array to grow
+    history.push("SKU_A", "S1", START + timedelta(days=4), 0.55)  # same date replaces the latest
+    assert [p["confidence"] for p in history.history("SKU_A", "S1")] == [0.3, 0.4, 0.55]
+    assert history.history("SKU_A", "S1")[0]["date"] == "2025-07-03"
+    assert history.histories([("SKU_B", "S1"), ("SKU_X", "S1")]) == [[{"date": "2025-07-01", "confidence": 0.9}], []]
+
+
+def test_out_of_order_dates_stay_sorted_and_unique():
+    history = ConfidenceHistory(ExplanationStore(), length=3, slots=1)
+    for day, score in [(4, 0.5), (2, 0.3), (4, 0.55), (3, 0.4)]:
+        history.push("SKU_A", "S1", START + timedelta(days=day), score)
+    points = history.history("SKU_A", "S1")
+    assert [p["date"] for p in points] == ["2025-07-03", "2025-07-04", "2025-07-05"]
+    assert [p["confidence"] for p in points] == [0.3, 0.4, 0.55]
+    # Full ring: an older date is dropped, a newer one still evicts the oldest
+    history.push("SKU_A", "S1", START, 0.1)
+    history.push("SKU_A", "S1", START + timedelta(days=6), 0.7)
+    assert [p["confidence"] for p in history.history("SKU_A", "S1")] == [0.4, 0.55, 0.7]
+
+
+def test_snapshot_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setenv("FORECAST_STORE_DIR", str(tmp_path))
+    history = ConfidenceHistory(ExplanationStore(), length=3)
+    history.push("SKU_A", "S1", START, 0.7)
+    history.save()
+    restored = ConfidenceHistory(ExplanationStore(), length=3)
+    assert restored.load()
+    assert restored.history("SKU_A", "S1") == [{"date": "2025-07-01", "confidence": 0.7}]
+
+
+def test_endpoint_reads_recorded_explanations():
+    explanation_store.record([explanation("SKU_A", 0, 0.6), explanation("SKU_A", 1, 0.8), explanation("SKU_B", 0, 0.5)])
+    single = client.get("/api/dashboard/confidence-history", params={"sku": "SKU_A", "store": "S1"}).json()
+    assert [p["confidence"] for p in single["history"]] == [0.6, 0.8]
+    grid = client.get("/api/dashboard/confidence-history", params=[("pairs", "SKU_A|S1"), ("pairs", "SKU_B|S1")]).json()
+    assert [len(s["history"]) for s in grid["series"]] == [2, 1]
+    assert client.get("/api/dashboard/confidence-history", params={"pairs": "SKU_A"}).status_code == 400
+    assert client.get("/api/dashboard/confidence-history").status_code == 400
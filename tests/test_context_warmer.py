@@ -0,0 +1,58 @@
+from datetime import date
+import pytest
+import app.services.context_fetcher as context_fetcher
+from app.models.forecast_row import ForecastRow
+from app.services.context_warmer import ContextWarmer
+
+
+@pytest.fixture
+def refreshed(monkeypatch):
+    calls = []
+    monkeypatch.setattr(
+        context_fetcher,
+        "fetch_google_trends",
+        lambda sku, force_refresh=False: calls.append(sku) or [1, 2]
+    )
+    monkeypatch.setattr(context_fetcher, "NEWSAPI_KEY", None)
+    return calls
+
+
+def make_row(sku, demand):
+    return ForecastRow(
+        sku_id=sku, store_id="S1",
+        forecast_date=date(2025, 7, 20), generated_at=date(2025, 7, 18),
+        predicted_demand=demand
+    )
+
+
+def test_hot_skus_ranked_by_traffic_then_volume(fake_redis):
+    warmer = ContextWarmer(redis_client=fake_redis, top_n=3)
+    for _ in range(3):
+        warmer.record_traffic("SKU_B")
+    warmer.record_traffic("SKU_A")
+    warmer.record_volume([make_row("SKU_C", 500), make_row("SKU_A", 900), make_row("SKU_D", 10)])
+    warmer._flush_counts()
+    assert warmer.hot_skus() == ["SKU_B", "SKU_A", "SKU_C"]
+
+
+def test_cycle_refreshes_stale_keys_within_budget(fake_redis, refreshed):
+    warmer = ContextWarmer(redis_client=fake_redis, top_n=5, request_budget=2)
+    for sku in ["SKU_A", "SKU_B", "SKU_C"]:
+        warmer.record_traffic(sku)
+    # SKU_A is fresh, so it should not consume budget
+    fake_redis.setex(context_fetcher.trends_cache_key("SKU_A"), context_fetcher.TRENDS_CACHE_TTL, "[1]")
+
+    result = warmer.run_cycle()
+    assert result["led"] is True
+    assert sorted(refreshed) == ["SKU_B", "SKU_C"]
+
+
+def test_only_one_worker_leads_each_cycle(fake_redis, refreshed):
+    first = ContextWarmer(redis_client=fake_redis, interval_seconds=60)
+    second = ContextWarmer(redis_client=fake_redis, interval_seconds=60)
+    first.record_traffic("SKU_A")
+    second.record_traffic("SKU_A")
+
+    assert first.run_cycle()["led"] is True
+    assert second.run_cycle()["led"] is False
+    assert refreshed == ["SKU_A"]
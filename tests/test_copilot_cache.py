@@ -0,0 +1,85 @@
+from datetime import date
+from types import SimpleNamespace
+
+import pytest
+
+from app.models.forecast_row import ForecastRow
+from app.services import copilot_agent
+from app.services.copilot_cache import CopilotAnswerCache, copilot_cache
+from app.utils.circuit_breaker import gemini_breaker
+
+FILTERS = {"sku": "All SKUs", "store": "All Stores", "startDate": "2025-07-01", "endDate": "2025-07-13"}
+QUESTION = "When is the next high-demand day in Bangalore?"
+
+
+def ingest(store, demand=100):
+    store.ingest([ForecastRow(
+        sku_id="SKU_1", store_id="S1", forecast_date=date(2025, 7, 1),
+        generated_at=date(2025, 6, 1), predicted_demand=demand
+    )])
+
+
+def answer(text):
+    return {"answer": text, "chart_highlight": None, "action": None, "source": "llm"}
+
+
+def test_paraphrase_hits_within_same_context(isolated_forecast_store):
+    cache = CopilotAnswerCache(threshold=0.7)
+    cache.put(QUESTION, FILTERS, answer("July 12"))
+    hit = cache.lookup("when is the next high demand day in Bangalore", FILTERS)
+    assert hit["answer"] == "July 12"
+    assert hit["source"] == "cache"
+    assert cache.lookup(QUESTION, FILTERS)["cache_similarity"] == 1.0
+    assert cache.lookup("What is the outlook for rain gear in Chennai?", FILTERS) is None
+
+
+def test_filters_and_intent_partition_the_cache(isolated_forecast_store):
+    cache = CopilotAnswerCache(threshold=0.5)
+    cache.put(QUESTION, FILTERS, answer("July 12"))
+    assert cache.lookup(QUESTION, {**FILTERS, "store": "STORE_9"}) is None
+    cache.put("Why did demand spike?", FILTERS, answer("promotion"))
+    # Nearly the same words, but routed to a different intent
+    assert cache.lookup("Why did demand drop?", FILTERS) is None
+
+
+def test_lru_and_data_version_eviction(isolated_forecast_store):
+    cache = CopilotAnswerCache(max_entries=2)
+    cache.put("first question about stores", FILTERS, answer("1"))
+    cache.put("second question about skus", FILTERS, answer("2"))
+    cache.lookup("first question about stores", FILTERS)
+    cache.put("third question about weather", FILTERS, answer("3"))
+    assert cache.lookup("second question about skus", FILTERS) is None
+    assert cache.lookup("first question about stores", FILTERS)["answer"] == "1"
+    assert cache.stats()["lru_evictions"] == 1
+
+    ingest(isolated_forecast_store)
+    assert cache.lookup("first question about stores", FILTERS) is None
+    assert cache.stats()["version_evictions"] == 2
+
+
+def test_repeated_question_skips_gemini(isolated_forecast_store, monkeypatch):
+    calls = []
+
+    class Model:
+        def __init__(self, name):
+            pass
+
+        def generate_content(self, prompt):
+            calls.append(prompt)
+            return SimpleNamespace(text='{"answer": "Saturday", "chart_highlight": null, "action": null}')
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(copilot_agent.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(copilot_agent.genai, "GenerativeModel", Model)
+    gemini_breaker.reset()
+    ingest(isolated_forecast_store)
+
+    assert copilot_agent.run_copilot_query(QUESTION, FILTERS)["source"] == "llm"
+    again = copilot_agent.run_copilot_query("When's the next high-demand day in Bangalore", FILTERS)
+    assert again["source"] == "cache" and again["answer"] == "Saturday"
+    assert len(calls) == 1
+
+    ingest(isolated_forecast_store, demand=150)
+    assert copilot_agent.run_copilot_query(QUESTION, FILTERS)["source"] == "llm"
+    assert len(calls) == 2
+    copilot_cache.clear()
@@ -0,0 +1,56 @@
+from datetime import date, timedelta
+import pytest
+from app.services.copilot_facts import build_copilot_facts, render_copilot_facts, select_facts
+from tests.conftest import forecast_row
+
+HISTORY = {"hist_sales_4w_avg": 100, "hist_sales_stddev": 10.0}
+
+
+@pytest.fixture
+def store(isolated_forecast_store):
+    start = date(2025, 7, 1)
+    rows = []
+    for offset in range(14):
+        day = start + timedelta(days=offset)
+        # SKU_A doubles in the second week, driven by promotions
+        rows.append(forecast_row("SKU_A", "S1", day, predicted_demand=100 if offset < 7 else 200,
+                                 top_influencer="promotion" if offset >= 7 else "weather", **HISTORY))
+        rows.append(forecast_row("SKU_B", "S2", day, top_influencer="weather", **HISTORY))
+    rows.append(forecast_row("SKU_C", "S3", date(2025, 7, 10), predicted_demand=400, top_influencer="event",
+                             anomaly_flag=True, **HISTORY))
+    isolated_forecast_store.ingest(rows)
+    return isolated_forecast_store
+
+
+def test_select_facts_by_intent():
+    assert select_facts("What are the top drivers?", []) == ["top_drivers"]
+    assert select_facts("Which stores saw anomalies?", []) == ["anomalies"]
+    assert select_facts("Tell me something", []) == ["top_drivers", "anomalies", "week_over_week"]
+    assert "anomalies" in select_facts("top drivers", ["anomalies"])
+
+
+def test_facts_computed_from_ingested_rows(store):
+    facts = build_copilot_facts("summary", {"startDate": "2025-07-01", "endDate": "2025-07-14"})
+    assert facts["rows"] == 29
+    drivers = {d["driver"]: d for d in facts["tables"]["top_drivers"]}
+    assert drivers["weather"]["forecasts"] == 21
+    assert drivers["promotion"]["share"] == pytest.approx(7 / 29, abs=1e-3)
+
+    top_anomaly = facts["tables"]["anomalies"][0]
+    assert (top_anomaly["store"], top_anomaly["date"]) == ("S3", "2025-07-10")
+
+    wow = facts["tables"]["week_over_week"]
+    movers = {m["sku"]: m for m in wow["movers"]}
+    assert movers["SKU_A"]["delta_pct"] == 100.0
+
+
+def test_filters_narrow_the_facts(store):
+    facts = build_copilot_facts("top drivers", {"sku": "SKU_B", "store": "All Stores"})
+    assert facts["rows"] == 14
+    assert [d["driver"] for d in facts["tables"]["top_drivers"]] == ["weather"]
+
+
+def test_rendered_prompt_section(store):
+    text = render_copilot_facts(build_copilot_facts("top drivers", {}))
+    assert "TOP DRIVERS" in text and "promotion" in text
+    assert render_copilot_facts({"rows": 0, "tables": {}}) == "No ingested forecast data matches this context."
@@ -0,0 +1,69 @@
+from datetime import date, timedelta
+import pytest
+from app.services import copilot_agent
+from app.services.copilot_router import classify_query
+from tests.conftest import forecast_row
+
+HISTORY = {"hist_sales_4w_avg": 100, "hist_sales_stddev": 10.0}
+
+
+@pytest.fixture
+def store(isolated_forecast_store):
+    start = date(2025, 7, 1)
+    rows = [forecast_row(sku, store, start + timedelta(days=i), top_influencer="weather", **HISTORY)
+            for sku, store in (("SKU_422", "STORE_5"), ("SKU_7", "STORE_9")) for i in range(14)]
+    rows.append(forecast_row("SKU_422", "STORE_5", date(2025, 7, 20), predicted_demand=180, top_influencer="promotion", **HISTORY))
+    rows.append(forecast_row("SKU_7", "STORE_9", date(2025, 7, 21), predicted_demand=40, top_influencer="weather", **HISTORY))
+    isolated_forecast_store.ingest(rows)
+    return isolated_forecast_store
+
+
+@pytest.fixture
+def no_llm(monkeypatch):
+    def fail(*args, **kwargs):
+        raise AssertionError("Gemini should not be called for fast-path intents")
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(copilot_agent.genai, "GenerativeModel", fail)
+
+
+@pytest.mark.parametrize("query,intent", [
+    ("Why did demand spike on July 9 for SKU_422?", "why_spike"),
+    ("What caused the sales drop?", "drop"),
+    ("Summarize top drivers this week", "top_drivers"),
+    ("Which stores saw anomalies last week?", "anomalies"),
+    ("Compare promotion vs. weather for Store_B", "compare"),
+])
+def test_common_intents_are_confident(query, intent):
+    route = classify_query(query)
+    assert route.intent == intent
+    assert route.fast_path
+
+
+@pytest.mark.parametrize("query", [
+    "Tell me about general trends",
+    "When is the next high-demand day in Bangalore?",
+    "What should we do about the spike in raincoats?",
+])
+def test_open_ended_questions_go_to_llm(query):
+    assert not classify_query(query).fast_path
+
+
+def test_spike_answered_from_aggregates(store, no_llm):
+    response = copilot_agent.run_copilot_query("Why did demand spike for SKU_422?", {})
+    assert response["source"] == "fast_path"
+    assert "STORE_5 on 2025-07-20" in response["answer"]
+    assert "promotion" in response["answer"]
+    assert response["chart_highlight"] == {"date": "2025-07-20", "sku": "SKU_422", "store": "STORE_5"}
+
+
+def test_drop_and_driver_comparison(store, no_llm):
+    drop = copilot_agent.run_copilot_query("What caused the sales drop?", {})
+    assert "STORE_9 on 2025-07-21" in drop["answer"]
+    compare = copilot_agent.run_copilot_query("Compare promotion vs weather", {"sku": "SKU_422"})
+    assert "promotion 7%" in compare["answer"] and "weather 93%" in compare["answer"]
+
+
+def test_no_data_falls_back(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    response = copilot_agent.run_copilot_query("Summarize top drivers this week", {})
+    assert response["source"] == "fallback"
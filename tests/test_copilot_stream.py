@@ -0,0 +1,119 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services import copilot_agent
+from app.services.copilot_agent import AnswerStreamParser
+from app.utils.circuit_breaker import gemini_breaker
+from app.utils.metrics import GEMINI_LATENCY
+
+client = TestClient(app)
+
+MODEL_OUTPUT = (
+    '```json\n{"answer": "Rain drove a \\"sharp\\" drop \\u2014 -12%.\\nCheck STORE_5.", '
+    '"chart_highlight": {"date": "2025-07-11", "sku": "SKU_422", "store": "STORE_5"}, '
+    '"action": {"type": "show_forecast_detail", "params": {"sku": "SKU_422"}}}\n```'
+)
+EXPECTED_ANSWER = 'Rain drove a "sharp" drop — -12%.\nCheck STORE_5.'
+
+
+def chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 3, 7, 1000])
+def test_parser_decodes_answer_across_any_chunking(size):
+    parser = AnswerStreamParser()
+    deltas = [parser.feed(c) for c in chunks(MODEL_OUTPUT, size)]
+    assert "".join(deltas) == EXPECTED_ANSWER
+    assert parser.answer == EXPECTED_ANSWER
+    if size < 20:
+        assert sum(1 for d in deltas if d) > 1
+
+
+def parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.fixture
+def streaming_model(monkeypatch):
+    class Model:
+        def __init__(self, name):
+            pass
+
+        def generate_content(self, prompt, stream=False):
+            assert stream
+            return [SimpleNamespace(text=c) for c in chunks(MODEL_OUTPUT, 8)]
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(copilot_agent.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(copilot_agent.genai, "GenerativeModel", Model)
+    gemini_breaker.reset()
+    yield
+    gemini_breaker.reset()
+
+
+def test_copilot_streams_answer_then_final(streaming_model):
+    timed = GEMINI_LATENCY.count(caller="copilot_stream", outcome="ok")
+    res = client.post("/api/dashboard/copilot", json={"query": "Tell me about general trends", "filters": {}, "stream": True})
+    assert res.status_code == 200
+    assert res.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(res.text)
+    deltas = [data["text"] for name, data in events if name == "answer"]
+    assert len(deltas) > 1 and "".join(deltas) == EXPECTED_ANSWER
+    name, final = events[-1]
+    assert name == "final"
+    assert final["answer"] == EXPECTED_ANSWER
+    assert final["chart_highlight"]["store"] == "STORE_5"
+    assert final["action"]["type"] == "show_forecast_detail"
+    assert final["source"] == "llm"
+    assert GEMINI_LATENCY.count(caller="copilot_stream", outcome="ok") == timed + 1
+
+
+def test_stream_falls_back_when_gemini_fails(monkeypatch):
+    class Broken:
+        def __init__(self, name):
+            pass
+
+        def generate_content(self, prompt, stream=False):
+            raise RuntimeError("boom")
+
+    monkeypatch.setenv("GOOGLE_API_KEY", "test-key")
+    monkeypatch.setattr(copilot_agent.genai, "configure", lambda **kwargs: None)
+    monkeypatch.setattr(copilot_agent.genai, "GenerativeModel", Broken)
+    gemini_breaker.reset()
+    res = client.post(
+        "/api/dashboard/copilot",
+        json={"query": "Tell me about general trends", "filters": {}},
+        headers={"Accept": "text/event-stream"},
+    )
+    gemini_breaker.reset()
+    events = parse_sse(res.text)
+    assert [name for name, _ in events] == ["answer", "final"]
+    assert events[-1][1]["source"] == "fallback"
+
+
+def test_non_streaming_request_still_returns_json(monkeypatch):
+    monkeypatch.delenv("GOOGLE_API_KEY", raising=False)
+    res = client.post("/api/dashboard/copilot", json={"query": "hello", "filters": {}})
+    assert res.headers["content-type"].startswith("application/json")
+    assert res.json()["source"] == "fallback"
+
+
+def test_disconnect_mid_stream_frees_half_open_probe(streaming_model, monkeypatch):
+    # Force the breaker half-open so the stream runs as its single probe
+    for _ in range(gemini_breaker.failure_threshold):
+        gemini_breaker.record_failure()
+    monkeypatch.setattr(gemini_breaker, "recovery_timeout", 0)
+    assert gemini_breaker.state == "half_open"
+    stream = copilot_agent.stream_copilot_query("Tell me about general trends", {})
+    assert next(stream)[0] == "answer"
+    stream.close()
+    assert gemini_breaker.allow_request() is True
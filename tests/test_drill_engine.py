@@ -0,0 +1,74 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.forecast_row import ForecastRow
+from app.services.drill_engine import drill_page, encode_cursor
+
+client = TestClient(app)
+START = date(2025, 7, 1)
+
+
+@pytest.fixture
+def store(isolated_forecast_store):
+    rows = []
+    for s in range(30):
+        for day in range(3):
+            rows.append(ForecastRow(
+                sku_id=f"SKU_{s:02d}", store_id=f"S{s % 3}", forecast_date=START + timedelta(days=day),
+                generated_at=START, predicted_demand=100 + s, actual_demand=100,
+                # Every fifth series has equal error so sort ties need the key tiebreak
+                conf_interval_lower=90, conf_interval_upper=105 if s % 5 else 200,
+            ))
+    isolated_forecast_store.ingest(rows)
+    return isolated_forecast_store
+
+
+def walk(limit, **kwargs):
+    rows, cursor = [], None
+    while True:
+        page = drill_page(limit=limit, cursor=cursor, **kwargs)
+        rows += page["rows"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return rows, page
+
+
+@pytest.mark.parametrize("limit", [1, 4, 7, 100])
+def test_keyset_pages_cover_each_row_once_in_order(store, limit):
+    rows, last = walk(limit, metric="all", sort="predicted", order="desc", columns=["sku_id", "predicted"])
+    assert [r[0] for r in rows] == [f"SKU_{s:02d}" for s in reversed(range(30))]
+    assert last["total"] == 30
+
+
+def test_ties_break_on_key_across_pages(store):
+    rows, _ = walk(3, metric="all", sort="confidence", order="asc", columns=["sku_id", "confidence"])
+    assert len(rows) == len({r[0] for r in rows}) == 30
+    values = [r[1] for r in rows]
+    assert values == sorted(values)
+
+
+def test_missed_metric_filters_and_projects(store):
+    page = drill_page("missed", limit=50, columns=["sku_id", "missed"])
+    assert page["columns"] == ["sku_id", "missed"]
+    assert all(len(r) == 2 and r[1] > 0 for r in page["rows"])
+    assert page["total"] == len(page["rows"])
+
+
+def test_drill_endpoint_and_errors(store):
+    res = client.get("/api/dashboard/drill", params={"metric": "accuracy", "limit": 5})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["sort"] == "abs_error" and len(body["rows"]) == 5 and body["next_cursor"]
+    nxt = client.get("/api/dashboard/drill", params={"metric": "accuracy", "limit": 5, "cursor": body["next_cursor"]}).json()
+    assert not {tuple(r) for r in nxt["rows"]} & {tuple(r) for r in body["rows"]}
+    assert client.get("/api/dashboard/drill", params={"metric": "nope"}).status_code == 400
+    assert client.get("/api/dashboard/drill", params={"metric": "all", "sort": "sku_id"}).status_code == 400
+    assert client.get("/api/dashboard/drill", params={
+        "metric": "accuracy", "sort": "predicted", "cursor": body["next_cursor"]
+    }).status_code == 400
+    # Hand-edited cursors with the wrong field types are rejected, not a 500
+    for tampered in (encode_cursor("abs_error", "desc", "big", "SKU|S1"), encode_cursor("abs_error", "desc", 1.0, 7)):
+        assert client.get("/api/dashboard/drill", params={"metric": "accuracy", "cursor": tampered}).status_code == 400
@@ -0,0 +1,86 @@
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.forecast_explaination import ForecastExplanation
+from app.models.forecast_row import ForecastRow
+from app.services.driver_changes import driver_changes, run_lengths
+from app.services.explanation_store import explanation_store
+
+client = TestClient(app)
+START = date(2025, 7, 1)
+
+
+def rows(sku, drivers, store="S1"):
+    return [
+        ForecastRow(sku_id=sku, store_id=store, forecast_date=START + timedelta(days=i), generated_at=START,
+                    predicted_demand=100, top_influencer=driver)
+        for i, driver in enumerate(drivers)
+    ]
+
+
+def test_run_lengths():
+    history = {START + timedelta(days=i): d for i, d in enumerate(["weather", "weather", "promotion", "weather"])}
+    assert [(r.driver, r.length) for r in run_lengths(history)] == [("weather", 2), ("promotion", 1), ("weather", 1)]
+
+
+def test_change_magnitude_and_ranking(isolated_forecast_store):
+    isolated_forecast_store.ingest(
+        rows("SKU_A", ["weather"] * 4 + ["promotion"] * 4)
+        + rows("SKU_B", ["holiday", "holiday", "event", "holiday", "holiday", "holiday"])
+        + rows("SKU_C", ["weather"] * 8)
+    )
+    top = driver_changes.changes(limit=5)
+    assert (top[0]["sku_id"], top[0]["from_driver"], top[0]["to_driver"], top[0]["magnitude"]) == ("SKU_A", "weather", "promotion", 1.0)
+    assert top[0]["date"] == START + timedelta(days=4)
+    assert {c["sku_id"] for c in top} == {"SKU_A", "SKU_B"}
+    # Window and filters are applied at lookup
+    window = driver_changes.changes(START, START + timedelta(days=3), sku="SKU_B", limit=5)
+    assert [(c["to_driver"], c["magnitude"]) for c in window] == [("holiday", 0.333), ("event", 0.25)]
+    assert driver_changes.changes(START, START + timedelta(days=1)) == []
+
+
+def test_incremental_updates_from_store_and_explanations(isolated_forecast_store):
+    isolated_forecast_store.ingest(rows("SKU_A", ["weather"] * 3))
+    assert driver_changes.changes() == []
+    # A later ingest only re-encodes the series it touches
+    isolated_forecast_store.ingest(rows("SKU_A", ["weather"] * 3 + ["holiday"]))
+    assert driver_changes.changes()[0]["to_driver"] == "holiday"
+    explanation_store.record([ForecastExplanation(
+        sku_id="SKU_A", store_id="S1", forecast_date=START + timedelta(days=4),
+        narrative_explanation="Promo", top_influencer="promotion",
+    )])
+    assert [r.driver for r in driver_changes.runs("SKU_A", "S1")] == ["weather", "holiday", "promotion"]
+
+
+def test_storycard_driver_card(isolated_forecast_store):
+    isolated_forecast_store.ingest(rows("SKU_A", ["weather"] * 3 + ["promotion"] * 3))
+    res = client.get("/api/dashboard/storycards", params={"start": "2025-07-01", "end": "2025-07-06"})
+    card = [c for c in res.json() if c["type"] == "driver"][0]
+    assert card["title"] == "Top driver changed"
+    assert card["primary_driver"] == "promotion"
+    assert card["body"] == "Promotion replaced weather as the primary driver; its share moved from 0% to 100%."
+    assert card["action"]["params"] == {"sku_id": "SKU_A", "store_id": "S1", "forecast_date": "2025-07-04"}
+
+
+def test_unknown_driver_ends_the_run(isolated_forecast_store):
+    isolated_forecast_store.ingest(rows("SKU_A", ["weather"] * 3 + ["promotion"] * 2))
+    assert driver_changes.changes()[0]["to_driver"] == "promotion"
+    # Re-ingesting the promotion days without a driver clears the stale run and its change point
+    isolated_forecast_store.ingest(rows("SKU_A", ["weather"] * 3 + [None] * 2))
+    assert [r.driver for r in driver_changes.runs("SKU_A", "S1")] == ["weather", None]
+    assert driver_changes.changes(limit=5) == []
+    # A switch across the unknown stretch is measured from the last known driver
+    isolated_forecast_store.ingest(rows("SKU_A", ["weather"] * 3 + [None] * 2 + ["holiday"]))
+    change = driver_changes.changes()[0]
+    assert (change["from_driver"], change["to_driver"]) == ("weather", "holiday")
+
+
+def test_ranking_matches_full_sort_after_deltas(isolated_forecast_store):
+    isolated_forecast_store.ingest(rows("SKU_A", ["weather", "promotion", "weather"]) + rows("SKU_B", ["event", "holiday"]))
+    isolated_forecast_store.ingest(rows("SKU_A", ["weather", "weather", "holiday", "holiday"]))
+    ranked = driver_changes.changes(limit=10)
+    expected = sorted(ranked, key=lambda c: (-abs(c["magnitude"]), -c["date"].toordinal(), c["sku_id"]))
+    assert ranked == expected
+    assert [(c["sku_id"], c["to_driver"]) for c in ranked] == [("SKU_A", "holiday"), ("SKU_B", "holiday")]
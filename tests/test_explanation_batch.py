@@ -0,0 +1,132 @@
+import threading
+import time
+from datetime import date
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.forecast_explaination import ForecastExplanation
+from app.models.forecast_row import ForecastRow
+from app.services import explanation_batch
+from app.services.explanation_store import explanation_store
+
+client = TestClient(app)
+DAY = date(2025, 7, 1)
+
+
+def explanation(sku, store="S1", day=DAY, text="stored"):
+    return ForecastExplanation(sku_id=sku, store_id=store, forecast_date=day, narrative_explanation=text,
+                               top_influencer="weather", confidence_score=0.8)
+
+
+def fake_explainer(monkeypatch, delay=0.0):
+    calls, active = [], {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def generate(row):
+        with lock:
+            calls.append(row)
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(delay)
+        with lock:
+            active["now"] -= 1
+        return explanation(row.sku_id, row.store_id, row.forecast_date, text=f"generated {row.predicted_demand}")
+
+    monkeypatch.setattr(explanation_batch, "generate_forecast_explanation", generate)
+    return calls, active
+
+
+def test_store_hits_skip_generation(monkeypatch, isolated_forecast_store):
+    calls, _ = fake_explainer(monkeypatch)
+    explanation_store.record([explanation("SKU_A")])
+    isolated_forecast_store.ingest([
+        ForecastRow(sku_id="SKU_B", store_id="S1", forecast_date=DAY, generated_at=DAY, predicted_demand=42),
+    ])
+    response = client.post("/api/dashboard/explanations", json=[
+        {"sku_id": "SKU_A", "store_id": "S1", "forecast_date": "2025-07-01"},
+        {"sku": "SKU_B", "store": "S1", "date": "2025-07-01"},
+        {"sku_id": "SKU_A", "store_id": "S1", "forecast_date": "2025-07-01"},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert [(e["sku_id"], e["source"]) for e in body["explanations"]] == [
+        ("SKU_A", "store"), ("SKU_B", "generated"), ("SKU_A", "store"),
+    ]
+    # Generated from the ingested forecast row, not a placeholder
+    assert body["explanations"][1]["narrative_explanation"] == "generated 42"
+    assert len(calls) == 1
+    assert body["summary"] == {**body["summary"], "requested": 3, "unique": 2, "from_store": 1, "generated": 1}
+
+
+def test_generation_concurrency_is_bounded(monkeypatch, isolated_forecast_store):
+    calls, active = fake_explainer(monkeypatch, delay=0.02)
+    monkeypatch.setattr(explanation_batch, "EXPLAIN_CONCURRENCY", 2)
+    isolated_forecast_store.ingest([
+        ForecastRow(sku_id=f"SKU_{i}", store_id="S1", forecast_date=DAY, generated_at=DAY, predicted_demand=i)
+        for i in range(6)
+    ])
+    keys = [{"sku_id": f"SKU_{i}", "store_id": "S1", "forecast_date": "2025-07-01"} for i in range(6)]
+    response = client.post("/api/dashboard/explanations", json=keys)
+    assert response.status_code == 200
+    assert len(calls) == 6
+    assert active["peak"] <= 2
+
+
+def test_unknown_keys_are_not_generated(monkeypatch):
+    calls, _ = fake_explainer(monkeypatch)
+    response = client.post("/api/dashboard/explanations", json=[
+        {"sku_id": "NOPE", "store_id": "NOWHERE", "forecast_date": "2030-01-01"},
+    ])
+    assert response.status_code == 200
+    body = response.json()
+    assert body["explanations"] == [
+        {"sku_id": "NOPE", "store_id": "NOWHERE", "forecast_date": "2030-01-01", "source": "not_found"},
+    ]
+    assert body["summary"]["not_found"] == 1 and body["summary"]["generated"] == 0
+    assert calls == []
+    assert explanation_store.get("NOPE", "NOWHERE", date(2030, 1, 1)) is None
+
+
+def test_only_gemini_explanations_are_stored(monkeypatch, isolated_forecast_store):
+    def fallback(row):
+        return explanation(row.sku_id).model_copy(update={"explanation_type": "rule_based", "confidence_score": 0.3})
+
+    monkeypatch.setattr(explanation_batch, "generate_forecast_explanation", fallback)
+    isolated_forecast_store.ingest([
+        ForecastRow(sku_id="SKU_A", store_id="S1", forecast_date=DAY, generated_at=DAY, predicted_demand=1),
+    ])
+    key = [{"sku_id": "SKU_A", "store_id": "S1", "forecast_date": "2025-07-01"}]
+    assert client.post("/api/dashboard/explanations", json=key).json()["explanations"][0]["source"] == "generated"
+    assert explanation_store.get("SKU_A", "S1", DAY) is None
+    # Once Gemini answers, the explanation is generated again and kept
+    fake_explainer(monkeypatch)
+    assert client.post("/api/dashboard/explanations", json=key).json()["explanations"][0]["source"] == "generated"
+    assert explanation_store.get("SKU_A", "S1", DAY).explanation_type == "ai_generated"
+
+
+def test_single_explain_matches_batch_resolution(monkeypatch, isolated_forecast_store):
+    calls, _ = fake_explainer(monkeypatch)
+    unknown = {"sku_id": "NOPE", "store_id": "S1", "forecast_date": "2025-07-01"}
+    assert client.post("/api/dashboard/explain/single", json=unknown).status_code == 404
+    assert client.post("/api/dashboard/explain/single", json={"sku_id": "NOPE"}).status_code == 400
+    assert calls == []
+    # A stored fallback is a miss: the ingested row is explained again
+    isolated_forecast_store.ingest([
+        ForecastRow(sku_id="SKU_A", store_id="S1", forecast_date=DAY, generated_at=DAY, predicted_demand=7),
+    ])
+    explanation_store.record([explanation("SKU_A").model_copy(update={"explanation_type": "rule_based"})])
+    body = client.post("/api/dashboard/explain/single", json={**unknown, "sku_id": "SKU_A"}).json()
+    assert (body["source"], body["narrative_explanation"]) == ("generated", "generated 7")
+    assert explanation_store.get("SKU_A", "S1", DAY).explanation_type == "ai_generated"
+
+
+def test_invalid_batches_rejected(monkeypatch):
+    fake_explainer(monkeypatch)
+    assert client.post("/api/dashboard/explanations", json=[]).status_code == 400
+    assert client.post("/api/dashboard/explanations", json=[{"sku_id": "SKU_A", "store_id": "S1"}]).status_code == 400
+    bad_date = [{"sku_id": "SKU_A", "store_id": "S1", "forecast_date": "07/01/2025"}]
+    assert client.post("/api/dashboard/explanations", json=bad_date).status_code == 400
+    monkeypatch.setattr(explanation_batch, "EXPLAIN_BATCH_LIMIT", 1)
+    two = [{"sku_id": s, "store_id": "S1", "forecast_date": "2025-07-01"} for s in ("A", "B")]
+    assert client.post("/api/dashboard/explanations", json=two).status_code == 400
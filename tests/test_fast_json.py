@@ -0,0 +1,36 @@
+import json
+from datetime import date
+
+import numpy as np
+from starlette.responses import StreamingResponse
+
+from app.models.forecast_explaination import ForecastExplanation
+from app.utils import fast_json
+from app.utils.fast_json import dumps, fast_response, iter_json_array, iter_json_object
+
+EXPLANATION = ForecastExplanation(sku_id="SKU_A", store_id="S1", forecast_date=date(2025, 7, 1),
+                                  narrative_explanation="Promo uplift", top_influencer="promotion")
+
+
+def test_dumps_models_numpy_and_nan():
+    payload = json.loads(dumps({"exp": EXPLANATION, "n": np.int64(3), "x": np.float32(0.5), "nan": float("nan"), "a": np.arange(2)}))
+    assert payload["exp"]["forecast_date"] == "2025-07-01"
+    assert payload["exp"]["top_influencer"] == "promotion"
+    assert payload["n"] == 3 and payload["x"] == 0.5 and payload["nan"] is None and payload["a"] == [0, 1]
+
+
+def test_incremental_arrays_match_one_shot_encoding():
+    items = [{"i": i} for i in range(25)]
+    for chunk in (1, 7, 25, 100):
+        assert json.loads(b"".join(iter_json_array(items, chunk))) == items
+    assert json.loads(b"".join(iter_json_array([]))) == []
+    content = {"summary": {"n": 25}, "explanations": [EXPLANATION] * 3}
+    assert json.loads(b"".join(iter_json_object(content, "explanations")))["explanations"][2]["sku_id"] == "SKU_A"
+    assert json.loads(b"".join(iter_json_object({"rows": [1, 2]}, "rows"))) == {"rows": [1, 2]}
+
+
+def test_large_arrays_stream(monkeypatch):
+    monkeypatch.setattr(fast_json, "JSON_STREAM_MIN_ITEMS", 10)
+    assert not isinstance(fast_response(list(range(9))), StreamingResponse)
+    assert isinstance(fast_response(list(range(10))), StreamingResponse)
+    assert isinstance(fast_response({"explanations": [EXPLANATION] * 10}, array_key="explanations"), StreamingResponse)
@@ -0,0 +1,31 @@
+import json
+import threading
+from datetime import date
+
+from app.models.forecast_row import ForecastRow
+from app.services.forecast_store import ForecastStore
+
+DAY = date(2025, 7, 1)
+
+
+def test_concurrent_workers_do_not_lose_ingests(tmp_path, monkeypatch):
+    monkeypatch.setenv("FORECAST_STORE_DIR", str(tmp_path))
+    # Two store objects over one directory stand in for two worker processes
+    workers = [ForecastStore(), ForecastStore()]
+
+    def ingest(worker, n):
+        for i in range(5):
+            worker.ingest([ForecastRow(sku_id=f"SKU_{n}_{i}", store_id="S1", forecast_date=DAY, generated_at=DAY, predicted_demand=i)])
+
+    threads = [threading.Thread(target=ingest, args=(worker, n)) for n, worker in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    fresh = ForecastStore()
+    assert fresh.load()
+    assert fresh.version == 10
+    assert len(fresh.frame) == 10
+    assert json.loads((tmp_path / "version.json").read_text())["version"] == 10
+    assert not (tmp_path / "version.json.tmp").exists()
@@ -0,0 +1,100 @@
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.forecast_explaination import ForecastExplanation
+from app.models.forecast_row import ForecastRow
+from app.services.explanation_store import ExplanationStore, explanation_store
+from app.utils import fast_json
+from app.utils.http_cache import choose_encoding
+
+client = TestClient(app)
+START = date(2025, 7, 1)
+CHART = {"start": "2025-07-01", "end": "2025-12-31"}
+
+
+def ingest(store, days=180, demand=100):
+    store.ingest([
+        ForecastRow(sku_id="SKU_A", store_id="S1", forecast_date=START + timedelta(days=i), generated_at=START,
+                    predicted_demand=demand + i % 7)
+        for i in range(days)
+    ])
+
+
+def test_etag_revalidation_and_ingest_invalidation(isolated_forecast_store):
+    ingest(isolated_forecast_store)
+    first = client.get("/api/dashboard/chart", params=CHART)
+    etag = first.headers["etag"]
+    assert first.headers["cache-control"] == "private, no-cache"
+    assert "last-modified" in first.headers
+
+    again = client.get("/api/dashboard/chart", params=CHART, headers={"If-None-Match": etag})
+    assert again.status_code == 304 and again.content == b""
+    assert again.headers["etag"] == etag
+    # The query string selects a different view, so a different tag
+    other = client.get("/api/dashboard/chart", params={**CHART, "width": 10}, headers={"If-None-Match": etag})
+    assert other.status_code == 200
+    by_date = client.get("/api/dashboard/chart", params=CHART, headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert by_date.status_code == 304
+
+    ingest(isolated_forecast_store, demand=200)
+    fresh = client.get("/api/dashboard/chart", params=CHART, headers={"If-None-Match": etag})
+    assert fresh.status_code == 200 and fresh.headers["etag"] != etag
+
+
+def test_large_bodies_are_gzipped(isolated_forecast_store):
+    ingest(isolated_forecast_store)
+    res = client.get("/api/dashboard/chart", params=CHART, headers={"Accept-Encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in res.headers["vary"]
+    assert len(res.json()["points"]) == 180
+    small = client.get("/api/dashboard/copilot", params={"default": True}, headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["cache-control"] == "public, max-age=3600"
+    identity = client.get("/api/dashboard/chart", params=CHART, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+
+
+def test_streamed_bodies_are_gzipped(isolated_forecast_store, monkeypatch):
+    ingest(isolated_forecast_store)
+    monkeypatch.setattr(fast_json, "JSON_STREAM_MIN_ITEMS", 10)
+    monkeypatch.setattr(fast_json, "JSON_STREAM_CHUNK_ITEMS", 20)
+    params = {"start_date": "2025-07-01", "end_date": "2025-12-31"}
+    res = client.get("/api/dashboard/timeseries", params=params, headers={"Accept-Encoding": "gzip"})
+    assert res.headers["content-encoding"] == "gzip" and "content-length" not in res.headers
+    assert len(res.json()) == 180
+    plain = client.get("/api/dashboard/timeseries", params=params, headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers and plain.json() == res.json()
+
+
+def test_errors_and_non_dashboard_routes_are_not_cached(isolated_forecast_store):
+    bad = client.get("/api/dashboard/metrics", params={"start_date": "2025-07-10", "end_date": "2025-07-01"})
+    assert bad.status_code == 400 and "etag" not in bad.headers
+    assert "etag" not in client.get("/health").headers
+
+
+def test_choose_encoding():
+    assert choose_encoding("gzip, deflate") == "gzip"
+    assert choose_encoding("gzip;q=0, deflate") is None
+    assert choose_encoding("") is None
+
+
+def test_explanations_move_last_modified_and_fingerprint(isolated_forecast_store, monkeypatch):
+    ingest(isolated_forecast_store, days=14)
+    params = {"start": "2025-07-01", "end": "2025-07-14"}
+    first = client.get("/api/dashboard/storycards", params=params)
+    exps = [ForecastExplanation(sku_id="SKU_A", store_id="S1", forecast_date=START + timedelta(days=i),
+                                narrative_explanation=f"n{i}", confidence_score=0.5) for i in range(2)]
+    explanation_store.record(exps)
+    monkeypatch.setattr(explanation_store, "updated_at", "2099-01-01T00:00:00+00:00")
+    again = client.get("/api/dashboard/storycards", params=params, headers={"If-Modified-Since": first.headers["last-modified"]})
+    assert again.status_code == 200
+    assert again.headers["last-modified"] == "Thu, 01 Jan 2099 00:00:00 GMT"
+
+    # Content fingerprints agree across processes regardless of arrival order
+    a, b = ExplanationStore(), ExplanationStore()
+    a.record(exps)
+    b.record(exps[1:])
+    b.record(exps[:1])
+    assert a.fingerprint == b.fingerprint and a.version != b.version
@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.utils import metrics
+from app.utils.circuit_breaker import CircuitBreaker, CircuitOpenError, GuardedClient
+from app.utils.file_loader import ingest_forecast_csv
+from app.utils.metrics import Histogram, Metric, record_cache, timed_gemini_call
+from app.models.forecast_explaination import ForecastExplanation
+from app.services.explanation_store import explanation_store
+
+client = TestClient(app)
+
+
+def sample(text, line_prefix):
+    values = [line.rsplit(" ", 1)[1] for line in text.splitlines() if line.startswith(line_prefix)]
+    assert values, f"no sample starting with {line_prefix}"
+    return float(values[0])
+
+
+def test_histogram_exposition():
+    histogram = Histogram("test_latency_seconds", "Test latency", ["route"], buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, route="/a")
+    text = histogram.render()
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_sum{route="/a"} 5.55' in text
+    assert 'test_latency_seconds_count{route="/a"} 3' in text
+
+
+def test_routes_are_labelled_by_template():
+    client.get("/api/dashboard/confidence-history", params={"sku": "SKU_A", "store": "S1"})
+    client.get("/no/such/path")
+    text = client.get("/metrics").text
+    assert sample(text, 'http_request_duration_seconds_count{method="GET",route="/api/dashboard/confidence-history",status="200"}') >= 1
+    assert sample(text, 'http_request_duration_seconds_count{method="GET",route="unmatched",status="404"}') >= 1
+    assert "event_loop_lag_seconds" in text
+
+
+def test_cache_hit_ratio_and_ingest_rate(tmp_path):
+    for hit in (True, True, False, True):
+        record_cache("unit_test_cache", hit)
+    path = tmp_path / "rows.csv"
+    path.write_text(
+        "sku_id,store_id,forecast_date,generated_at,predicted_demand\n"
+        "SKU_A,S1,2025-07-01,2025-06-01,10\n"
+        "SKU_B,S1,2025-07-01,2025-06-01,-5\n"
+    )
+    before = metrics.INGEST_ROWS.value(kind="forecasts", result="invalid")
+    ingest_forecast_csv(str(path))
+    text = client.get("/metrics").text
+    assert sample(text, 'cache_hit_ratio{cache="unit_test_cache"}') == 0.75
+    assert metrics.INGEST_ROWS.value(kind="forecasts", result="invalid") == before + 1
+    assert sample(text, 'ingest_rows_per_second{kind="forecasts"}') > 0
+
+
+def test_metric_requires_samples():
+    with pytest.raises(TypeError):
+        Metric("test_abstract", "Abstract")
+
+
+def test_single_explanation_routes_count_store_lookups():
+    explanation_store.record([ForecastExplanation(sku_id="SKU_M", store_id="S1", forecast_date="2025-07-01",
+                                                  narrative_explanation="stored", confidence_score=0.7)])
+    hits = metrics.CACHE_REQUESTS.value(cache="explanations", result="hit")
+    misses = metrics.CACHE_REQUESTS.value(cache="explanations", result="miss")
+    res = client.get("/api/dashboard/explain", params={"sku": "SKU_M", "store": "S1", "date": "2025-07-01"})
+    assert res.json()["narrative_explanation"] == "stored"
+    client.get("/api/dashboard/explain", params={"sku": "SKU_M", "store": "S2", "date": "2025-07-01"})
+    assert metrics.CACHE_REQUESTS.value(cache="explanations", result="hit") == hits + 1
+    assert metrics.CACHE_REQUESTS.value(cache="explanations", result="miss") == misses + 1
+
+
+def test_gemini_calls_record_outcome_and_tokens():
+    response = SimpleNamespace(usage_metadata=SimpleNamespace(prompt_token_count=120, candidates_token_count=30))
+    tokens = metrics.GEMINI_TOKENS.value(caller="unit", kind="prompt")
+    assert timed_gemini_call("unit", lambda prompt: response, "hi") is response
+    assert metrics.GEMINI_TOKENS.value(caller="unit", kind="prompt") == tokens + 120
+
+    def open_circuit(prompt):
+        raise CircuitOpenError("gemini", 5)
+
+    with pytest.raises(CircuitOpenError):
+        timed_gemini_call("unit", open_circuit, "hi")
+    assert metrics.GEMINI_LATENCY.count(caller="unit", outcome="circuit_open") >= 1
+
+
+def test_redis_commands_are_timed(fake_redis):
+    latency = Histogram("test_redis_seconds", "Test redis latency", ["command"])
+    guarded = GuardedClient(fake_redis, CircuitBreaker("test-redis"), latency)
+    guarded.set("k", b"v")
+    guarded.get("k")
+    pipe = guarded.pipeline()
+    pipe.get("k")
+    pipe.execute()
+    assert [latency.count(command=c) for c in ("set", "get", "pipeline")] == [1, 1, 1]
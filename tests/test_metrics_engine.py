@@ -0,0 +1,62 @@
+from datetime import date, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.metrics_engine import compute_kpis
+from tests.conftest import forecast_row
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def store(isolated_forecast_store):
+    week1, week2 = date(2025, 7, 1), date(2025, 7, 8)
+    rows = []
+    for i in range(7):
+        # Previous week: perfect forecasts
+        rows.append(forecast_row("SKU_A", "S1", week1 + timedelta(days=i), predicted_demand=100, actual_demand=100,
+                                 conf_interval_lower=90, conf_interval_upper=110, top_influencer="weather"))
+        # Current week: 20% over-forecast, actual outside the interval on SKU_B
+        rows.append(forecast_row("SKU_A", "S1", week2 + timedelta(days=i), predicted_demand=120, actual_demand=100,
+                                 conf_interval_lower=90, conf_interval_upper=130, top_influencer="weather"))
+        rows.append(forecast_row("SKU_B", "S2", week2 + timedelta(days=i), predicted_demand=120, actual_demand=100,
+                                 conf_interval_lower=110, conf_interval_upper=130, top_influencer="promotion"))
+    # A planner override and a forecast without actuals yet
+    rows.append(forecast_row("SKU_C", "S2", date(2025, 7, 14), predicted_demand=50, override_demand=70, top_influencer="weather"))
+    isolated_forecast_store.ingest(rows)
+    return isolated_forecast_store
+
+
+def test_kpis_from_error_sums(store):
+    kpis = compute_kpis("2025-07-08", "2025-07-14")
+    cur, prev = kpis["current"], kpis["previous"]
+    assert cur["forecasts"] == 15 and cur["forecasts_with_actuals"] == 14
+    assert cur["forecast_accuracy"] == pytest.approx(0.8)
+    assert cur["bias"] == pytest.approx(0.2)
+    assert cur["missed_skus"] == 1 and cur["missed_forecasts"] == 7
+    assert cur["overrides"] == 1
+    assert prev["forecast_accuracy"] == 1.0 and prev["missed_skus"] == 0
+    assert prev["confidence_score"] == pytest.approx(0.9)
+    assert kpis["top_influencer_breakdown"] == {"weather": 0.533, "promotion": 0.467}
+
+
+def test_filters_narrow_the_kpis(store):
+    cur = compute_kpis("2025-07-08", "2025-07-14", sku="SKU_A")["current"]
+    assert cur["forecasts"] == 7 and cur["missed_skus"] == 0
+    assert compute_kpis("2025-07-08", "2025-07-14", store="S9")["current"]["forecast_accuracy"] is None
+
+
+def test_metrics_endpoint_tiles(store):
+    res = client.get("/api/dashboard/metrics", params={"start_date": "2025-07-08", "end_date": "2025-07-14"})
+    assert res.status_code == 200
+    tiles = {t["key"]: t for t in res.json()}
+    assert tiles["accuracy"]["value"] == "80.0%" and tiles["accuracy"]["trend"] == "-20.0%"
+    assert tiles["missed"]["value"] == "1" and tiles["missed"]["trend"] == "+1"
+    assert tiles["override"]["value"] == "1"
+
+
+def test_metrics_rejects_bad_range():
+    res = client.get("/api/dashboard/metrics", params={"start_date": "2025-07-14", "end_date": "2025-07-08"})
+    assert res.status_code == 400
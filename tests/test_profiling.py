@@ -0,0 +1,92 @@
+import asyncio
+import pstats
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.profiles import router as profiles_router
+from app.utils import profiling
+from app.utils.profiling import ProfilingMiddleware
+
+TOKEN = "secret"
+
+
+def busy_work():
+    return sum(i * i for i in range(200_000))
+
+
+@pytest.fixture
+def profiled_client(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", TOKEN)
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    app = FastAPI()
+
+    @app.get("/work")
+    async def work():
+        # Half on the loop, half in a worker thread, like the explain and ingest paths
+        data = [str(i) for i in range(20_000)]
+        return {"total": busy_work() + await asyncio.to_thread(busy_work), "kept": len(data)}
+
+    app.include_router(profiles_router)
+    app.add_middleware(ProfilingMiddleware, token=TOKEN, sample_rate=0.0)
+    return TestClient(app)
+
+
+def test_unflagged_requests_are_not_profiled(profiled_client, tmp_path):
+    response = profiled_client.get("/work")
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert profiled_client.get("/work", headers={"X-Profile-Token": "wrong"}).headers.get("x-profile-id") is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_flagged_request_writes_cpu_stack_and_memory_profiles(profiled_client, tmp_path):
+    response = profiled_client.get("/work", headers={"X-Profile-Token": TOKEN})
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    stats = pstats.Stats(str(tmp_path / f"{profile_id}.pstats"))
+    assert any(func[2] == "busy_work" for func in stats.stats)
+    memory = (tmp_path / f"{profile_id}.memory.txt").read_text()
+    assert memory.startswith("# GET /work")
+
+    listing = profiled_client.get("/api/profiles", headers={"X-Profile-Token": TOKEN}).json()
+    assert listing["count"] == 1
+    entry = listing["profiles"][0]
+    assert entry["id"] == profile_id and entry["trigger"] == "header" and entry["status"] == 200
+    assert entry["pstats_scope"] == "event_loop_thread" and entry["overlapping_requests"] == 0
+
+    folded = profiled_client.get(entry["files"]["folded"], headers={"X-Profile-Token": TOKEN})
+    assert folded.status_code == 200
+    for line in folded.text.splitlines():
+        stack, count = line.rsplit(" ", 1)
+        assert int(count) > 0 and ";" in stack
+
+
+def test_query_flag_triggers_profile(profiled_client):
+    response = profiled_client.get("/work", params={"profile": TOKEN})
+    assert response.headers["x-profile-id"].endswith("-work")
+
+
+def test_sampling_requires_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    app = FastAPI()
+    app.get("/ping")(lambda: {"ok": True})
+    app.add_middleware(ProfilingMiddleware, token=None, sample_rate=1.0)
+    assert "x-profile-id" not in TestClient(app).get("/ping").headers
+    assert profiling.list_profiles() == []
+
+    sampled = FastAPI()
+    sampled.get("/ping")(lambda: {"ok": True})
+    sampled.add_middleware(ProfilingMiddleware, token=TOKEN, sample_rate=1.0)
+    assert "x-profile-id" in TestClient(sampled).get("/ping").headers
+    assert profiling.list_profiles()[0]["trigger"] == "sampled"
+
+
+def test_profile_endpoints_require_token(profiled_client, monkeypatch):
+    assert profiled_client.get("/api/profiles").status_code == 403
+    assert profiled_client.get("/api/profiles/../../etc/passwd/pstats", headers={"X-Profile-Token": TOKEN}).status_code == 404
+    assert profiled_client.get("/api/profiles/20260101T000000-abcdef-work/exe", headers={"X-Profile-Token": TOKEN}).status_code == 404
+    monkeypatch.setattr(profiling, "PROFILE_TOKEN", None)
+    assert profiled_client.get("/api/profiles", headers={"X-Profile-Token": TOKEN}).status_code == 404
@@ -0,0 +1,96 @@
+from datetime import date, timedelta
+
+import pandas as pd
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.forecast_row import ForecastRow
+from app.services.forecast_store import ForecastStore
+from app.services import query_cache as query_cache_module
+from app.services.query_cache import QueryCache, Scope, cache_key, query_cache
+from tests.conftest import FakeRedis
+
+client = TestClient(app)
+START = date(2025, 7, 1)
+JULY = Scope(pd.Timestamp("2025-07-01"), pd.Timestamp("2025-07-31"), None, "S1")
+
+
+def ingest(store, store_id="S1", day=0, demand=100):
+    store.ingest([ForecastRow(sku_id="SKU_A", store_id=store_id, forecast_date=START + timedelta(days=day),
+                              generated_at=START, predicted_demand=demand)])
+
+
+class Counter:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"n": self.calls}
+
+
+def test_normalized_filters_share_an_entry():
+    assert cache_key("x", {"start": date(2025, 7, 1), "signals": ["b", "a", "a"]}) == \
+        cache_key("x", {"signals": ["a", "b"], "start": pd.Timestamp("2025-07-01")})
+    assert cache_key("x", {"store": ""}) == cache_key("x", {"store": None})
+
+
+def test_ingest_invalidates_only_overlapping_entries(isolated_forecast_store):
+    ingest(isolated_forecast_store)
+    compute, august = Counter(), Counter()
+    aug_scope = Scope(pd.Timestamp("2025-08-01"), pd.Timestamp("2025-08-31"), None, None)
+    query_cache.get_or_compute("t", {"m": "july"}, JULY, compute)
+    query_cache.get_or_compute("t", {"m": "july"}, JULY, compute)
+    query_cache.get_or_compute("t", {"m": "aug"}, aug_scope, august)
+    assert compute.calls == 1
+
+    ingest(isolated_forecast_store, store_id="S2", day=3)  # other store
+    ingest(isolated_forecast_store, day=40)                # other dates
+    query_cache.get_or_compute("t", {"m": "july"}, JULY, compute)
+    assert compute.calls == 1
+    ingest(isolated_forecast_store, day=5, demand=300)
+    assert query_cache.get_or_compute("t", {"m": "july"}, JULY, compute) == {"n": 2}
+    # The day-40 ingest touched August
+    query_cache.get_or_compute("t", {"m": "aug"}, aug_scope, august)
+    assert august.calls == 2
+
+
+def test_redis_tier_is_shared_between_workers():
+    store, redis = ForecastStore(), FakeRedis()
+    store.ingest([ForecastRow(sku_id="SKU_A", store_id="S1", forecast_date=START, generated_at=START, predicted_demand=1)], persist=False)
+    worker_a, worker_b = QueryCache(store, redis), QueryCache(store, redis)
+    compute = Counter()
+    worker_a.get_or_compute("t", {}, JULY, compute)
+    assert worker_b.get_or_compute("t", {}, JULY, compute) == {"n": 1}
+    assert worker_b.stats()["redis_hits"] == 1
+
+    store.ingest([ForecastRow(sku_id="SKU_A", store_id="S9", forecast_date=START, generated_at=START, predicted_demand=1)], persist=False)
+    # A sibling that picks the ingest up as a snapshot reload has no delta to
+    # scope it, so it drops older entries; the ingesting worker keeps them
+    worker_b.on_store_change(store, None)
+    assert worker_a.get_or_compute("t", {}, JULY, compute) == {"n": 1}
+    assert worker_b.get_or_compute("t", {}, JULY, compute) == {"n": 2}
+
+
+def test_local_entries_expire_with_the_ttl(monkeypatch):
+    store, compute = ForecastStore(), Counter()
+    cache = QueryCache(store)
+    cache.get_or_compute("t", {}, JULY, compute)
+    assert cache.get_or_compute("t", {}, JULY, compute) == {"n": 1}
+    # Entries stored once the TTL has passed are never served locally
+    monkeypatch.setattr(query_cache_module, "QUERY_CACHE_TTL", -1)
+    cache.clear()
+    assert cache.get_or_compute("t", {}, JULY, compute) == {"n": 2}
+    assert cache.get_or_compute("t", {}, JULY, compute) == {"n": 3}
+
+
+def test_metrics_endpoint_served_from_cache(isolated_forecast_store):
+    ingest(isolated_forecast_store)
+    params = {"start_date": "2025-07-01", "end_date": "2025-07-07"}
+    client.get("/api/dashboard/metrics", params=params)
+    misses = query_cache.stats()["misses"]
+    client.get("/api/dashboard/metrics", params=params)
+    assert query_cache.stats()["misses"] == misses
+    ingest(isolated_forecast_store, day=1, demand=50)
+    client.get("/api/dashboard/metrics", params=params)
+    assert query_cache.stats()["misses"] == misses + 1
@@ -0,0 +1,40 @@
+import asyncio
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.explain import get_redis_client
+from app.utils import cache_codec
+from app.utils.redis_pool import get_async_redis, get_redis, pool_stats
+
+
+def test_sync_client_is_shared():
+    assert get_redis() is get_redis()
+    stats = pool_stats()
+    assert stats["sync"]["max_connections"] > 0
+    assert stats["sync"]["in_use_connections"] == 0
+
+
+def test_async_client_is_per_loop():
+    async def fetch():
+        return get_async_redis(), get_async_redis()
+
+    first, again = asyncio.run(fetch())
+    assert first is again
+    other, _ = asyncio.run(fetch())
+    assert other is not first
+
+
+def test_status_uses_single_pipeline(async_fake_redis):
+    async_fake_redis.sync.hset("forecast_session:abc", "meta", cache_codec.encode({"row_count": 1, "chunk_count": 1}))
+    async_fake_redis.sync.expire("forecast_session:abc", 600)
+    app.dependency_overrides[get_redis_client] = lambda: async_fake_redis
+    try:
+        res = TestClient(app).get("/api/explain/status/abc")
+    finally:
+        app.dependency_overrides.clear()
+    assert res.status_code == 200
+    body = res.json()
+    assert body["forecast_data_available"] is True
+    assert body["explanations_available"] is False
+    assert 0 < body["forecast_ttl"] <= 600
+    assert body["explanation_ttl"] is None
+    assert async_fake_redis.pipelines_executed == 1
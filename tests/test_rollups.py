@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.forecast_row import ForecastRow
+from app.services.forecast_store import ForecastStore
+from app.services.rollups import CUBES, DRIVER_CUBES, Rollups
+
+client = TestClient(app)
+START = date(2025, 7, 1)
+
+
+def random_rows(rng, n, days):
+    return [
+        ForecastRow(
+            sku_id=f"SKU_{rng.integers(12)}", store_id=f"S{rng.integers(4)}",
+            product_category=["Apparel", "Grocery", None][rng.integers(3)],
+            forecast_date=START + timedelta(days=int(rng.integers(days))), generated_at=START,
+            predicted_demand=int(rng.integers(200)), actual_demand=int(rng.integers(200)),
+            top_influencer=[None, "weather", "promotion"][rng.integers(3)],
+            holiday_flag=bool(rng.integers(2)),
+        )
+        for _ in range(n)
+    ]
+
+
+def sorted_frame(frame, keys):
+    return frame.sort_values(keys).reset_index(drop=True)
+
+
+def test_incremental_cubes_match_full_rebuild(tmp_path, monkeypatch):
+    monkeypatch.setenv("FORECAST_STORE_DIR", str(tmp_path))
+    rng = np.random.default_rng(7)
+    store = ForecastStore()
+    incremental = Rollups(store)
+    # Overlapping deltas upsert existing keys and can move a SKU between categories
+    for n, days in ((800, 20), (300, 25), (100, 5)):
+        store.ingest(random_rows(rng, n, days), persist=False)
+
+    rebuilt = Rollups(store)
+    cubes = {**CUBES, **{name: keys + ["driver"] for name, keys in DRIVER_CUBES.items()}}
+    for name, keys in cubes.items():
+        expected = sorted_frame(rebuilt.frame(name), keys)
+        actual = sorted_frame(incremental.frame(name), keys)
+        pd.testing.assert_frame_equal(actual[expected.columns], expected, check_dtype=False)
+
+
+def test_delta_only_rebuilds_touched_days(tmp_path, monkeypatch):
+    monkeypatch.setenv("FORECAST_STORE_DIR", str(tmp_path))
+    store = ForecastStore()
+    cubes = Rollups(store)
+    store.ingest(random_rows(np.random.default_rng(1), 200, 10), persist=False)
+    before = {day: part for day, part in cubes._parts["store_day"].items()}
+    store.ingest([ForecastRow(sku_id="SKU_0", store_id="S0", forecast_date=START, generated_at=START, predicted_demand=5)], persist=False)
+    touched = [day for day, part in cubes._parts["store_day"].items() if part is not before.get(day)]
+    assert touched == [pd.Timestamp(START)]
+    assert cubes.version == store.version
+
+
+def test_reingest_without_driver_drops_old_driver_partition(tmp_path, monkeypatch):
+    monkeypatch.setenv("FORECAST_STORE_DIR", str(tmp_path))
+    store = ForecastStore()
+    cubes = Rollups(store)
+    row = dict(sku_id="SKU_0", store_id="S0", forecast_date=START, generated_at=START, predicted_demand=5)
+    store.ingest([ForecastRow(**row, top_influencer="promotion")], persist=False)
+    assert cubes.frame("drivers")["driver"].tolist() == ["promotion"]
+    store.ingest([ForecastRow(**row, top_influencer=None)], persist=False)
+    for name in DRIVER_CUBES:
+        assert cubes.frame(name).empty
+    assert cubes.frame("daily")["rows"].tolist() == [1]
+
+
+def test_storycard_insight_reads_category_cube(isolated_forecast_store):
+    rows = []
+    for i in range(14):
+        day = START + timedelta(days=i)
+        rows.append(ForecastRow(sku_id="SKU_A", store_id="S1", product_category="Apparel", forecast_date=day,
+                                generated_at=START, predicted_demand=100 if i < 7 else 150, top_influencer="promotion"))
+        rows.append(ForecastRow(sku_id="SKU_B", store_id="S1", product_category="Grocery", forecast_date=day,
+                                generated_at=START, predicted_demand=100, top_influencer="weather"))
+    isolated_forecast_store.ingest(rows)
+    res = client.get("/api/dashboard/storycards", params={"start": "2025-07-08", "end": "2025-07-14"})
+    insight = [c for c in res.json() if c["type"] == "insight"][0]
+    assert insight["title"] == "Apparel demand up 50%"
+    assert insight["primary_driver"] == "promotion"
+    assert insight["action"]["params"] == {"product_category": "Apparel"}
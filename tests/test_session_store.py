@@ -0,0 +1,101 @@
+import asyncio
+from datetime import date
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.explain import get_redis_client
+from app.models.forecast_row import ForecastRow
+from app.services.forecast_explainer import create_fallback_explanation
+from app.services import session_store
+from app.services.session_store import write_forecast_session
+
+
+def make_rows(n):
+    return [
+        ForecastRow(
+            sku_id=f"SKU{i}", store_id="ST01",
+            forecast_date=date(2025, 7, 20), generated_at=date(2025, 7, 18),
+            predicted_demand=10 + i, promotion_flag=True, social_sentiment_score=0.2
+        )
+        for i in range(n)
+    ]
+
+
+@pytest.fixture
+def client(async_fake_redis, monkeypatch):
+    generated = []
+
+    def fake_batch(rows):
+        generated.extend(rows)
+        return [create_fallback_explanation(row, "test") for row in rows]
+
+    monkeypatch.setattr("app.api.explain.generate_batch_explanations", fake_batch)
+    app.dependency_overrides[get_redis_client] = lambda: async_fake_redis
+    yield TestClient(app), generated
+    app.dependency_overrides.clear()
+
+
+def test_session_written_in_fixed_size_chunks(async_fake_redis):
+    meta = asyncio.run(write_forecast_session(async_fake_redis, make_rows(250), chunk_size=100, session_id="s1"))
+    assert meta["chunk_count"] == 3
+    fields = async_fake_redis.sync.data["forecast_session:s1"]
+    assert sorted(fields) == ["chunk:0", "chunk:1", "chunk:2", "meta"]
+    assert async_fake_redis.sync.ttl("forecast_session:s1") > 0
+
+
+def test_failed_write_leaves_no_partial_session(async_fake_redis, monkeypatch):
+    monkeypatch.setattr(session_store, "WRITE_PIPELINE_CHUNKS", 1)
+    pipeline = async_fake_redis.pipeline
+    ttls = []
+
+    def failing_pipeline(transaction=True):
+        pipe = pipeline(transaction)
+        execute = pipe.execute
+
+        async def execute_once():
+            if async_fake_redis.pipelines_executed:
+                ttls.append(async_fake_redis.sync.ttl("forecast_session:s2"))
+                raise ConnectionError("redis went away")
+            return await execute()
+
+        pipe.execute = execute_once
+        return pipe
+
+    monkeypatch.setattr(async_fake_redis, "pipeline", failing_pipeline)
+    with pytest.raises(ConnectionError):
+        asyncio.run(write_forecast_session(async_fake_redis, make_rows(250), chunk_size=100, session_id="s2"))
+    # The chunks written before the failure already had a TTL, and are then removed
+    assert ttls[0] > 0
+    assert "forecast_session:s2" not in async_fake_redis.sync.data
+
+
+def test_from_cache_pages_through_session(client, async_fake_redis):
+    http, generated = client
+    asyncio.run(write_forecast_session(async_fake_redis, make_rows(15), chunk_size=10, session_id="s2"))
+
+    first = http.post("/api/explain/from-cache/s2").json()
+    assert len(first["explanations"]) == 10
+    assert first["next_cursor"] == 1
+    assert first["summary"]["cached"] is False
+
+    second = http.post("/api/explain/from-cache/s2", params={"cursor": 1}).json()
+    assert len(second["explanations"]) == 5
+    assert second["next_cursor"] is None
+    assert len(generated) == 15
+
+    # Explained chunks are served from cache without regenerating
+    again = http.post("/api/explain/from-cache/s2", params={"cursor": 0}).json()
+    assert again["summary"]["cached"] is True
+    assert len(generated) == 15
+
+    status = http.get("/api/explain/status/s2", params={"cursor": 1}).json()
+    assert status["explanations_available"] is True
+    assert status["explained_chunks"] == 2
+    assert [e["sku_id"] for e in status["explanations"]] == [f"SKU{i}" for i in range(10, 15)]
+
+
+def test_cursor_past_end_is_404(client, async_fake_redis):
+    http, _ = client
+    asyncio.run(write_forecast_session(async_fake_redis, make_rows(3), chunk_size=10, session_id="s3"))
+    assert http.post("/api/explain/from-cache/s3", params={"cursor": 5}).status_code == 404
+    assert http.post("/api/explain/from-cache/missing").status_code == 404
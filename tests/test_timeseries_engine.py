@@ -0,0 +1,78 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.models.forecast_row import ForecastRow
+from app.services.timeseries_engine import daily_series, lttb, minmax
+
+client = TestClient(app)
+START = date(2025, 1, 1)
+
+
+@pytest.fixture
+def year(isolated_forecast_store):
+    rows = []
+    for i in range(365):
+        day = START + timedelta(days=i)
+        for store in ("S1", "S2"):
+            rows.append(ForecastRow(
+                sku_id="SKU_A", store_id=store, forecast_date=day, generated_at=START,
+                predicted_demand=100 + (400 if i == 200 else 0),
+                actual_demand=90 if i < 180 else None,
+                holiday_flag=(i == 359), weather_type="rain" if i == 10 else "sunny",
+                event_type="Concert" if i == 100 else "None",
+            ))
+    isolated_forecast_store.ingest(rows)
+    return isolated_forecast_store
+
+
+@pytest.mark.parametrize("select", [lttb, minmax])
+def test_selection_keeps_extremes_and_covers_every_day(select):
+    y = np.sin(np.linspace(0, 12, 5000))
+    y[1234] = 9.0
+    keep, starts, stops = select(y, 100)
+    assert len(keep) <= 100
+    assert 1234 in keep
+    assert np.all((keep >= starts) & (keep < stops))
+    covered = np.zeros(len(y), dtype=bool)
+    for lo, hi in zip(starts, stops):
+        covered[lo:hi] = True
+    assert covered.all()
+
+
+def test_daily_series_sums_stores(year):
+    series = daily_series("2025-01-01", "2025-01-31")
+    assert len(series["dates"]) == 31
+    assert series["predicted"][0] == 200
+    assert series["actual"][0] == 180
+    assert series["flags"]["rain"][10] and not series["flags"]["rain"][11]
+    assert np.isnan(daily_series("2025-12-01", "2025-12-31")["actual"]).all()
+
+
+def test_chart_downsamples_to_width_with_bucket_overlays(year):
+    res = client.get("/api/dashboard/chart", params={"start": "2025-01-01", "end": "2025-12-31", "width": 60})
+    assert res.status_code == 200
+    body = res.json()
+    assert body["total_points"] == 365 and body["downsampled"]
+    assert len(body["labels"]) == len(body["values"]) == 60
+    # The single-day spike survives downsampling
+    assert max(body["values"]) == 1000
+    overlays = {o for p in body["points"] for o in p["overlays"]}
+    assert overlays == {"holiday", "rain", "event"}
+    rain = [p for p in body["points"] if "rain" in p["overlays"]]
+    assert len(rain) == 1 and rain[0]["bucket_start"] <= "2025-01-11" <= rain[0]["bucket_end"]
+
+
+def test_timeseries_minmax_and_short_ranges(year):
+    res = client.get("/api/dashboard/timeseries", params={
+        "start_date": "2025-01-01", "end_date": "2025-12-31", "width": 40, "method": "minmax"
+    })
+    points = res.json()
+    assert len(points) <= 40
+    assert {"date", "actual", "predicted", "overlays"} == set(points[0])
+    short = client.get("/api/dashboard/timeseries", params={"start_date": "2025-01-01", "end_date": "2025-01-07"}).json()
+    assert [p["date"] for p in short] == [(START + timedelta(days=i)).isoformat() for i in range(7)]
+    assert client.get("/api/dashboard/chart", params={"method": "bogus"}).status_code == 400